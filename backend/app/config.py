@@ -5,7 +5,7 @@ Loads settings from environment and config files
 
 import json
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 try:
     from pydantic_settings import BaseSettings
 except ImportError:
@@ -19,6 +19,90 @@ class Settings(BaseSettings):
     app_name: str = "Nostr Badges API"
     app_version: str = "1.0.0"
     debug: bool = False
+
+    # Relay accounting: warn when one API request issues more REQs than this
+    relay_fanout_warn_threshold: int = 50
+
+    # Relay slow-query log
+    slow_query_threshold_ms: int = 1000
+    slow_query_window_seconds: int = 900
+
+    # Event loop lag monitor (stack traces of blocking callbacks are captured in debug mode)
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_ms: int = 50
+    loop_block_threshold_ms: int = 100
+
+    # Request profiling (debug mode only): send X-Profile: 1 to store, X-Profile: download to fetch
+    profile_sample_interval_ms: int = 5
+
+    # Request tracing: recent traces are kept in memory, optionally appended to a JSONL file
+    tracing_enabled: bool = True
+    trace_buffer_size: int = 200
+    trace_export_path: Optional[str] = None
+
+    # Bulk awards: recipients per kind 8 event and award events published at once
+    award_chunk_size: int = 500
+    award_max_concurrent_chunks: int = 4
+
+    # Background jobs (?background=true): worker tasks and how long finished jobs are kept
+    job_workers: int = 2
+    job_retention_hours: float = 24
+
+    # Outbox: background retries of relay writes that were not verified
+    outbox_enabled: bool = True
+    outbox_max_age_hours: float = 24
+    outbox_max_attempts: int = 10
+    outbox_base_delay_seconds: float = 30
+    outbox_max_delay_seconds: float = 3600
+    outbox_poll_interval_seconds: float = 5
+
+    # Publish verification: inline, sampled, deferred or off, optionally with an OK quorum
+    # ("deferred:1" returns after the first relay OK). Per request: X-Publish-Verification header
+    publish_verification: str = "inline"
+    publish_verification_sample_size: int = 1
+    publish_verification_routes: Dict[str, str] = {
+        "/inbox/accept": "deferred:1",
+        "/inbox/remove": "deferred:1",
+    }
+
+    # Relay NIP-11 capability cache; RELAY_INFO_FILE (JSON: relay URL -> NIP-11 document)
+    # replaces HTTP discovery, e.g. for tests or offline use
+    relay_info_ttl_seconds: int = 3600
+    relay_info_error_ttl_seconds: int = 300
+    relay_info_file: Optional[str] = None
+
+    # Local event store kept in sync with relays (NIP-77 negentropy where supported):
+    # awards of badges shown on /surf/popular are tracked and counted locally once synced
+    event_store_enabled: bool = True
+    sync_interval_seconds: float = 300
+    sync_max_targets: int = 100
+    sync_max_relays: int = 5
+
+    # Live feeds (/inbox/events, /surf/live): seconds relay subscriptions stay open after the
+    # last client left (so page reloads reuse them), items buffered per client before a slow
+    # client is dropped, and relays followed by the global feed
+    live_feed_linger_seconds: float = 30
+    live_feed_queue_size: int = 100
+    surf_live_max_relays: int = 5
+
+    # /inbox/events takes any pubkey without auth: users with their own relay subscriptions
+    # at once, and streams per user; further streams are refused with 503
+    inbox_feed_max_channels: int = 200
+    inbox_feed_max_streams_per_pubkey: int = 5
+
+    # HTTP caching of relay-backed GETs: ETags also change every this many seconds so that
+    # enrichment not covered by the validating events (issuer names, counts) is refreshed
+    http_cache_revalidate_seconds: int = 300
+
+    # Stale-if-error: serve the last good response of a read while no relay answers,
+    # and do not ask the relays again for the same read within stale_retry_seconds
+    stale_cache_enabled: bool = True
+    stale_cache_max_entries: int = 1000
+    stale_cache_max_age_seconds: int = 86400
+    stale_retry_seconds: int = 15
+
+    # Admin endpoints: require X-Admin-Token when set, otherwise only open in debug mode
+    admin_token: Optional[str] = None
     
     # CORS Settings
     cors_origins: List[str] = ["http://localhost:5173", "http://localhost:3000", "http://127.0.0.1:5173"]
@@ -56,6 +140,30 @@ class Settings(BaseSettings):
         path.mkdir(parents=True, exist_ok=True)
         return path
 
+    @property
+    def profiles_path(self) -> Path:
+        """Path to stored request profiles"""
+        path = self.project_root / "backend" / "data" / "profiles"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    @property
+    def jobs_db_path(self) -> Path:
+        """Path to the background job database"""
+        path = self.project_root / "backend" / "data"
+        path.mkdir(parents=True, exist_ok=True)
+        return path / "jobs.sqlite3"
+
+    @property
+    def outbox_db_path(self) -> Path:
+        """Path to the relay write outbox database"""
+        return self.jobs_db_path.parent / "outbox.sqlite3"
+
+    @property
+    def event_store_db_path(self) -> Path:
+        """Path to the local event store database"""
+        return self.jobs_db_path.parent / "events.sqlite3"
+
     # Backward compatibility
     @property
     def badge_definitions_path(self) -> Path:
@@ -0,0 +1,392 @@
+"""
+HTTP Caching - ETag / Last-Modified validators for relay-backed GET endpoints
+
+A response is built from relay events and then enriched (profiles,
+definitions, counts), which is the expensive part. Each cached endpoint
+names a few "head" filters whose newest events change whenever the
+response would: the profile badges event for a badge list, the newest
+definitions for /surf/recent, the newest awards for owner lists, and so
+on. The ETag is a hash of the request URL, the ids and created_at of
+the head events and an epoch that rolls over every
+HTTP_CACHE_REVALIDATE_SECONDS, so enrichment that is not covered by the
+head events (a renamed issuer, a new holder count) is rebuilt at least
+that often.
+
+Every request runs the head queries (one small REQ per relay, reused
+for 30 seconds) alongside the full build, so they add no latency; a
+request with If-None-Match gets 304 and the build is cancelled when
+nothing changed. If no head relay answers, the body is sent without
+validators rather than with an ETag that does not cover the relays.
+
+Stale-if-error: the last successful body of every request is kept. When
+the relays behind a rebuild all fail (no query reached EOSE) and the
+result is an error or empty, the kept body is served instead with
+`X-Stale: true` and `Age`, rather than an empty list that looks like "no
+badges". For STALE_RETRY_SECONDS after such a failure the same request is
+answered from the kept body without asking the relays again, so retries
+do not add load during a relay outage. Without a kept body the answer is
+503 with Retry-After.
+"""
+
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from .config import settings
+
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "common"))
+
+import relay_accounting
+from metrics import REGISTRY
+from relay_manager import query_relay_filters
+
+# Cache-Control policies
+PUBLIC = "public, max-age=30, stale-if-error=86400"
+PRIVATE = "private, no-cache"
+
+# Relays asked for head events, how long they may take, and newest events per head list
+HEAD_RELAYS = 3
+HEAD_TIMEOUT = 5
+HEAD_LIMIT = 10
+
+# Seconds head validators are reused across requests (the max-age of PUBLIC), and how many are kept
+HEAD_CACHE_SECONDS = 30
+HEAD_CACHE_MAX_ENTRIES = 1000
+
+HTTP_CACHE_RESULTS = REGISTRY.counter(
+    "http_cache_requests_total",
+    "Conditional GET handling by route and result (hit = 304, miss = rebuilt, none = no validator sent, "
+    "stale = last good body served, unavailable = 503)",
+    ["route", "result"]
+)
+LAST_GOOD_ENTRIES = REGISTRY.gauge(
+    "http_last_good_entries",
+    "Responses kept for stale-if-error"
+)
+
+# Head filters (JSON) -> (fetched at, validators)
+_head_cache: "OrderedDict[str, Tuple[float, List[Tuple[str, int]]]]" = OrderedDict()
+
+# Response headers not copied from the original response to a stale one
+_STALE_SKIP_HEADERS = {"content-length", "content-type"}
+
+
+@dataclass
+class _Entry:
+    body: Any = None  # JSON-ready body of the last good response (None = never succeeded)
+    headers: Optional[Dict[str, str]] = None
+    stored_at: float = 0
+    retry_at: float = 0  # relays are not asked again before this time
+
+
+class LastGoodCache:
+    """
+    Last successful body per request, served while relays are failing
+
+    Keys are hashes of the URL and the request headers the response
+    varies on, so private keys never end up in memory as keys. Bodies
+    older than `max_age` are not served; the least recently used entries
+    are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_age: float = 86400):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        if entry.body is not None and time.time() - entry.stored_at > self.max_age:
+            entry.body = entry.headers = None
+        return entry
+
+    def put(self, key: str, body: Any, headers: Dict[str, str]) -> None:
+        self._entries[key] = _Entry(body=body, headers=headers, stored_at=time.time())
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def failed(self, key: str, retry_seconds: float) -> _Entry:
+        """Note a failed rebuild; returns the entry (body may be None)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+            self._evict()
+        entry.retry_at = time.time() + retry_seconds
+        return entry
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        LAST_GOOD_ENTRIES.set(len(self._entries))
+
+
+LAST_GOOD = LastGoodCache(
+    max_entries=settings.stale_cache_max_entries,
+    max_age=settings.stale_cache_max_age_seconds
+)
+
+
+async def head_validators(filters: List[Dict[str, Any]]) -> Optional[List[Tuple[str, int]]]:
+    """
+    (id, created_at) of the head events, sorted; relays that fail are left out
+
+    Returns None when no relay answered. Results are reused for
+    HEAD_CACHE_SECONDS, so a burst of requests for the same lists does not
+    open a head REQ per request.
+    """
+    if not filters:
+        return []
+    key = json.dumps(filters, sort_keys=True)
+    cached = _head_cache.get(key)
+    if cached is not None and time.time() - cached[0] < HEAD_CACHE_SECONDS:
+        _head_cache.move_to_end(key)
+        return cached[1]
+
+    results = await asyncio.gather(
+        *(
+            query_relay_filters(relay, "etag", filters, timeout=HEAD_TIMEOUT, recv_timeout=2, strict=True)
+            for relay in settings.relay_urls[:HEAD_RELAYS]
+        ),
+        return_exceptions=True
+    )
+    answered = [result for result in results if isinstance(result, list)]
+    if not answered:
+        return None
+    events = {ev["id"]: ev.get("created_at", 0) for result in answered for ev in result if ev.get("id")}
+    validators = sorted(events.items())
+    _head_cache[key] = (time.time(), validators)
+    _head_cache.move_to_end(key)
+    while len(_head_cache) > HEAD_CACHE_MAX_ENTRIES:
+        _head_cache.popitem(last=False)
+    return validators
+
+
+def _route(request: Request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", request.url.path)
+
+
+def _is_empty(body: Any) -> bool:
+    """Whether a JSON body carries nothing (empty lists, zero counts, null fields, flags)"""
+    if isinstance(body, dict):
+        return all(_is_empty(value) for value in body.values())
+    return isinstance(body, bool) or not body
+
+
+def _no_items(body: Any) -> bool:
+    """Whether a list body, or every list in a dict body, is empty (cursors and counts aside)"""
+    if isinstance(body, dict):
+        return all(not value for value in body.values() if isinstance(value, list))
+    return not body
+
+
+def _is_incomplete(body: Any, response: Response) -> bool:
+    """Whether the body says it may miss events (`complete: false` or an X-Complete: false header)"""
+    if isinstance(body, dict) and body.get("complete") is False:
+        return True
+    return response.headers.get("X-Complete") == "false"
+
+
+def cache_key(request: Request, vary: Optional[str] = None) -> str:
+    """Hash of the URL and the values of the `vary` request headers"""
+    digest = hashlib.sha256(f"{request.url.path}?{request.url.query}\n".encode())
+    for header in (vary or "").split(","):
+        if header.strip():
+            digest.update(f"{request.headers.get(header.strip(), '')}\n".encode())
+    return digest.hexdigest()
+
+
+def _stale_response(entry: _Entry) -> JSONResponse:
+    headers = dict(entry.headers or {})
+    headers.update({
+        "X-Stale": "true",
+        "Age": str(int(time.time() - entry.stored_at)),
+        "Cache-Control": "no-cache",
+    })
+    return JSONResponse(content=entry.body, headers=headers)
+
+
+def _answer_failed(route: str, entry: _Entry, error: Optional[Exception] = None) -> JSONResponse:
+    if entry.body is not None:
+        HTTP_CACHE_RESULTS.inc(route=route, result="stale")
+        return _stale_response(entry)
+    if error is not None and not isinstance(error, HTTPException):
+        raise error
+    HTTP_CACHE_RESULTS.inc(route=route, result="unavailable")
+    raise HTTPException(
+        status_code=503,
+        detail="Relays are not responding; try again shortly",
+        headers={"Retry-After": str(max(1, int(entry.retry_at - time.time())))}
+    )
+
+
+async def stale_if_error(
+    request: Request,
+    response: Response,
+    build: Callable[[], Awaitable[Any]],
+    vary: Optional[str] = None
+) -> Any:
+    """
+    Build the body, falling back to the last good one if the relays failed
+
+    Returns the body from `build` (and keeps it), or a JSONResponse with
+    the last good body marked `X-Stale: true`. Raises 503 when the relays
+    failed and there is nothing to fall back to. Headers set on `response`
+    by `build` (e.g. X-Next-Cursor) are kept and restored with the body.
+    """
+    if not settings.stale_cache_enabled:
+        return await build()
+
+    route = _route(request)
+    key = cache_key(request, vary)
+    entry = LAST_GOOD.get(key)
+    if entry is not None and entry.retry_at > time.time():
+        # The relays failed for this request moments ago: do not ask them again yet
+        return _answer_failed(route, entry)
+
+    sweep = relay_accounting.RelaySweep()
+
+    async def run():
+        relay_accounting.track_sweep(sweep)
+        return await build()
+
+    try:
+        body = await asyncio.create_task(run())
+    except HTTPException as e:
+        if e.status_code >= 500 or sweep.degraded:
+            return _answer_failed(route, LAST_GOOD.failed(key, settings.stale_retry_seconds), e)
+        raise
+    except Exception as e:
+        print(f"⚠️ Rebuilding {request.url.path} failed: {e}")
+        return _answer_failed(route, LAST_GOOD.failed(key, settings.stale_retry_seconds), e)
+
+    encoded = jsonable_encoder(body)
+    if sweep.degraded and _is_empty(encoded):
+        return _answer_failed(route, LAST_GOOD.failed(key, settings.stale_retry_seconds))
+    if _is_incomplete(encoded, response):
+        # A page that left out a failed relay is served but never kept as the last good one
+        if _no_items(encoded) and entry is not None and entry.body is not None:
+            HTTP_CACHE_RESULTS.inc(route=route, result="stale")
+            return _stale_response(entry)
+        return body
+    LAST_GOOD.put(key, encoded, {
+        name: value for name, value in response.headers.items()
+        if name.lower() not in _STALE_SKIP_HEADERS
+    })
+    return body
+
+
+def make_etag(request: Request, validators: List[Tuple[str, int]]) -> str:
+    """Strong ETag over the URL, head events and the revalidation epoch"""
+    epoch = int(time.time() // settings.http_cache_revalidate_seconds)
+    digest = hashlib.sha256()
+    digest.update(f"{request.url.path}?{request.url.query}\n{epoch}\n".encode())
+    for event_id, created_at in validators:
+        digest.update(f"{event_id}:{created_at}\n".encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def is_fresh(request: Request, etag: str, last_modified: Optional[int]) -> bool:
+    """Whether the client's copy matches (If-None-Match wins over If-Modified-Since)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _cache_headers(
+    etag: Optional[str],
+    last_modified: Optional[int],
+    cache_control: str,
+    vary: Optional[str]
+) -> Dict[str, str]:
+    headers = {"Cache-Control": cache_control}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+async def conditional(
+    request: Request,
+    response: Response,
+    head_filters: List[Dict[str, Any]],
+    build: Callable[[], Awaitable[Any]],
+    cache_control: str = PUBLIC,
+    vary: Optional[str] = None
+) -> Any:
+    """
+    Answer 304 if the client's copy is current, otherwise build the body
+
+    Sets ETag, Last-Modified (newest head event), Cache-Control and Vary
+    on the response. Returns either the body from `build` or a 304
+    Response. The build starts alongside the head queries and is
+    cancelled on a 304. When no head relay answered there is nothing to
+    compare, so the body is sent without ETag or Last-Modified.
+    """
+    route = _route(request)
+    conditional_request = "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+    head_task = asyncio.create_task(head_validators(head_filters))
+    build_task = asyncio.create_task(stale_if_error(request, response, build, vary))
+    try:
+        if conditional_request:
+            validators = await head_task
+            if validators is not None:
+                etag = make_etag(request, validators)
+                last_modified = max((created_at for _, created_at in validators), default=None)
+                if is_fresh(request, etag, last_modified):
+                    build_task.cancel()
+                    HTTP_CACHE_RESULTS.inc(route=route, result="hit")
+                    return Response(status_code=304, headers=_cache_headers(etag, last_modified, cache_control, vary))
+            HTTP_CACHE_RESULTS.inc(route=route, result="miss")
+            body = await build_task
+        else:
+            HTTP_CACHE_RESULTS.inc(route=route, result="none")
+            body = await build_task
+            if isinstance(body, Response):
+                head_task.cancel()
+                return body
+            validators = await head_task
+    except BaseException:
+        head_task.cancel()
+        build_task.cancel()
+        raise
+
+    if isinstance(body, Response):
+        return body
+    if validators is None:
+        response.headers.update(_cache_headers(None, None, cache_control, vary))
+        return body
+    etag = make_etag(request, validators)
+    last_modified = max((created_at for _, created_at in validators), default=None)
+    response.headers.update(_cache_headers(etag, last_modified, cache_control, vary))
+    return body
@@ -0,0 +1,185 @@
+"""
+Inbox Feed - Live notifications of new badge awards and badge requests
+
+Each user with an open stream gets one shared set of upstream relay
+subscriptions for `kinds:[8], #p:[me]` (awards) and `kinds:[30058],
+#p:[me]` (requests for their badges). New events are enriched once and
+pushed to every stream of that user (e.g. several browser tabs); a stream
+that falls too far behind is dropped. The upstream subscriptions close a
+short while after the last stream ends, so a page reload does not reopen
+them.
+
+Streams need no auth, so the number of users with subscriptions open and
+of streams per user are capped (INBOX_FEED_MAX_CHANNELS and
+INBOX_FEED_MAX_STREAMS_PER_PUBKEY). Relay subscriptions and enrichment
+run in their own context, not in the trace of the request that opened
+them.
+"""
+
+import asyncio
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .config import settings
+from .services.inbox_service import InboxService
+from .services.request_service import KIND_BADGE_AWARD, KIND_BADGE_REQUEST, RequestService
+
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "common"))
+
+from live_subscription import Broadcast, LiveSubscription, create_detached_task
+
+
+class FeedFull(Exception):
+    """No room for another stream (too many users or streams for this user)"""
+
+
+@dataclass
+class _Channel:
+    """Upstream subscription of one user and the streams reading from it"""
+    subscription: LiveSubscription
+    streams: Broadcast
+    close_task: Optional[asyncio.Task] = None
+
+
+class InboxFeed:
+    """Per-pubkey hub between relay subscriptions and SSE streams"""
+
+    def __init__(self):
+        self._channels: Dict[str, _Channel] = {}
+        self._tasks: set = set()
+
+    async def subscribe(self, pubkey_hex: str, keepalive: float = 15) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield new inbox items for a user until the caller stops iterating
+
+        Items are {"type": "badge_award", "data": <pending badge>} or
+        {"type": "badge_request", "data": <incoming request>}. Yields None
+        after `keepalive` seconds without items so that streaming responses
+        can send a heartbeat. Iteration ends if the caller falls more than
+        LIVE_FEED_QUEUE_SIZE items behind, or right away if the feed is full
+        (callers check admit() first to refuse the request instead).
+        """
+        try:
+            self.admit(pubkey_hex)
+        except FeedFull:
+            return
+        channel = self._open(pubkey_hex)
+        items = channel.streams.listen(keepalive)
+        try:
+            async for item in items:
+                yield item
+        finally:
+            await items.aclose()
+            if not channel.streams:
+                channel.close_task = create_detached_task(self._close_later(pubkey_hex, channel))
+
+    def admit(self, pubkey_hex: str) -> None:
+        """
+        Raise FeedFull if another stream for this user would exceed the limits
+
+        Channels kept open only for a page reload are closed to make room.
+        """
+        channel = self._channels.get(pubkey_hex)
+        if channel is not None:
+            if len(channel.streams) >= settings.inbox_feed_max_streams_per_pubkey:
+                raise FeedFull("Too many live streams for this pubkey")
+            return
+        if len(self._channels) >= settings.inbox_feed_max_channels and not self._close_idle():
+            raise FeedFull("Too many users are streaming their inbox; try again later")
+
+    async def close(self) -> None:
+        """Stop all upstream subscriptions (on shutdown)"""
+        for task in self._tasks:
+            task.cancel()
+        channels, self._channels = list(self._channels.values()), {}
+        for channel in channels:
+            if channel.close_task:
+                channel.close_task.cancel()
+        await asyncio.gather(*(channel.subscription.stop() for channel in channels), return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            pubkey_hex[:8]: {
+                "streams": len(channel.streams),
+                "connected_relays": sum(channel.subscription.connected.values()),
+            }
+            for pubkey_hex, channel in self._channels.items()
+        }
+
+    def _open(self, pubkey_hex: str) -> _Channel:
+        channel = self._channels.get(pubkey_hex)
+        if channel is not None:
+            if channel.close_task:
+                channel.close_task.cancel()
+                channel.close_task = None
+            return channel
+
+        subscription = LiveSubscription(
+            settings.relay_urls,
+            [
+                {"kinds": [KIND_BADGE_AWARD], "#p": [pubkey_hex]},
+                {"kinds": [KIND_BADGE_REQUEST], "#p": [pubkey_hex]},
+            ],
+            on_event=lambda event: self._on_event(pubkey_hex, event),
+            name="inbox"
+        )
+        channel = self._channels[pubkey_hex] = _Channel(
+            subscription=subscription,
+            streams=Broadcast("inbox", queue_size=settings.live_feed_queue_size)
+        )
+        subscription.start()
+        print(f"📡 Inbox feed opened for {pubkey_hex[:8]}")
+        return channel
+
+    def _close_idle(self) -> bool:
+        """Close one channel without streams (lingering after a reload); False if every channel is in use"""
+        pubkey_hex = next((pk for pk, channel in self._channels.items() if not channel.streams), None)
+        if pubkey_hex is None:
+            return False
+        channel = self._channels.pop(pubkey_hex)
+        if channel.close_task:
+            channel.close_task.cancel()
+        task = create_detached_task(channel.subscription.stop())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        print(f"📡 Inbox feed closed for {pubkey_hex[:8]} to make room")
+        return True
+
+    async def _close_later(self, pubkey_hex: str, channel: _Channel) -> None:
+        await asyncio.sleep(settings.live_feed_linger_seconds)
+        if self._channels.get(pubkey_hex) is channel and not channel.streams:
+            del self._channels[pubkey_hex]
+            await channel.subscription.stop()
+            print(f"📡 Inbox feed closed for {pubkey_hex[:8]}")
+
+    def _on_event(self, pubkey_hex: str, event: Dict[str, Any]) -> None:
+        task = create_detached_task(self._publish(pubkey_hex, event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, pubkey_hex: str, event: Dict[str, Any]) -> None:
+        try:
+            item = await self._enrich(pubkey_hex, event)
+        except Exception as e:
+            print(f"⚠️ Inbox feed could not enrich {event.get('id', '')[:8]}: {e}")
+            return
+        channel = self._channels.get(pubkey_hex)
+        if item is not None and channel is not None:
+            channel.streams.publish(item)
+
+    @staticmethod
+    async def _enrich(pubkey_hex: str, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if event.get("kind") == KIND_BADGE_AWARD:
+            badge = await InboxService.from_pubkey(pubkey_hex).enrich_new_award(event)
+            return {"type": "badge_award", "data": badge} if badge else None
+        if event.get("kind") == KIND_BADGE_REQUEST:
+            request = await RequestService.from_pubkey(pubkey_hex)._enrich_incoming_request(event)
+            return {"type": "badge_request", "data": request} if request else None
+        return None
+
+
+# Process-wide feed (streams are served by /inbox/events)
+inbox_feed = InboxFeed()
@@ -0,0 +1,318 @@
+"""
+Background Jobs - Persistent job queue for long-running publish operations
+
+Write endpoints called with ?background=true enqueue their work here and
+return a job id at once. Worker tasks run the jobs; job state (status,
+per-relay publish progress, result) is stored in SQLite so it can be polled
+or streamed after the original request has ended.
+
+Only job state is persisted. The work itself stays in memory because it
+may hold the caller's private key, so jobs that were queued or running
+when the server stopped are marked as interrupted on the next start.
+"""
+
+import asyncio
+import json
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from .models.responses import JobAcceptedResponse
+
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "common"))
+
+from relay_manager import publish_observer, publish_policy
+
+FINISHED_STATES = ("succeeded", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    progress TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT
+)
+"""
+
+_COLUMNS = ("id", "kind", "status", "created_at", "started_at", "finished_at", "progress", "result", "error")
+
+
+class JobQueue:
+    """SQLite-backed job registry with in-process worker tasks"""
+
+    def __init__(self):
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._runners: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._policies: Dict[str, Any] = {}
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        # Latest unsaved state per job, written in batches off the event loop
+        self._dirty: Dict[str, tuple] = {}
+        self._dirty_event: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    # =========================================================================
+    # Lifecycle
+    # =========================================================================
+
+    def open(self, db_path: Path, retention_hours: float = 24) -> None:
+        """Open the job database, expire old jobs and fail jobs cut off by a restart"""
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - retention_hours * 3600,)
+            )
+            interrupted = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = 'Interrupted by server restart' "
+                "WHERE status IN ('queued', 'running')",
+                (time.time(),)
+            ).rowcount
+        if interrupted:
+            print(f"⚠️ Marked {interrupted} unfinished job(s) as interrupted")
+
+    async def start(self, workers: int = 2) -> None:
+        self._queue = asyncio.Queue()
+        self._dirty_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher = asyncio.create_task(self._flush_loop())
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(workers)]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+            await self._flush()
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    # =========================================================================
+    # Submitting and reading jobs
+    # =========================================================================
+
+    async def submit(self, kind: str, runner: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        """Queue `runner` (a zero-argument coroutine function) and return the new job"""
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "progress": {"events": {}},
+            "result": None,
+            "error": None,
+        }
+        self._active[job["id"]] = job
+        self._runners[job["id"]] = runner
+        # Publish with the verification policy of the submitting request
+        self._policies[job["id"]] = publish_policy.get()
+        self._changed(job)
+        await self._flush()
+        await self._queue.put(job["id"])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if job_id in self._active:
+            return dict(self._active[job_id])
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._from_row(r) for r in rows]
+
+    async def subscribe(self, job_id: str, keepalive: float = 15) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield the job on every change until it finishes
+
+        Yields None after `keepalive` seconds without changes so that
+        streaming responses can send a heartbeat.
+        """
+        # Register before taking the snapshot so no update in between is lost
+        updates: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(updates)
+        try:
+            job = self.get(job_id)
+            if job is None:
+                return
+            yield job
+            if job["status"] in FINISHED_STATES:
+                return
+            while True:
+                try:
+                    job = await asyncio.wait_for(updates.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield job
+                if job["status"] in FINISHED_STATES:
+                    return
+        finally:
+            self._subscribers[job_id].remove(updates)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+
+    # =========================================================================
+    # Workers
+    # =========================================================================
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id, index)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep the worker alive for the jobs behind this one
+                print(f"❌ Worker {index} could not run job {job_id[:8]}: {e}")
+            finally:
+                self._active.pop(job_id, None)
+                self._runners.pop(job_id, None)
+                self._policies.pop(job_id, None)
+
+    async def _run(self, job_id: str, index: int) -> None:
+        job = self._active[job_id]
+        runner = self._runners.pop(job_id)
+        policy_token = publish_policy.set(self._policies.pop(job_id))
+
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        self._changed(job)
+        print(f"⚙️ Job {job_id[:8]} ({job['kind']}) started on worker {index}")
+
+        token = publish_observer.set(lambda event, result: self._record_publish(job, event, result))
+        try:
+            result = jsonable_encoder(await runner())
+            job["result"] = result
+            succeeded = not (isinstance(result, dict) and result.get("success") is False)
+            job["status"] = "succeeded" if succeeded else "failed"
+            if not succeeded:
+                job["error"] = result.get("error")
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = getattr(e, "detail", None) or str(e)
+            print(f"❌ Job {job_id[:8]} failed: {job['error']}")
+        finally:
+            publish_observer.reset(token)
+            publish_policy.reset(policy_token)
+
+        job["finished_at"] = time.time()
+        self._changed(job)
+        # Stored before the job leaves _active and get() reads it from the database
+        await self._flush()
+        print(f"⚙️ Job {job_id[:8]} {job['status']} in {job['finished_at'] - job['started_at']:.1f}s")
+
+    def _record_publish(self, job: Dict[str, Any], event: Dict[str, Any], result: Any) -> None:
+        """Publish observer: track per-relay OK/verified state for each event of the job"""
+        entry = job["progress"]["events"].setdefault(event.get("id"), {"kind": event.get("kind"), "relays": {}})
+        entry["relays"][result.relay] = {
+            "published": result.published,
+            "verified": result.verified,
+            "verification": result.verification,
+            "error": result.error,
+        }
+        self._changed(job)
+
+    # =========================================================================
+    # Persistence
+    # =========================================================================
+
+    def _changed(self, job: Dict[str, Any]) -> None:
+        """Notify subscribers now and queue the job to be saved by the flusher"""
+        values = dict(job)
+        values["progress"] = json.dumps(job["progress"])
+        values["result"] = json.dumps(job["result"]) if job["result"] is not None else None
+        self._dirty[job["id"]] = tuple(values[c] for c in _COLUMNS)
+        if self._dirty_event is not None:
+            self._dirty_event.set()
+        snapshot = json.loads(json.dumps(job))
+        for updates in self._subscribers.get(job["id"], []):
+            updates.put_nowait(snapshot)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._dirty_event.wait()
+            await self._flush()
+
+    async def _flush(self) -> None:
+        """Write every pending job state in one transaction on a worker thread"""
+        async with self._flush_lock:
+            self._dirty_event.clear()
+            rows, self._dirty = self._dirty, {}
+            if not rows:
+                return
+            try:
+                await asyncio.to_thread(self._save, list(rows.values()))
+            except sqlite3.Error as e:
+                # Subscribers still got the updates; retry with the next change unless a newer one is queued
+                print(f"⚠️ Could not save {len(rows)} job(s): {e}")
+                self._dirty = {**rows, **self._dirty}
+
+    def _save(self, rows: List[tuple]) -> None:
+        if self._conn is None:
+            # Closed by stop()
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                rows
+            )
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = {c: row[c] for c in _COLUMNS}
+        job["progress"] = json.loads(job["progress"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+def accepted_response(job: Dict[str, Any]) -> JSONResponse:
+    """202 response pointing the client at the job status endpoints"""
+    accepted = JobAcceptedResponse(
+        job_id=job["id"],
+        status=job["status"],
+        status_url=f"/api/v1/jobs/{job['id']}",
+        events_url=f"/api/v1/jobs/{job['id']}/events"
+    )
+    return JSONResponse(status_code=202, content=accepted.model_dump())
+
+
+# Process-wide job queue (opened and started by the API lifespan)
+job_queue = JobQueue()
@@ -0,0 +1,162 @@
+"""
+Event Loop Monitor - Scheduling lag sampling and blocking-call detection
+
+A heartbeat task measures how late the event loop wakes it up (lag).
+A watchdog thread notices when the heartbeat stalls for longer than the
+block threshold and, in debug mode, captures the stack of the loop thread
+while it is still blocked, which points at the offending callback.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "common"))
+
+from metrics import REGISTRY
+
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "event_loop_lag_seconds",
+    "Delay between a heartbeat's scheduled and actual wake-up time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+LOOP_LAG_MAX_SECONDS = REGISTRY.gauge(
+    "event_loop_lag_max_seconds",
+    "Largest event loop lag seen in the last sampling window"
+)
+LOOP_BLOCKED_TOTAL = REGISTRY.counter(
+    "event_loop_blocked_total",
+    "Times the event loop was blocked longer than the block threshold"
+)
+
+
+class LoopLagMonitor:
+    """Samples event loop lag and reports callbacks that block the loop"""
+
+    def __init__(
+        self,
+        interval: float = 0.05,
+        block_threshold: float = 0.1,
+        capture_stacks: bool = False,
+        max_reports: int = 50
+    ):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.capture_stacks = capture_stacks
+        self.reports: Deque[Dict[str, Any]] = deque(maxlen=max_reports)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._open_report: Optional[Dict[str, Any]] = None
+        self._window_max = 0.0
+        self._window_started = time.monotonic()
+
+    # =========================================================================
+    # Lifecycle
+    # =========================================================================
+
+    def start(self) -> None:
+        """Start sampling on the running loop (call from within the loop)"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._last_beat = time.monotonic()
+        self._task = self._loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # =========================================================================
+    # Sampling
+    # =========================================================================
+
+    async def _heartbeat(self) -> None:
+        while not self._stopping.is_set():
+            scheduled = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - scheduled - self.interval)
+
+            LOOP_LAG_SECONDS.observe(lag)
+            with self._lock:
+                self._last_beat = now
+                self._window_max = max(self._window_max, lag)
+                if now - self._window_started >= 10:
+                    LOOP_LAG_MAX_SECONDS.set(self._window_max)
+                    self._window_max = 0.0
+                    self._window_started = now
+                if self._open_report is not None:
+                    # The stall is over: record how long it actually lasted
+                    self._open_report["blocked_ms"] = round(lag * 1000, 1)
+                    self._open_report = None
+
+    def _watch(self) -> None:
+        """Watchdog thread: detect a stalled heartbeat and snapshot the loop thread"""
+        while not self._stopping.wait(self.interval):
+            with self._lock:
+                stalled_for = time.monotonic() - self._last_beat - self.interval
+                if stalled_for < self.block_threshold or self._open_report is not None:
+                    continue
+
+                report: Dict[str, Any] = {
+                    "timestamp": int(time.time()),
+                    "blocked_ms": round(stalled_for * 1000, 1),
+                    "stack": None,
+                }
+                self._open_report = report
+                self.reports.append(report)
+
+            # Snapshot outside the lock so the loop is not held up when it resumes
+            if self.capture_stacks:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    report["stack"] = traceback.format_stack(frame)
+
+            LOOP_BLOCKED_TOTAL.inc()
+            if self.capture_stacks and report["stack"]:
+                print(
+                    f"⚠️ Event loop blocked for >{report['blocked_ms']:.0f}ms in:\n"
+                    + "".join(report["stack"][-6:])
+                )
+
+    # =========================================================================
+    # Reporting
+    # =========================================================================
+
+    def get_status(self, limit: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            reports: List[Dict[str, Any]] = list(self.reports)[-limit:]
+            window_max = self._window_max
+        return {
+            "running": self._task is not None,
+            "interval_ms": round(self.interval * 1000, 1),
+            "block_threshold_ms": round(self.block_threshold * 1000, 1),
+            "capture_stacks": self.capture_stacks,
+            "current_window_max_lag_ms": round(window_max * 1000, 1),
+            "blocked_total": int(LOOP_BLOCKED_TOTAL.get()),
+            "recent_blocks": list(reversed(reports)),
+        }
+
+
+# Process-wide monitor (started by the API lifespan)
+loop_monitor = LoopLagMonitor()
@@ -2,19 +2,120 @@
 Nostr Badges API - Main FastAPI Application
 """
 
+import asyncio
+import json
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
+from .inbox_feed import inbox_feed
+from .jobs import job_queue
+from .loop_monitor import loop_monitor
+from .surf_feed import surf_feed
+from .middleware import (
+    metrics_middleware,
+    profiling_middleware,
+    publish_policy_middleware,
+    relay_accounting_middleware,
+    tracing_middleware
+)
 from .routers import (
+    admin_router,
     auth_router,
     badges_router,
     inbox_router,
+    jobs_router,
+    metrics_router,
     profile_router,
     relays_router,
     requests_router,
     surf_router
 )
 
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "common"))
+
+from event_store import EVENT_STORE
+from outbox import OUTBOX
+from relay_capabilities import RELAY_CAPABILITIES, static_fetcher
+from slow_query_log import SLOW_QUERY_LOG
+from sync_engine import SYNC_ENGINE
+from tracing import TRACE_EXPORTER
+
+SLOW_QUERY_LOG.configure(
+    threshold_ms=settings.slow_query_threshold_ms,
+    window_seconds=settings.slow_query_window_seconds,
+    log_to_stdout=settings.debug
+)
+TRACE_EXPORTER.configure(
+    enabled=settings.tracing_enabled,
+    export_path=settings.trace_export_path,
+    max_traces=settings.trace_buffer_size
+)
+RELAY_CAPABILITIES.configure(
+    ttl=settings.relay_info_ttl_seconds,
+    error_ttl=settings.relay_info_error_ttl_seconds
+)
+if settings.relay_info_file:
+    with open(settings.relay_info_file, "r") as f:
+        RELAY_CAPABILITIES.configure(fetcher=static_fetcher(json.load(f)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background monitors, job workers, outbox retries and event sync"""
+    if settings.loop_monitor_enabled:
+        loop_monitor.interval = settings.loop_monitor_interval_ms / 1000
+        loop_monitor.block_threshold = settings.loop_block_threshold_ms / 1000
+        loop_monitor.capture_stacks = settings.debug
+        loop_monitor.start()
+
+    # Warm the relay capability cache without delaying startup
+    capabilities_task = asyncio.create_task(RELAY_CAPABILITIES.prefetch(settings.relay_urls))
+
+    job_queue.open(settings.jobs_db_path, retention_hours=settings.job_retention_hours)
+    await job_queue.start(workers=settings.job_workers)
+
+    outbox_task = None
+    if settings.outbox_enabled:
+        OUTBOX.open(
+            settings.outbox_db_path,
+            max_age=settings.outbox_max_age_hours * 3600,
+            max_attempts=settings.outbox_max_attempts,
+            base_delay=settings.outbox_base_delay_seconds,
+            max_delay=settings.outbox_max_delay_seconds
+        )
+        outbox_task = asyncio.create_task(OUTBOX.run(settings.outbox_poll_interval_seconds))
+
+    sync_task = None
+    if settings.event_store_enabled:
+        EVENT_STORE.open(settings.event_store_db_path)
+        SYNC_ENGINE.configure(
+            relays=settings.relay_urls[:settings.sync_max_relays],
+            max_targets=settings.sync_max_targets
+        )
+        sync_task = asyncio.create_task(SYNC_ENGINE.run(settings.sync_interval_seconds))
+
+    yield
+
+    if sync_task:
+        sync_task.cancel()
+        await asyncio.gather(sync_task, return_exceptions=True)
+        EVENT_STORE.close()
+    if outbox_task:
+        outbox_task.cancel()
+        await asyncio.gather(outbox_task, return_exceptions=True)
+        OUTBOX.close()
+    capabilities_task.cancel()
+    await inbox_feed.close()
+    await surf_feed.close()
+    await job_queue.stop()
+    await loop_monitor.stop()
+
+
 # Create FastAPI application
 app = FastAPI(
     title=settings.app_name,
@@ -35,7 +136,8 @@ app = FastAPI(
     The private key is never stored - it's only used for signing events.
     """,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -45,17 +147,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Complete", "X-Stale", "Age"],
 )
 
+# Request instrumentation
+app.middleware("http")(publish_policy_middleware)
+app.middleware("http")(relay_accounting_middleware)
+app.middleware("http")(metrics_middleware)
+app.middleware("http")(tracing_middleware)
+app.middleware("http")(profiling_middleware)
+
 # Include routers
+app.include_router(admin_router, prefix="/api/v1")
 app.include_router(auth_router, prefix="/api/v1")
 app.include_router(badges_router, prefix="/api/v1")
 app.include_router(inbox_router, prefix="/api/v1")
+app.include_router(jobs_router, prefix="/api/v1")
 app.include_router(profile_router, prefix="/api/v1")
 app.include_router(relays_router, prefix="/api/v1")
 app.include_router(requests_router, prefix="/api/v1")
 app.include_router(surf_router, prefix="/api/v1")
 
+# Prometheus scrape endpoint (served at the root, like /health)
+app.include_router(metrics_router)
+
 
 @app.get("/")
 async def root():
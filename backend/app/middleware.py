@@ -0,0 +1,158 @@
+"""
+HTTP Middleware - Request instrumentation for the API
+"""
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "common"))
+
+from metrics import HTTP_REQUEST_SECONDS, HTTP_REQUEST_RELAY_REQS
+import relay_accounting
+import tracing
+from relay_manager import PublishPolicy, publish_policy
+from .config import settings
+from .profiler import start_session, finish_session
+
+
+def _route_label(request: Request) -> str:
+    """Route template (e.g. /api/v1/profile/{pubkey}) to keep label cardinality low"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+async def metrics_middleware(request: Request, call_next):
+    """Record per-endpoint request latency"""
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=_route_label(request),
+            status=str(status_code)
+        )
+
+
+async def relay_accounting_middleware(request: Request, call_next):
+    """
+    Count relay round trips per API request (N+1 detector)
+
+    Adds a Server-Timing header with relay connections, REQs, events and
+    summed relay wait time. Warns when a request exceeds the configured
+    REQ threshold and logs a JSON line per request in debug mode.
+    """
+    account = relay_accounting.start_account()
+    response = await call_next(request)
+
+    route = _route_label(request)
+    HTTP_REQUEST_RELAY_REQS.observe(account.reqs, route=route)
+    response.headers["Server-Timing"] = account.server_timing()
+
+    if account.reqs > settings.relay_fanout_warn_threshold:
+        print(
+            f"⚠️ Relay fan-out: {request.method} {route} issued {account.reqs} REQs "
+            f"over {account.connections} connections "
+            f"(threshold {settings.relay_fanout_warn_threshold})"
+        )
+
+    if settings.debug:
+        print(json.dumps({
+            "event": "relay_accounting",
+            "method": request.method,
+            "route": route,
+            "status": response.status_code,
+            **account.to_dict()
+        }))
+
+    return response
+
+
+async def tracing_middleware(request: Request, call_next):
+    """
+    Trace each API request as a root span
+
+    Service methods and relay REQs called while handling the request record
+    child spans. The trace id is returned in the X-Trace-Id header.
+    """
+    with tracing.trace(f"{request.method} {request.url.path}", method=request.method) as root:
+        response = await call_next(request)
+        if root:
+            root.name = f"{request.method} {_route_label(request)}"
+            root.set(path=request.url.path, status=response.status_code)
+            response.headers["X-Trace-Id"] = root.trace_id
+        return response
+
+
+async def profiling_middleware(request: Request, call_next):
+    """
+    Profile a single request when the X-Profile header is present (debug only)
+
+    X-Profile: 1 stores a collapsed-stack profile under backend/data/profiles
+    and names it in the X-Profile-File response header. X-Profile: download
+    returns the profile itself as an attachment instead of the response.
+    """
+    mode = request.headers.get("x-profile")
+    if not settings.debug or not mode:
+        return await call_next(request)
+
+    session = start_session(settings.profile_sample_interval_ms / 1000)
+    try:
+        response = await call_next(request)
+    finally:
+        finish_session(session)
+
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_")[:80] or "root"
+    filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method.lower()}-{slug}.folded"
+    profile = session.collapsed()
+    summary = session.summary()
+    print(
+        f"🔬 Profiled {request.method} {request.url.path}: "
+        f"{summary['samples']} samples over {summary['duration_ms']:.0f}ms"
+    )
+
+    if mode.lower() == "download":
+        return Response(
+            content=profile,
+            media_type="text/plain",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    (settings.profiles_path / filename).write_text(profile)
+    response.headers["X-Profile-File"] = filename
+    response.headers["X-Profile-Samples"] = str(summary["samples"])
+    return response
+
+
+async def publish_policy_middleware(request: Request, call_next):
+    """
+    Choose how relay publishes are verified during this request
+
+    The X-Publish-Verification header ("inline", "sampled", "deferred" or
+    "off", optionally with an OK quorum as in "deferred:1") overrides the
+    per-endpoint setting in PUBLISH_VERIFICATION_ROUTES, which overrides
+    PUBLISH_VERIFICATION.
+    """
+    path = request.url.path.removeprefix("/api/v1")
+    spec = settings.publish_verification_routes.get(path, settings.publish_verification)
+    header = request.headers.get("x-publish-verification")
+    try:
+        policy = PublishPolicy.parse(header or spec, sample_size=settings.publish_verification_sample_size)
+    except ValueError as e:
+        if not header:
+            raise
+        return JSONResponse(status_code=400, content={"detail": f"Invalid X-Publish-Verification header: {e}"})
+
+    publish_policy.set(policy)
+    return await call_next(request)
@@ -107,6 +107,21 @@ class AwardBadgeRequest(BaseModel):
     )
 
 
+class BulkAwardRequest(BaseModel):
+    """Request to award a badge to a large list of recipients (nsec only)
+
+    Recipients are split into several award events of at most chunk_size p-tags.
+    """
+    a_tag: str = Field(..., description="Badge definition A-tag (30009:pubkey:identifier)")
+    recipients: List[str] = Field(..., description="List of recipient pubkeys (npub or hex)", min_length=1)
+    chunk_size: Optional[int] = Field(
+        None,
+        description="Recipients per award event (defaults to AWARD_CHUNK_SIZE)",
+        ge=1,
+        le=1000
+    )
+
+
 class CreateAndAwardRequest(BaseModel):
     """Request to create badge definition and award in one call
 
@@ -65,11 +65,76 @@ class AwardBadgeResponse(BaseModel):
     """Response for badge award"""
     success: bool
     award_event_id: Optional[str] = None
+    award_event_ids: List[str] = []
     recipients_count: int = 0
     verified_relays: int = 0
     error: Optional[str] = None
 
 
+class AwardChunkRelayResponse(BaseModel):
+    """Relay outcome for one award event of a bulk award"""
+    relay: str
+    published: bool = False
+    verified: bool = False
+    error: Optional[str] = None
+
+
+class AwardChunkResponse(BaseModel):
+    """One award event (chunk of recipients) of a bulk award"""
+    index: int
+    recipients: int
+    event_id: Optional[str] = None
+    status: str
+    attempts: int = 0
+    published_relays: int = 0
+    relays: List[AwardChunkRelayResponse] = []
+    error: Optional[str] = None
+
+
+class InvalidRecipientResponse(BaseModel):
+    """A recipient that could not be normalized to a hex pubkey"""
+    input: Optional[str] = None
+    error: str
+
+
+class BulkAwardResponse(BaseModel):
+    """Response for a bulk (chunked) badge award"""
+    success: bool
+    status: str
+    recipients_count: int = 0
+    recipients_published: int = 0
+    total_chunks: int = 0
+    published_chunks: int = 0
+    failed_chunks: int = 0
+    award_event_ids: List[str] = []
+    invalid_count: int = 0
+    invalid_recipients: List[InvalidRecipientResponse] = []
+    chunks: List[AwardChunkResponse] = []
+    error: Optional[str] = None
+
+
+class InvalidRecipientRowResponse(BaseModel):
+    """A row of an uploaded recipient file that failed validation"""
+    line: int
+    input: Optional[str] = None
+    error: str
+
+
+class RecipientImportReportResponse(BaseModel):
+    """Validation summary of an uploaded recipient file"""
+    format: Optional[str] = None
+    rows: int = 0
+    valid: int = 0
+    invalid: int = 0
+    invalid_rows: List[InvalidRecipientRowResponse] = []
+    invalid_rows_truncated: bool = False
+
+
+class BulkAwardUploadResponse(BulkAwardResponse):
+    """Response for a bulk award from an uploaded recipient file"""
+    import_report: Optional[RecipientImportReportResponse] = None
+
+
 class DeleteBadgeResponse(BaseModel):
     """Response for badge deletion (NIP-09)"""
     success: bool
@@ -112,6 +177,7 @@ class AcceptBadgeResultResponse(BaseModel):
     profile_event_id: Optional[str] = None
     total_badges: int = 0
     verified_relays: int = 0
+    retrying_relays: List[str] = []  # relays the outbox keeps retrying in the background
     error: Optional[str] = None
 
 
@@ -129,6 +195,60 @@ class RelayStatusResponse(BaseModel):
     status: str  # "configured"
 
 
+class RelayCapabilitiesResponse(BaseModel):
+    """Response for a relay's NIP-11 capabilities"""
+    relay: str
+    supported_nips: List[int] = []
+    max_filters: Optional[int] = None
+    max_limit: Optional[int] = None
+    max_message_length: Optional[int] = None
+    max_subscriptions: Optional[int] = None
+    name: Optional[str] = None
+    software: Optional[str] = None
+    fetched_at: float
+    error: Optional[str] = None
+
+
+class JobAcceptedResponse(BaseModel):
+    """Response for a write queued with ?background=true (HTTP 202)"""
+    job_id: str
+    status: str  # "queued"
+    status_url: str
+    events_url: str
+
+
+class JobRelayStatusResponse(BaseModel):
+    """Publish outcome of one job event on one relay"""
+    published: bool = False
+    verified: bool = False
+    verification: Optional[str] = None  # inline, deferred, failed or skipped
+    error: Optional[str] = None
+
+
+class JobEventProgressResponse(BaseModel):
+    """Per-relay state of one event published by a job"""
+    kind: Optional[int] = None
+    relays: Dict[str, JobRelayStatusResponse] = {}
+
+
+class JobProgressResponse(BaseModel):
+    """Progress of a background job, keyed by event id"""
+    events: Dict[str, JobEventProgressResponse] = {}
+
+
+class JobResponse(BaseModel):
+    """Response for a background job"""
+    id: str
+    kind: str
+    status: str  # "queued", "running", "succeeded" or "failed"
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: JobProgressResponse = JobProgressResponse()
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
 class ErrorResponse(BaseModel):
     """Standard error response"""
     success: bool = False
@@ -0,0 +1,272 @@
+"""
+Keyset Pagination - Opaque cursors for event lists merged from several relays
+
+Events are ordered newest first, ties broken by event id, so every event
+has a unique sort key (created_at, id). A cursor records the key of the
+last event returned plus, per relay, where that relay's stream was left:
+the `until` timestamp of its next REQ and how many of its events at that
+second were already consumed. Each page costs one REQ per relay that is
+not exhausted, and the heap-based merge never returns an event past the
+last event a relay sent, nor past the position of a relay that failed to
+answer, so pages do not repeat events and do not skip events because a
+relay was slow for a moment. A relay that fails MAX_RELAY_FAILURES pages
+in a row, or fails before it ever answered, is given up: later pages
+leave out its events and report themselves as incomplete.
+
+One case does lose events: a relay whose full answer holds only events
+already returned (more than its max_limit events share one second) is
+stepped below that second, so its events at that second beyond the
+first max_limit are never returned.
+"""
+
+import asyncio
+import base64
+import hashlib
+import heapq
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "common"))
+
+from filter_planner import FilterPlan
+from relay_capabilities import RELAY_CAPABILITIES
+from relay_manager import RelayQueryIncomplete, query_relay_filters
+
+CURSOR_VERSION = 1
+
+# Pages in a row a relay may fail before pagination goes on without it
+MAX_RELAY_FAILURES = 3
+
+Key = Tuple[int, str]
+
+
+class InvalidCursor(ValueError):
+    """Cursor could not be decoded or belongs to a different relay set"""
+
+
+def event_key(event: Dict[str, Any]) -> Key:
+    """Sort key for newest-first order (ascending key = newer event)"""
+    return -event.get("created_at", 0), event.get("id", "")
+
+
+def relay_set_hash(relays: List[str]) -> str:
+    return hashlib.sha256("\n".join(relays).encode()).hexdigest()[:12]
+
+
+@dataclass
+class RelayPosition:
+    """Where one relay's newest-first stream resumes"""
+    until: Optional[int] = None  # created_at bound of the next REQ (None = from the newest)
+    skip: int = 0  # events at `until` already consumed from this relay
+    exhausted: bool = False
+    failures: int = 0  # pages in a row this relay failed to answer
+    gave_up: bool = False  # exhausted because it kept failing, not because it ran out
+
+
+@dataclass
+class Cursor:
+    """Pagination state between pages"""
+    relays_hash: str
+    last_key: Optional[Key] = None  # key of the last event returned
+    positions: Dict[int, RelayPosition] = field(default_factory=dict)
+
+    @classmethod
+    def start(cls, relays: List[str], until: Optional[int] = None) -> "Cursor":
+        """Cursor for the first page, optionally starting BEFORE `until`"""
+        cursor = cls(relays_hash=relay_set_hash(relays))
+        for index in range(len(relays)):
+            cursor.position(index).until = until
+        return cursor
+
+    def position(self, index: int) -> RelayPosition:
+        return self.positions.setdefault(index, RelayPosition())
+
+    def encode(self) -> str:
+        payload = {
+            "v": CURSOR_VERSION,
+            "h": self.relays_hash,
+            "k": list(self.last_key) if self.last_key else None,
+            "r": {
+                str(i): None if p.exhausted else [p.until, p.skip] + ([p.failures] if p.failures else [])
+                for i, p in self.positions.items()
+            },
+        }
+        gave_up = sorted(i for i, p in self.positions.items() if p.gave_up)
+        if gave_up:
+            payload["g"] = gave_up
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str, relays: List[str]) -> "Cursor":
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            if payload.get("v") != CURSOR_VERSION:
+                raise InvalidCursor("Unsupported cursor version")
+            positions = {}
+            for index, position in payload.get("r", {}).items():
+                if position is None:
+                    positions[int(index)] = RelayPosition(exhausted=True)
+                else:
+                    until, skip, *failures = position
+                    positions[int(index)] = RelayPosition(
+                        until=int(until) if until is not None else None,
+                        skip=int(skip),
+                        failures=int(failures[0]) if failures else 0
+                    )
+            for index in payload.get("g", []):
+                positions[int(index)] = RelayPosition(exhausted=True, gave_up=True)
+            last_key = tuple(payload["k"]) if payload.get("k") else None
+            cursor = cls(relays_hash=payload["h"], last_key=last_key, positions=positions)
+        except InvalidCursor:
+            raise
+        except Exception:
+            raise InvalidCursor("Malformed cursor")
+        if cursor.relays_hash != relay_set_hash(relays):
+            raise InvalidCursor("Cursor was issued for a different relay configuration; start from the first page")
+        return cursor
+
+
+def merge_page(
+    cursor: Cursor,
+    relay_events: Dict[int, Optional[List[Dict[str, Any]]]],
+    requested: Dict[int, int],
+    limit: int
+) -> Tuple[List[Dict[str, Any]], bool, bool]:
+    """
+    k-way merge one page of relay results and advance the cursor in place
+
+    relay_events maps relay index to the events it returned for the REQ
+    built from its position (None if the relay failed this time; its
+    position is kept). requested maps relay index to the REQ limit, so a
+    shorter answer marks the relay as exhausted below that point.
+
+    A failed relay may still hold events anywhere below its position, so
+    the page stops before the second its position is at and those events
+    are returned once it answers. A relay without a position (it never
+    answered) or failing for the MAX_RELAY_FAILURES-th time in a row is
+    given up instead, so that one dead relay cannot hold back the rest.
+
+    Returns the page (deduplicated by id), whether more events may follow
+    and whether it is complete (False if a relay failed or was given up).
+    """
+    streams: Dict[int, List[Dict[str, Any]]] = {}
+    frontier: Dict[int, Key] = {}
+    blocked: Optional[Key] = None  # the page stops before this key
+    for index, events in relay_events.items():
+        position = cursor.position(index)
+        if events is None:
+            position.failures += 1
+            if position.until is None or position.failures >= MAX_RELAY_FAILURES:
+                position.exhausted = position.gave_up = True
+                continue
+            bound = (-position.until, "")
+            blocked = bound if blocked is None else min(blocked, bound)
+            continue
+        position.failures = 0
+        ordered = sorted((ev for ev in events if ev.get("id")), key=event_key)
+        if cursor.last_key is not None:
+            ordered = [ev for ev in ordered if event_key(ev) > tuple(cursor.last_key)]
+        if len(events) >= requested[index]:
+            if not ordered:
+                # A full answer of events already returned (more than a page share
+                # one second): step below that second and ask again next page
+                position.until = min(ev.get("created_at", 0) for ev in events) - 1
+                position.skip = 0
+                continue
+            # A full answer: events beyond the last one sent are unknown
+            frontier[index] = event_key(ordered[-1])
+        streams[index] = ordered
+
+    heap = [(event_key(stream[0]), index, 0) for index, stream in streams.items() if stream]
+    heapq.heapify(heap)
+    safe_until = min(frontier.values()) if frontier else None
+
+    page: List[Dict[str, Any]] = []
+    seen = set()
+    consumed: Dict[int, List[Dict[str, Any]]] = {index: [] for index in streams}
+    while heap and len(page) < limit:
+        key, index, offset = heap[0]
+        if (safe_until is not None and key > safe_until) or (blocked is not None and key >= blocked):
+            break
+        heapq.heappop(heap)
+        event = streams[index][offset]
+        consumed[index].append(event)
+        if offset + 1 < len(streams[index]):
+            heapq.heappush(heap, (event_key(streams[index][offset + 1]), index, offset + 1))
+        if event["id"] in seen:
+            continue
+        seen.add(event["id"])
+        page.append(event)
+
+    # Duplicates of the last event from other relays count as consumed too
+    while heap and page and heap[0][0] == event_key(page[-1]):
+        _, index, offset = heapq.heappop(heap)
+        consumed[index].append(streams[index][offset])
+        if offset + 1 < len(streams[index]):
+            heapq.heappush(heap, (event_key(streams[index][offset + 1]), index, offset + 1))
+
+    if page:
+        cursor.last_key = event_key(page[-1])
+    for index, stream in streams.items():
+        position = cursor.position(index)
+        taken = consumed[index]
+        if taken:
+            last_ts = taken[-1].get("created_at", 0)
+            at_last = sum(1 for ev in taken if ev.get("created_at", 0) == last_ts)
+            position.skip = (position.skip if position.until == last_ts else 0) + at_last
+            position.until = last_ts
+        elif stream and (position.until is None or position.until > stream[0].get("created_at", 0)):
+            # Nothing taken, but the relay has nothing newer than what it sent
+            position.until = stream[0].get("created_at", 0)
+            position.skip = 0
+        if index not in frontier and len(taken) == len(stream):
+            position.exhausted = True
+
+    has_more = bool(heap) or any(not p.exhausted for p in cursor.positions.values())
+    complete = blocked is None and not any(p.gave_up for p in cursor.positions.values())
+    return page, has_more, complete
+
+
+async def fetch_page(
+    relays: List[str],
+    filter_params: Dict[str, Any],
+    cursor: Cursor,
+    limit: int,
+    req_prefix: str = "page"
+) -> Tuple[List[Dict[str, Any]], bool, bool]:
+    """
+    Fetch and merge the next `limit` events of a filter from several relays
+
+    Relays are queried concurrently with one REQ each, built from their
+    cursor position; exhausted relays are not asked again. The cursor is
+    advanced in place. Returns the events newest first, whether more
+    events may follow and whether the page is complete (see merge_page).
+    """
+    requested: Dict[int, int] = {}
+
+    async def fetch(index: int, relay: str) -> Optional[List[Dict[str, Any]]]:
+        position = cursor.position(index)
+        plan = FilterPlan(RELAY_CAPABILITIES.cached(relay))
+        requested[index] = plan.effective_limit({"limit": limit + position.skip})
+        relay_filter = {**filter_params, "limit": requested[index]}
+        if position.until is not None:
+            relay_filter["until"] = position.until
+        try:
+            return await query_relay_filters(
+                relay, f"{req_prefix}_{index}", relay_filter, timeout=12, strict=True
+            )
+        except RelayQueryIncomplete:
+            # Keep this relay's position; it is asked again for the next page
+            return None
+
+    active = [
+        (index, relay) for index, relay in enumerate(relays)
+        if not cursor.position(index).exhausted
+    ]
+    results = await asyncio.gather(*(fetch(index, relay) for index, relay in active))
+    return merge_page(cursor, {index: result for (index, _), result in zip(active, results)}, requested, limit)
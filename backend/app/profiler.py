@@ -0,0 +1,160 @@
+"""
+Request Profiler - Task-aware sampling profiler for single API requests
+
+A sampler thread periodically walks the coroutine chain of every asyncio
+task spawned while handling the profiled request. Tasks that are awaiting
+are attributed to their await site, and the task currently running on the
+loop also gets its synchronous call stack. The result is a wall-clock
+profile in collapsed-stack format (one "frame;frame;... count" line per
+stack) that flamegraph.pl and speedscope can open directly.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from types import FrameType
+from typing import Any, Dict, List, Optional, Tuple
+
+# Session of the request being profiled; tasks created in this context belong to it
+_current_session: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def _await_label(awaitable: Any) -> str:
+    if isinstance(awaitable, asyncio.Task):
+        return f"[await task {awaitable.get_name()}]"
+    if awaitable is None:
+        return "[ready, waiting for loop]"
+    # Awaiting a bare Future shows up as its iterator
+    name = type(awaitable).__name__.replace("FutureIter", "Future")
+    return f"[await {name}]"
+
+
+def _coroutine_chain(coro: Any) -> Tuple[List[FrameType], Any]:
+    """Frames of a coroutine and everything it awaits, plus the innermost awaitable"""
+    frames: List[FrameType] = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        awaited = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+        if awaited is None or not any(hasattr(awaited, a) for a in ("cr_frame", "gi_frame", "ag_frame")):
+            return frames, awaited
+        coro = awaited
+    return frames, None
+
+
+class ProfileSession:
+    """Samples the tasks of one request until stopped"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._loop_thread_id = threading.get_ident()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._started = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                # Task and frame state changes under our feet; skip torn samples
+                continue
+
+    def _sample(self) -> None:
+        thread_frame = sys._current_frames().get(self._loop_thread_id)
+        running: List[FrameType] = []
+        while thread_frame is not None:
+            running.append(thread_frame)
+            thread_frame = thread_frame.f_back
+        running_ids = {id(f) for f in running}
+
+        for task in list(self.tasks):
+            if task.done():
+                continue
+            frames, awaited = _coroutine_chain(task.get_coro())
+            labels = [f"task {task.get_name()}"] + [_frame_label(f) for f in frames]
+
+            if frames and id(frames[-1]) in running_ids:
+                # This task is executing right now: add the synchronous frames below it
+                innermost = next(i for i, f in enumerate(running) if f is frames[-1])
+                labels += [_frame_label(f) for f in reversed(running[:innermost])]
+                labels.append("[running]")
+            else:
+                labels.append(_await_label(awaited))
+
+            self.stacks[";".join(labels)] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        """Render in collapsed-stack format, heaviest stacks first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "interval_ms": round(self.interval * 1000, 1),
+            "duration_ms": round(self.duration * 1000, 1),
+            "tasks": len({s.split(";", 1)[0] for s in self.stacks}),
+        }
+
+
+def _task_factory(previous):
+    """Wrap a loop's task factory so tasks spawned by a profiled request join its session"""
+    def factory(loop, coro, **kwargs):
+        if previous is not None:
+            task = previous(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        session = _current_session.get()
+        if session is not None:
+            session.tasks.add(task)
+        return task
+    factory._profiler = True
+    return factory
+
+
+def start_session(interval: float) -> ProfileSession:
+    """Begin profiling the current task and every task it spawns"""
+    loop = asyncio.get_running_loop()
+    current = loop.get_task_factory()
+    if not getattr(current, "_profiler", False):
+        loop.set_task_factory(_task_factory(current))
+
+    session = ProfileSession(interval=interval)
+    task = asyncio.current_task()
+    if task is not None:
+        session.tasks.add(task)
+    _current_session.set(session)
+    session.start()
+    return session
+
+
+def finish_session(session: ProfileSession) -> None:
+    session.stop()
+    _current_session.set(None)
@@ -2,9 +2,12 @@
 API Routers
 """
 
+from .admin import router as admin_router
 from .auth import router as auth_router
 from .badges import router as badges_router
 from .inbox import router as inbox_router
+from .jobs import router as jobs_router
+from .metrics import router as metrics_router
 from .profile import router as profile_router
 from .relays import router as relays_router
 from .requests import router as requests_router
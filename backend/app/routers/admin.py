@@ -0,0 +1,211 @@
+"""
+Admin Router - Operational diagnostics endpoints
+
+Protected by the X-Admin-Token header when ADMIN_TOKEN is configured.
+Without a token, these endpoints are only available in debug mode.
+"""
+
+import sys
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "common"))
+
+from outbox import OUTBOX
+from relay_health import RELAY_HEALTH
+from slow_query_log import SLOW_QUERY_LOG
+from sync_engine import SYNC_ENGINE
+from tracing import TRACE_EXPORTER, render_timeline, to_chrome_trace
+from ..config import settings
+from ..inbox_feed import inbox_feed
+from ..jobs import job_queue
+from ..loop_monitor import loop_monitor
+from ..surf_feed import surf_feed
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Allow access with a matching admin token, or in debug mode when no token is set"""
+    if settings.admin_token:
+        if x_admin_token != settings.admin_token:
+            raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token header")
+        return
+
+    if not settings.debug:
+        raise HTTPException(status_code=403, detail="Admin endpoints require ADMIN_TOKEN or debug mode")
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(default=20, ge=1, le=200),
+    window: Optional[int] = Query(default=None, ge=1, description="Rolling window in seconds")
+):
+    """
+    Relay slow-query log
+
+    Returns the filter shapes (e.g. `kinds=[8],#a=[*],limit=100`) that were
+    slowest to reach EOSE within the rolling window, with the relays that were
+    slow for each, plus the most recent slow queries.
+
+    Args:
+        limit: Maximum number of offenders and recent entries
+        window: Rolling window in seconds (defaults to SLOW_QUERY_WINDOW_SECONDS)
+    """
+    return {
+        "threshold_ms": SLOW_QUERY_LOG.threshold_ms,
+        "window_seconds": window or SLOW_QUERY_LOG.window_seconds,
+        "top_offenders": SLOW_QUERY_LOG.top_offenders(limit=limit, window_seconds=window),
+        "recent": SLOW_QUERY_LOG.recent(limit=limit, window_seconds=window)
+    }
+
+
+@router.get("/event-loop")
+async def get_event_loop_status(
+    limit: int = Query(default=20, ge=1, le=50)
+):
+    """
+    Event loop lag and blocking-call reports
+
+    Lists recent occasions where the event loop was blocked longer than
+    LOOP_BLOCK_THRESHOLD_MS. In debug mode each report carries the stack of
+    the blocking code, captured while the loop was stalled.
+
+    Args:
+        limit: Maximum number of block reports
+    """
+    return loop_monitor.get_status(limit=limit)
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """
+    List stored request profiles
+
+    Profiles are recorded by sending a request with the `X-Profile: 1`
+    header in debug mode. Files are in collapsed-stack format.
+    """
+    files = sorted(settings.profiles_path.glob("*.folded"), reverse=True)
+    return {
+        "profiles": [
+            {"name": f.name, "size": f.stat().st_size, "created_at": int(f.stat().st_mtime)}
+            for f in files
+        ]
+    }
+
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str):
+    """Download a stored request profile"""
+    path = settings.profiles_path / Path(name).name
+    if path.suffix != ".folded" or not path.is_file():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=path.name)
+
+
+@router.get("/traces")
+async def list_traces(
+    limit: int = Query(default=50, ge=1, le=500),
+    min_duration_ms: float = Query(default=0, ge=0)
+):
+    """
+    Recent request traces, newest first
+
+    Args:
+        limit: Maximum number of traces
+        min_duration_ms: Only list requests slower than this
+    """
+    return {"traces": TRACE_EXPORTER.recent(limit=limit, min_duration_ms=min_duration_ms)}
+
+
+@router.get("/traces/{trace_id}")
+async def get_trace(
+    trace_id: str,
+    format: str = Query(default="json", pattern="^(json|timeline|chrome)$")
+):
+    """
+    A single trace with all its spans
+
+    Formats:
+    - json: span list with parent ids and attributes
+    - timeline: plain-text waterfall of nested spans
+    - chrome: Chrome trace event JSON for chrome://tracing or Perfetto
+    """
+    trace = TRACE_EXPORTER.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+
+    if format == "timeline":
+        return PlainTextResponse(render_timeline(trace))
+    if format == "chrome":
+        return to_chrome_trace(trace)
+    return trace.to_dict()
+
+
+@router.get("/jobs")
+async def list_jobs(
+    limit: int = Query(default=50, ge=1, le=500)
+):
+    """
+    Recent background jobs, newest first
+
+    Args:
+        limit: Maximum number of jobs
+    """
+    return {"jobs": job_queue.recent(limit=limit)}
+
+
+@router.get("/relays/health")
+async def get_relay_health():
+    """
+    Per-relay health from recent connects
+
+    A relay is `down` after repeated connect failures and is skipped by
+    background retries until `retry_after` seconds have passed.
+    """
+    return {"relays": RELAY_HEALTH.snapshot()}
+
+
+@router.get("/outbox")
+async def get_outbox(
+    status: Optional[str] = Query(default=None, pattern="^(pending|delivered|rejected|expired)$"),
+    limit: int = Query(default=50, ge=1, le=500)
+):
+    """
+    Relay writes waiting for or finished with background retries
+
+    Args:
+        status: Only list deliveries in this state
+        limit: Maximum number of deliveries
+    """
+    return {
+        "enabled": OUTBOX.enabled,
+        "counts": OUTBOX.stats(),
+        "deliveries": OUTBOX.entries(status=status, limit=limit)
+    }
+
+
+@router.get("/sync")
+async def get_sync_status():
+    """Local event store contents, tracked sync targets and the last sync results"""
+    return await SYNC_ENGINE.snapshot()
+
+
+@router.post("/sync")
+async def run_sync():
+    """Sync all tracked targets now"""
+    if not SYNC_ENGINE.store.enabled:
+        raise HTTPException(status_code=409, detail="Event store is disabled (EVENT_STORE_ENABLED=false)")
+    results = await SYNC_ENGINE.sync()
+    return {"results": [r.to_dict() for r in results]}
+
+
+@router.get("/live-feeds")
+async def get_live_feeds():
+    """Clients and connected relays of /surf/live and of each user's /inbox/events (by pubkey prefix)"""
+    return {"surf": surf_feed.snapshot(), "inbox": inbox_feed.snapshot()}
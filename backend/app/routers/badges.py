@@ -7,11 +7,12 @@ Supports two authentication flows:
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, File, Form, HTTPException, Header, Query, Request, Response, UploadFile
 from ..models.requests import (
     CreateBadgeTemplateRequest,
     CreateBadgeDefinitionRequest,
     AwardBadgeRequest,
+    BulkAwardRequest,
     CreateAndAwardRequest,
     DeleteBadgeRequest
 )
@@ -19,6 +20,9 @@ from ..models.responses import (
     BadgeTemplateResponse,
     CreateDefinitionResponse,
     AwardBadgeResponse,
+    BulkAwardResponse,
+    BulkAwardUploadResponse,
+    RecipientImportReportResponse,
     DeleteBadgeResponse,
     ErrorResponse
 )
@@ -26,6 +30,8 @@ from ..services.badge_service import BadgeService
 from ..services.key_service import KeyService
 from ..services.profile_service import ProfileService
 from ..config import settings
+from ..http_cache import stale_if_error
+from ..jobs import accepted_response, job_queue
 
 router = APIRouter(prefix="/badges", tags=["Badges"])
 
@@ -337,16 +343,85 @@ async def award_badge(
     return AwardBadgeResponse(
         success=result.get("success", False),
         award_event_id=result.get("award_event_id"),
+        award_event_ids=result.get("award_event_ids", []),
         recipients_count=result.get("recipients_count", 0),
         verified_relays=result.get("verified_relays", 0),
         error=result.get("error")
     )
 
 
+@router.post("/award/bulk", response_model=BulkAwardResponse)
+async def award_badge_bulk(
+    request: BulkAwardRequest,
+    x_nsec: Optional[str] = Header(None)
+):
+    """
+    Award a badge to thousands of recipients (kind 8, chunked)
+
+    Recipients are normalized and split into several award events that are
+    signed in parallel and published concurrently, with per-event retry.
+    Invalid pubkeys are listed in the response instead of failing the award.
+
+    Requires X-Nsec: NIP-07 signers would have to sign every chunk.
+    """
+    nsec = get_nsec_from_header(x_nsec)
+    print(f"🏅 Bulk award: {len(request.recipients)} recipient(s)")
+
+    badge_service = BadgeService(nsec)
+    result = await badge_service.award_badge_bulk(
+        request.a_tag, request.recipients, chunk_size=request.chunk_size
+    )
+
+    return BulkAwardResponse(**result)
+
+
+@router.post("/recipients/validate", response_model=RecipientImportReportResponse)
+async def validate_recipient_file(file: UploadFile = File(...)):
+    """
+    Validate a CSV or JSONL recipient file without awarding
+
+    CSV: pubkey column named pubkey/npub/recipient/hex/public_key, or the
+    first column. JSONL: one object with such a key, or a JSON string, per
+    line. The file is parsed row by row; the first invalid rows are listed
+    with their line numbers.
+    """
+    try:
+        report = await BadgeService.validate_recipient_file(file.file, file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return RecipientImportReportResponse(**report)
+
+
+@router.post("/award/upload", response_model=BulkAwardUploadResponse)
+async def award_badge_from_file(
+    a_tag: str = Form(..., description="Badge definition A-tag (30009:pubkey:identifier)"),
+    chunk_size: Optional[int] = Form(None, ge=1, le=1000),
+    file: UploadFile = File(...),
+    x_nsec: Optional[str] = Header(None)
+):
+    """
+    Award a badge to all recipients in an uploaded CSV or JSONL file
+
+    Rows are validated and normalized as the file is read and fed into the
+    bulk award pipeline, so award events are published while the rest of
+    the file is still being parsed. Requires X-Nsec.
+    """
+    nsec = get_nsec_from_header(x_nsec)
+    print(f"🏅 Bulk award from file: {file.filename}")
+
+    badge_service = BadgeService(nsec)
+    result = await badge_service.award_badge_from_file(
+        a_tag, file.file, file.filename, chunk_size=chunk_size
+    )
+
+    return BulkAwardUploadResponse(**result)
+
+
 @router.post("/create-and-award")
 async def create_and_award(
     request: CreateAndAwardRequest,
-    x_nsec: Optional[str] = Header(None)
+    x_nsec: Optional[str] = Header(None),
+    background: bool = Query(False, description="Queue the publish and return a job id (HTTP 202)")
 ):
     """
     Create badge definition and award in one call
@@ -354,7 +429,19 @@ async def create_and_award(
     Supports two flows:
     - NIP-07: Include signed_definition_event and signed_award_event (no X-Nsec needed)
     - nsec: Omit signed events, include X-Nsec header (backend signs both)
+
+    With ?background=true the request is validated, queued and answered
+    with 202 and a job id; poll /api/v1/jobs/{job_id} for the result.
     """
+    if background:
+        if not (request.signed_definition_event and request.signed_award_event):
+            get_nsec_from_header(x_nsec)
+        job = await job_queue.submit(
+            "create-and-award",
+            lambda: create_and_award(request, x_nsec=x_nsec, background=False)
+        )
+        return accepted_response(job)
+
     # NIP-07 flow: both signed events provided
     if request.signed_definition_event and request.signed_award_event:
         print(f"🎯 NIP-07 flow: Publishing pre-signed definition and award")
@@ -450,7 +537,8 @@ async def get_badge_events_for_deletion(
 async def delete_badge(
     request: DeleteBadgeRequest,
     x_nsec: Optional[str] = Header(None),
-    x_pubkey: Optional[str] = Header(None)
+    x_pubkey: Optional[str] = Header(None),
+    background: bool = Query(False, description="Queue the publish and return a job id (HTTP 202)")
 ):
     """
     Delete an issued badge and all its awards (NIP-09 kind 5)
@@ -461,7 +549,19 @@ async def delete_badge(
     Supports two flows:
     - NIP-07: Include signed_event in request body (no X-Nsec header needed)
     - nsec: Omit signed_event, include X-Nsec header (backend signs)
+
+    With ?background=true the request is validated, queued and answered
+    with 202 and a job id; poll /api/v1/jobs/{job_id} for the result.
     """
+    if background:
+        if not request.signed_event:
+            get_nsec_from_header(x_nsec)
+        job = await job_queue.submit(
+            "delete",
+            lambda: delete_badge(request, x_nsec=x_nsec, x_pubkey=x_pubkey, background=False)
+        )
+        return accepted_response(job)
+
     # NIP-07 flow: pre-signed deletion event
     if request.signed_event:
         print(f"🗑️  NIP-07 flow: Publishing pre-signed deletion event")
@@ -496,6 +596,8 @@ async def delete_badge(
 
 @router.get("/owners")
 async def get_badge_owners(
+    request: Request,
+    response: Response,
     a_tag: str,
     limit: int = 50,
     include_profiles: bool = True
@@ -525,7 +627,9 @@ async def get_badge_owners(
         )
 
     profile_service = ProfileService()
-    result = await profile_service.get_badge_owners(a_tag, limit, include_profiles)
 
-    return result
+    async def build():
+        return await profile_service.get_badge_owners(a_tag, limit, include_profiles)
+
+    return await stale_if_error(request, response, build)
 
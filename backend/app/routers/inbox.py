@@ -6,8 +6,10 @@ Supports two authentication flows:
 - nsec: Use X-Nsec header for all operations (backend signs)
 """
 
+import json
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from ..models.requests import AcceptBadgeRequest, RemoveBadgeRequest
 from ..models.responses import (
     PendingBadgeResponse,
@@ -15,9 +17,13 @@ from ..models.responses import (
     AcceptBadgeResultResponse,
     RemoveBadgeResultResponse
 )
+from ..pagination import InvalidCursor
 from ..services.inbox_service import InboxService
 from ..services.key_service import KeyService
 from ..config import settings
+from ..http_cache import PRIVATE, conditional, stale_if_error
+from ..inbox_feed import FeedFull, inbox_feed
+from ..jobs import accepted_response, job_queue
 
 router = APIRouter(prefix="/inbox", tags=["Inbox"])
 
@@ -62,13 +68,20 @@ def get_auth_context(x_nsec: Optional[str], x_pubkey: Optional[str]) -> tuple:
 
 @router.get("/pending", response_model=List[PendingBadgeResponse])
 async def get_pending_badges(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of badges"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     x_nsec: Optional[str] = Header(None),
     x_pubkey: Optional[str] = Header(None)
 ):
     """
     Get pending (unaccepted) badges
 
-    Returns list of badges that have been awarded but not yet accepted.
+    Returns one page of badges that have been awarded but not yet accepted,
+    newest first. When more badges follow, the X-Next-Cursor response
+    header holds the cursor for the next page. X-Complete: false marks a
+    page that may miss badges because a relay failed or was given up.
     Supports both NIP-07 (X-Pubkey) and nsec (X-Nsec) authentication.
     """
     nsec, pubkey_hex, is_nip07 = get_auth_context(x_nsec, x_pubkey)
@@ -80,13 +93,69 @@ async def get_pending_badges(
         # nsec: Full service with signing capability
         inbox_service = InboxService(nsec)
 
-    pending = await inbox_service.get_pending_badges()
+    async def build():
+        try:
+            pending, next_cursor, complete = await inbox_service.get_pending_badges(limit=limit, cursor=cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if not complete:
+            response.headers["X-Complete"] = "false"
+        return [PendingBadgeResponse(**b) for b in pending]
 
-    return [PendingBadgeResponse(**b) for b in pending]
+    return await stale_if_error(request, response, build, vary="X-Pubkey, X-Nsec")
+
+
+@router.get("/events")
+async def stream_inbox(
+    pubkey: Optional[str] = Query(None, description="Recipient pubkey (hex), for EventSource clients"),
+    x_nsec: Optional[str] = Header(None),
+    x_pubkey: Optional[str] = Header(None)
+):
+    """
+    Stream new pending badges and badge requests as Server-Sent Events
+
+    Sends `badge_award` events (same fields as /inbox/pending) and
+    `badge_request` events (same fields as /requests/incoming) as they
+    reach the relays. All streams of one user share a single relay
+    subscription; a stream that falls too far behind gets a `dropped`
+    event and is closed. The pubkey may be given as ?pubkey= because
+    browsers cannot set headers on EventSource; only public data is
+    streamed. Returns 503 when INBOX_FEED_MAX_CHANNELS users are already
+    streaming or the pubkey has INBOX_FEED_MAX_STREAMS_PER_PUBKEY streams.
+    """
+    _, pubkey_hex, _ = get_auth_context(x_nsec, pubkey or x_pubkey)
+    pubkey_hex = pubkey_hex.lower()
+    try:
+        inbox_feed.admit(pubkey_hex)
+    except FeedFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, int(settings.live_feed_linger_seconds)))}
+        )
+
+    async def events():
+        yield "retry: 5000\n\n"
+        async for item in inbox_feed.subscribe(pubkey_hex):
+            if item is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {item['type']}\ndata: {json.dumps(item['data'])}\n\n"
+        yield "event: dropped\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/accepted", response_model=List[AcceptedBadgeResponse])
 async def get_accepted_badges(
+    request: Request,
+    response: Response,
     x_nsec: Optional[str] = Header(None),
     x_pubkey: Optional[str] = Header(None)
 ):
@@ -103,16 +172,26 @@ async def get_accepted_badges(
     else:
         inbox_service = InboxService(nsec)
 
-    accepted = await inbox_service.get_accepted_badges()
-
-    return [AcceptedBadgeResponse(**b) for b in accepted]
+    async def build():
+        accepted = await inbox_service.get_accepted_badges()
+        return [AcceptedBadgeResponse(**b) for b in accepted]
+
+    # Accepting or removing a badge replaces the user's profile badges event
+    return await conditional(
+        request, response,
+        [{"kinds": [30008], "authors": [pubkey_hex], "limit": 1}],
+        build,
+        cache_control=PRIVATE,
+        vary="X-Pubkey, X-Nsec"
+    )
 
 
 @router.post("/accept", response_model=AcceptBadgeResultResponse)
 async def accept_badge(
     request: AcceptBadgeRequest,
     x_nsec: Optional[str] = Header(None),
-    x_pubkey: Optional[str] = Header(None)
+    x_pubkey: Optional[str] = Header(None),
+    background: bool = Query(False, description="Queue the publish and return a job id (HTTP 202)")
 ):
     """
     Accept a badge
@@ -122,7 +201,19 @@ async def accept_badge(
     Supports two flows:
     - NIP-07: Include signed_event in request body (profile badges event)
     - nsec: Omit signed_event, include X-Nsec header (backend signs)
+
+    With ?background=true the request is validated, queued and answered
+    with 202 and a job id; poll /api/v1/jobs/{job_id} for the result.
     """
+    if background:
+        if not request.signed_event:
+            get_nsec_from_header(x_nsec)
+        job = await job_queue.submit(
+            "accept",
+            lambda: accept_badge(request, x_nsec=x_nsec, x_pubkey=x_pubkey, background=False)
+        )
+        return accepted_response(job)
+
     print(f"📥 Accept badge request: a_tag={request.a_tag}, has_signed_event={request.signed_event is not None}")
     print(f"   Headers: X-Nsec={'present' if x_nsec else 'missing'}, X-Pubkey={'present' if x_pubkey else 'missing'}")
 
@@ -164,6 +255,7 @@ async def accept_badge(
         profile_event_id=result.get("profile_event_id"),
         total_badges=result.get("total_badges", 0),
         verified_relays=result.get("verified_relays", 0),
+        retrying_relays=result.get("retrying_relays", []),
         error=result.get("error")
     )
 
@@ -0,0 +1,56 @@
+"""
+Jobs Router - Status of background publish jobs
+
+Write endpoints called with ?background=true answer 202 with a job id.
+The job id is random and acts as the access key for its status.
+"""
+
+import json
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from ..jobs import job_queue
+from ..models.responses import JobResponse
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Job status, per-relay progress and result
+
+    `status` is queued, running, succeeded or failed. `progress.events`
+    lists every event the job published with the outcome on each relay,
+    updated as relays answer. `result` holds the same body the endpoint
+    would have returned without ?background=true.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/events")
+async def stream_job(job_id: str):
+    """
+    Stream job updates as Server-Sent Events
+
+    Sends the full job on every change and closes after it finishes.
+    """
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async for job in job_queue.subscribe(job_id):
+            if job is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
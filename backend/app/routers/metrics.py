@@ -0,0 +1,31 @@
+"""
+Metrics Router - Prometheus scrape endpoint
+"""
+
+import sys
+from pathlib import Path
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "common"))
+
+from metrics import REGISTRY
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics
+
+    Exposes relay latency histograms (connect, first event, EOSE, OK),
+    event counters, per-endpoint request latency, cache hit ratios and
+    the number of open relay connections.
+    """
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -2,16 +2,27 @@
 Profile Router - Profile data endpoints
 """
 
-from typing import Optional
-from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from ..http_cache import conditional
 from ..models.responses import ProfileResponse
+from ..services.key_service import KeyService
 from ..services.profile_service import ProfileService
 
 router = APIRouter(prefix="/profile", tags=["Profile"])
 
 
+def _latest(pubkey: str, kind: int) -> List[dict]:
+    """Filter for the latest replaceable event of a kind (none for an invalid pubkey)"""
+    try:
+        pubkey_hex = KeyService.normalize_pubkey(pubkey)
+    except Exception:
+        return []
+    return [{"kinds": [kind], "authors": [pubkey_hex], "limit": 1}]
+
+
 @router.get("/{pubkey}", response_model=ProfileResponse)
-async def get_profile(pubkey: str):
+async def get_profile(pubkey: str, request: Request, response: Response):
     """
     Get profile data for a pubkey
     
@@ -22,16 +33,18 @@ async def get_profile(pubkey: str):
         pubkey: Public key in npub or hex format
     """
     profile_service = ProfileService()
-    profile = await profile_service.get_profile(pubkey)
-    
-    if not profile:
-        raise HTTPException(status_code=404, detail="Profile not found or invalid pubkey")
-    
-    return ProfileResponse(**profile)
+
+    async def build():
+        profile = await profile_service.get_profile(pubkey)
+        if not profile:
+            raise HTTPException(status_code=404, detail="Profile not found or invalid pubkey")
+        return ProfileResponse(**profile)
+
+    return await conditional(request, response, _latest(pubkey, 0), build)
 
 
 @router.get("/{pubkey}/badges")
-async def get_profile_badges(pubkey: str):
+async def get_profile_badges(pubkey: str, request: Request, response: Response):
     """
     Get badges for a profile
     
@@ -42,7 +55,9 @@ async def get_profile_badges(pubkey: str):
         pubkey: Public key in npub or hex format
     """
     profile_service = ProfileService()
-    badges = await profile_service.get_profile_badges(pubkey)
-    
-    return badges
 
+    async def build():
+        return await profile_service.get_profile_badges(pubkey)
+
+    # The profile badges event (kind 30008) lists every displayed badge
+    return await conditional(request, response, _latest(pubkey, 30008), build)
@@ -2,11 +2,18 @@
 Relays Router - Relay configuration endpoints
 """
 
+import sys
+from pathlib import Path
 from typing import List
 from fastapi import APIRouter
-from ..models.responses import RelayStatusResponse
+from ..models.responses import RelayCapabilitiesResponse, RelayStatusResponse
 from ..config import settings
 
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "common"))
+
+from relay_capabilities import RELAY_CAPABILITIES
+
 router = APIRouter(prefix="/relays", tags=["Relays"])
 
 
@@ -23,3 +30,16 @@ async def get_relays():
         for url in settings.relay_urls
     ]
 
+
+@router.get("/capabilities", response_model=List[RelayCapabilitiesResponse])
+async def get_relay_capabilities():
+    """
+    Get NIP-11 capabilities of the configured relays
+
+    Supported NIPs and limits (max_filters, max_limit, max_message_length,
+    max_subscriptions) from each relay's information document, cached for
+    RELAY_INFO_TTL_SECONDS. `error` is set when the document could not be
+    fetched. No authentication required.
+    """
+    capabilities = await RELAY_CAPABILITIES.prefetch(settings.relay_urls)
+    return [RelayCapabilitiesResponse(**caps.to_dict()) for caps in capabilities]
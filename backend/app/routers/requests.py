@@ -7,7 +7,7 @@ Supports two authentication flows:
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Request, Response
 from ..models.badge_requests import (
     CreateBadgeRequestRequest,
     WithdrawBadgeRequestRequest,
@@ -26,6 +26,7 @@ from ..models.badge_requests import (
 from ..services.request_service import RequestService
 from ..services.key_service import KeyService
 from ..config import settings
+from ..http_cache import stale_if_error
 
 router = APIRouter(prefix="/requests", tags=["Badge Requests"])
 
@@ -171,6 +172,8 @@ async def withdraw_badge_request(
 
 @router.get("/outgoing", response_model=List[BadgeRequestResponse])
 async def get_outgoing_requests(
+    request: Request,
+    response: Response,
     x_nsec: Optional[str] = Header(None),
     x_pubkey: Optional[str] = Header(None)
 ):
@@ -186,25 +189,28 @@ async def get_outgoing_requests(
     else:
         request_service = RequestService(nsec)
 
-    requests = await request_service.get_outgoing_requests()
-
-    return [BadgeRequestResponse(
-        event_id=r["event_id"],
-        badge_a_tag=r["badge_a_tag"],
-        badge_name=r["badge_name"],
-        badge_description=r.get("badge_description"),
-        badge_image=r.get("badge_image"),
-        issuer_pubkey=r.get("issuer_pubkey"),
-        issuer_npub=r.get("issuer_npub"),
-        issuer_name=r.get("issuer_name"),
-        issuer_picture=r.get("issuer_picture"),
-        content=r.get("content", ""),
-        proofs=[ProofInfo(**p) for p in r.get("proofs", [])],
-        state=r.get("state", "pending"),
-        created_at=r["created_at"],
-        denial_reason=r.get("denial_reason"),
-        denial_created_at=r.get("denial_created_at")
-    ) for r in requests]
+    async def build():
+        requests = await request_service.get_outgoing_requests()
+
+        return [BadgeRequestResponse(
+            event_id=r["event_id"],
+            badge_a_tag=r["badge_a_tag"],
+            badge_name=r["badge_name"],
+            badge_description=r.get("badge_description"),
+            badge_image=r.get("badge_image"),
+            issuer_pubkey=r.get("issuer_pubkey"),
+            issuer_npub=r.get("issuer_npub"),
+            issuer_name=r.get("issuer_name"),
+            issuer_picture=r.get("issuer_picture"),
+            content=r.get("content", ""),
+            proofs=[ProofInfo(**p) for p in r.get("proofs", [])],
+            state=r.get("state", "pending"),
+            created_at=r["created_at"],
+            denial_reason=r.get("denial_reason"),
+            denial_created_at=r.get("denial_created_at")
+        ) for r in requests]
+
+    return await stale_if_error(request, response, build, vary="X-Pubkey, X-Nsec")
 
 
 # =============================================================================
@@ -213,6 +219,8 @@ async def get_outgoing_requests(
 
 @router.get("/incoming", response_model=List[BadgeRequestResponse])
 async def get_incoming_requests(
+    request: Request,
+    response: Response,
     x_nsec: Optional[str] = Header(None),
     x_pubkey: Optional[str] = Header(None)
 ):
@@ -229,29 +237,34 @@ async def get_incoming_requests(
     else:
         request_service = RequestService(nsec)
 
-    requests = await request_service.get_incoming_requests()
-
-    return [BadgeRequestResponse(
-        event_id=r["event_id"],
-        badge_a_tag=r["badge_a_tag"],
-        badge_name=r["badge_name"],
-        badge_description=r.get("badge_description"),
-        badge_image=r.get("badge_image"),
-        requester_pubkey=r.get("requester_pubkey"),
-        requester_npub=r.get("requester_npub"),
-        requester_name=r.get("requester_name"),
-        requester_picture=r.get("requester_picture"),
-        content=r.get("content", ""),
-        proofs=[ProofInfo(**p) for p in r.get("proofs", [])],
-        state=r.get("state", "pending"),
-        created_at=r["created_at"],
-        denial_reason=r.get("denial_reason"),
-        denial_created_at=r.get("denial_created_at")
-    ) for r in requests]
+    async def build():
+        requests = await request_service.get_incoming_requests()
+
+        return [BadgeRequestResponse(
+            event_id=r["event_id"],
+            badge_a_tag=r["badge_a_tag"],
+            badge_name=r["badge_name"],
+            badge_description=r.get("badge_description"),
+            badge_image=r.get("badge_image"),
+            requester_pubkey=r.get("requester_pubkey"),
+            requester_npub=r.get("requester_npub"),
+            requester_name=r.get("requester_name"),
+            requester_picture=r.get("requester_picture"),
+            content=r.get("content", ""),
+            proofs=[ProofInfo(**p) for p in r.get("proofs", [])],
+            state=r.get("state", "pending"),
+            created_at=r["created_at"],
+            denial_reason=r.get("denial_reason"),
+            denial_created_at=r.get("denial_created_at")
+        ) for r in requests]
+
+    return await stale_if_error(request, response, build, vary="X-Pubkey, X-Nsec")
 
 
 @router.get("/incoming/count", response_model=IncomingRequestsCountResponse)
 async def get_incoming_requests_count(
+    request: Request,
+    response: Response,
     x_nsec: Optional[str] = Header(None),
     x_pubkey: Optional[str] = Header(None)
 ):
@@ -267,12 +280,15 @@ async def get_incoming_requests_count(
     else:
         request_service = RequestService(nsec)
 
-    counts = await request_service.get_incoming_requests_count()
+    async def build():
+        counts = await request_service.get_incoming_requests_count()
 
-    return IncomingRequestsCountResponse(
-        count=counts["count"],
-        pending_count=counts["pending_count"]
-    )
+        return IncomingRequestsCountResponse(
+            count=counts["count"],
+            pending_count=counts["pending_count"]
+        )
+
+    return await stale_if_error(request, response, build, vary="X-Pubkey, X-Nsec")
 
 
 @router.post("/deny", response_model=DenyBadgeRequestResponse)
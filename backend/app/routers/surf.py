@@ -8,10 +8,15 @@ Provides endpoints for:
 - Getting badge holders
 """
 
+import json
 from typing import Optional, List
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from ..http_cache import HEAD_LIMIT, conditional
+from ..pagination import InvalidCursor
 from ..services.surf_service import SurfService
+from ..surf_feed import surf_feed
 
 
 router = APIRouter(prefix="/surf", tags=["Surf"])
@@ -36,6 +41,7 @@ class BadgeInfo(BaseModel):
     event_id: Optional[str] = None
     created_at: Optional[int] = None
     holder_count: Optional[int] = None
+    holder_count_exact: Optional[bool] = None
 
 
 class BadgeOwner(BaseModel):
@@ -49,12 +55,23 @@ class BadgeOwnersResponse(BaseModel):
     """Response for badge owners endpoint"""
     owners: List[BadgeOwner]
     total_count: int
+    complete: Optional[bool] = None
 
 
 class BadgeListResponse(BaseModel):
     """Response for badge list endpoints"""
     badges: List[BadgeInfo]
     count: int
+    next_cursor: Optional[str] = None
+    complete: Optional[bool] = None
+
+
+def _definition_head(a_tag: str) -> List[dict]:
+    """Filter for the current version of a badge definition (none for a malformed a-tag)"""
+    parts = a_tag.split(":")
+    if len(parts) != 3:
+        return []
+    return [{"kinds": [30009], "authors": [parts[1]], "#d": [parts[2]], "limit": 1}]
 
 
 # =========================================================================
@@ -63,9 +80,12 @@ class BadgeListResponse(BaseModel):
 
 @router.get("/recent", response_model=BadgeListResponse)
 async def get_recent_badges(
+    request: Request,
+    response: Response,
     limit: int = Query(default=50, le=100, ge=1),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
     since: Optional[int] = Query(default=None, description="Unix timestamp - return badges created AFTER this time"),
-    until: Optional[int] = Query(default=None, description="Unix timestamp - return badges created BEFORE this time (for pagination)")
+    until: Optional[int] = Query(default=None, description="Unix timestamp - start the first page BEFORE this time")
 ):
     """
     Get recent badge definitions from Nostr.
@@ -75,17 +95,62 @@ async def get_recent_badges(
 
     Args:
         limit: Maximum number of badges (1-100)
+        cursor: Opaque cursor for the next page (returned as next_cursor; null on the last page)
         since: Optional - only badges created after this timestamp
-        until: Optional - only badges created before this timestamp (use for pagination)
+        until: Optional - only badges created before this timestamp (first page only)
     """
     surf_service = SurfService()
-    badges = await surf_service.get_recent_badges(limit=limit, since=since, until=until)
 
-    return BadgeListResponse(badges=badges, count=len(badges))
+    async def build():
+        try:
+            badges, next_cursor, complete = await surf_service.get_recent_badges_page(
+                limit=limit, cursor=cursor, since=since, until=until
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return BadgeListResponse(badges=badges, count=len(badges), next_cursor=next_cursor, complete=complete)
+
+    # New or edited definitions show up among the newest ones
+    head = {"kinds": [30009], "limit": HEAD_LIMIT}
+    if since:
+        head["since"] = since
+    if until and not cursor:
+        head["until"] = until
+    return await conditional(request, response, [head], build)
+
+
+@router.get("/live")
+async def stream_live_badges():
+    """
+    Stream new badge definitions and awards as Server-Sent Events.
+
+    Sends `badge_definition` events (same fields as /recent) and
+    `badge_award` events (award id, a_tag, issuer, recipient count) as
+    relays receive them. All clients share one relay subscription. A
+    client that falls too far behind gets a `dropped` event and is
+    disconnected; it should reconnect and reload /recent.
+    No authentication required.
+    """
+    async def events():
+        yield "retry: 5000\n\n"
+        async for item in surf_feed.subscribe():
+            if item is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {item['type']}\ndata: {json.dumps(item['data'])}\n\n"
+        yield "event: dropped\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/popular", response_model=BadgeListResponse)
 async def get_popular_badges(
+    request: Request,
+    response: Response,
     limit: int = Query(default=30, le=50, ge=1)
 ):
     """
@@ -98,13 +163,23 @@ async def get_popular_badges(
         limit: Maximum number of badges (1-50)
     """
     surf_service = SurfService()
-    badges = await surf_service.get_badges_with_stats(limit=limit)
 
-    return BadgeListResponse(badges=badges, count=len(badges))
+    async def build():
+        badges = await surf_service.get_badges_with_stats(limit=limit)
+        return BadgeListResponse(badges=badges, count=len(badges))
+
+    # Holder counts change with new awards
+    return await conditional(
+        request, response,
+        [{"kinds": [30009], "limit": HEAD_LIMIT}, {"kinds": [8], "limit": HEAD_LIMIT}],
+        build
+    )
 
 
 @router.get("/search", response_model=BadgeListResponse)
 async def search_badges(
+    request: Request,
+    response: Response,
     q: str = Query(..., min_length=1, max_length=100, description="Search query"),
     limit: int = Query(default=30, le=100, ge=1)
 ):
@@ -120,13 +195,18 @@ async def search_badges(
         limit: Maximum number of results (1-100)
     """
     surf_service = SurfService()
-    badges = await surf_service.search_badges(query=q, limit=limit)
 
-    return BadgeListResponse(badges=badges, count=len(badges))
+    async def build():
+        badges = await surf_service.search_badges(query=q, limit=limit)
+        return BadgeListResponse(badges=badges, count=len(badges))
+
+    return await conditional(request, response, [{"kinds": [30009], "limit": HEAD_LIMIT}], build)
 
 
 @router.get("/issuer/{pubkey}", response_model=BadgeListResponse)
 async def get_badges_by_issuer(
+    request: Request,
+    response: Response,
     pubkey: str,
     limit: int = Query(default=50, le=100, ge=1)
 ):
@@ -146,16 +226,23 @@ async def get_badges_by_issuer(
             pass
 
     surf_service = SurfService()
-    badges = await surf_service.get_badges_by_issuer(
-        issuer_pubkey=pubkey,
-        limit=limit
-    )
 
-    return BadgeListResponse(badges=badges, count=len(badges))
+    async def build():
+        badges = await surf_service.get_badges_by_issuer(
+            issuer_pubkey=pubkey,
+            limit=limit
+        )
+        return BadgeListResponse(badges=badges, count=len(badges))
+
+    return await conditional(
+        request, response, [{"kinds": [30009], "authors": [pubkey], "limit": HEAD_LIMIT}], build
+    )
 
 
 @router.get("/badge/details", response_model=BadgeInfo)
 async def get_badge_details(
+    request: Request,
+    response: Response,
     a_tag: str = Query(..., description="Badge a-tag (e.g., '30009:pubkey:identifier')")
 ):
     """
@@ -165,17 +252,20 @@ async def get_badge_details(
         a_tag: Badge a-tag (e.g., "30009:pubkey:identifier")
     """
     surf_service = SurfService()
-    badge = await surf_service.get_badge_details(badge_a_tag=a_tag)
 
-    if not badge:
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="Badge not found")
+    async def build():
+        badge = await surf_service.get_badge_details(badge_a_tag=a_tag)
+        if not badge:
+            raise HTTPException(status_code=404, detail="Badge not found")
+        return BadgeInfo(**badge)
 
-    return BadgeInfo(**badge)
+    return await conditional(request, response, _definition_head(a_tag), build)
 
 
 @router.get("/badge/owners", response_model=BadgeOwnersResponse)
 async def get_badge_owners(
+    request: Request,
+    response: Response,
     a_tag: str = Query(..., description="Badge a-tag (e.g., '30009:pubkey:identifier')"),
     limit: int = Query(default=50, le=100, ge=1),
     include_profiles: bool = Query(default=True)
@@ -189,13 +279,18 @@ async def get_badge_owners(
         include_profiles: Whether to fetch profile metadata
     """
     surf_service = SurfService()
-    result = await surf_service.get_badge_owners(
-        badge_a_tag=a_tag,
-        limit=limit,
-        include_profiles=include_profiles
-    )
 
-    return BadgeOwnersResponse(
-        owners=result["owners"],
-        total_count=result["total_count"]
-    )
+    async def build():
+        result = await surf_service.get_badge_owners(
+            badge_a_tag=a_tag,
+            limit=limit,
+            include_profiles=include_profiles
+        )
+        return BadgeOwnersResponse(
+            owners=result["owners"],
+            total_count=result["total_count"],
+            complete=result.get("complete")
+        )
+
+    # New holders arrive as new award events
+    return await conditional(request, response, [{"kinds": [8], "#a": [a_tag], "limit": HEAD_LIMIT}], build)
@@ -8,16 +8,18 @@ import asyncio
 import time
 import sys
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
-
-import websockets
+from typing import BinaryIO, Dict, Iterable, List, Any, Optional, Tuple
 
 # Add paths for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "common"))
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "badge_tool"))
 
 from badge_creator import BadgeCreator, normalize_pubkey
-from relay_manager import RelayManager
+from bulk_award import BulkAwardEngine
+from recipient_import import RecipientImport
+from metrics import record_deduplicated
+from relay_manager import RelayManager, query_relay
+from tracing import traced
 from ..config import settings
 
 
@@ -235,6 +237,7 @@ class BadgeService:
             print(f"Error updating template: {e}")
             return False, "Failed to update template"
 
+    @traced()
     async def publish_signed_event(self, signed_event: Dict[str, Any]) -> Dict[str, Any]:
         """
         Publish a pre-signed event (from NIP-07) to relays.
@@ -276,6 +279,7 @@ class BadgeService:
                 "error": str(e)
             }
 
+    @traced()
     async def create_definition(self, badge_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create and publish a badge definition (kind 30009)"""
         try:
@@ -304,6 +308,7 @@ class BadgeService:
                 "error": str(e)
             }
     
+    @traced()
     async def award_badge(
         self,
         a_tag: str,
@@ -327,6 +332,21 @@ class BadgeService:
 
             print(f"📋 Awarding badge to {len(normalized_recipients)} recipients (hex format)")
 
+            if len(normalized_recipients) > settings.award_chunk_size:
+                # Too many p-tags for one event: split into several awards
+                bulk = await self.award_badge_bulk(a_tag, normalized_recipients)
+                return {
+                    "success": bulk["success"],
+                    "award_event_id": (bulk["award_event_ids"] or [None])[0],
+                    "award_event_ids": bulk["award_event_ids"],
+                    "recipients_count": bulk["recipients_published"],
+                    "published_relays": min((c["published_relays"] for c in bulk["chunks"]), default=0),
+                    "verified_relays": min(
+                        (sum(1 for r in c["relays"] if r["verified"]) for c in bulk["chunks"]), default=0
+                    ),
+                    "error": bulk.get("error")
+                }
+
             result = await self.badge_creator.award_badge(
                 a_tag, normalized_recipients, self.relay_urls
             )
@@ -348,6 +368,80 @@ class BadgeService:
                 "error": str(e)
             }
     
+    @traced()
+    async def award_badge_bulk(
+        self,
+        a_tag: str,
+        recipients: Iterable[str],
+        chunk_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Award a badge to a large recipient list (kind 8, chunked)
+
+        Recipients are split over several award events that are signed in
+        parallel and published concurrently. Invalid pubkeys are reported
+        instead of failing the whole award. `recipients` may be a stream
+        (e.g. a RecipientImport); chunks are published as they fill up.
+        """
+        engine = BulkAwardEngine(
+            self.badge_creator,
+            self.relay_urls,
+            chunk_size=chunk_size or settings.award_chunk_size,
+            max_concurrent_chunks=settings.award_max_concurrent_chunks
+        )
+        try:
+            result = await engine.award(a_tag, recipients)
+        except Exception as e:
+            print(f"❌ Bulk award error: {e}")
+            return {
+                "success": False,
+                "status": "failed",
+                "award_event_ids": [],
+                "chunks": [],
+                "recipients_published": 0,
+                "error": str(e)
+            }
+
+        result["success"] = result["status"] == "success"
+        if result["status"] == "partial":
+            result["error"] = f"{result['failed_chunks']} of {result['total_chunks']} award event(s) were not accepted by any relay"
+        elif result["status"] == "failed":
+            result["error"] = "No award event was accepted by any relay" if result["chunks"] else "No valid recipients"
+        return result
+
+    @traced()
+    async def award_badge_from_file(
+        self,
+        a_tag: str,
+        fileobj: BinaryIO,
+        filename: Optional[str] = None,
+        chunk_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Award a badge to every valid recipient in a CSV/JSONL file
+
+        The file is parsed in batches in a worker thread and fed straight
+        into the bulk award engine; invalid rows are skipped and listed in
+        `import_report`.
+        """
+        recipients = RecipientImport.from_binary(fileobj, filename)
+        result = await self.award_badge_bulk(a_tag, recipients, chunk_size=chunk_size)
+        result["import_report"] = recipients.report()
+        return result
+
+    @staticmethod
+    async def validate_recipient_file(fileobj: BinaryIO, filename: Optional[str] = None) -> Dict[str, Any]:
+        """Parse a CSV/JSONL recipient file and report valid/invalid rows without awarding"""
+        def parse() -> Dict[str, Any]:
+            recipients = RecipientImport.from_binary(fileobj, filename)
+            for _ in recipients:
+                pass
+            return recipients.report()
+
+        # Normalizing thousands of rows would otherwise block the event loop
+        return await asyncio.to_thread(parse)
+
+    @traced()
     async def delete_badge(self, a_tag: str) -> Dict[str, Any]:
         """
         Delete a badge definition and all its awards (NIP-09 kind 5).
@@ -416,6 +510,7 @@ class BadgeService:
                 "error": "No relay accepted the deletion event"
             }
 
+    @traced()
     async def create_and_award(
         self,
         badge_data: Dict[str, Any],
@@ -468,31 +563,7 @@ class BadgeQueryService:
 
     async def _query_relay(self, relay_url, req_id, filter_params, timeout=10):
         """Query a single relay for events"""
-        results = []
-        try:
-            async with websockets.connect(relay_url, open_timeout=5) as ws:
-                await ws.send(json.dumps(["REQ", req_id, filter_params]))
-                start = asyncio.get_event_loop().time()
-                while True:
-                    if asyncio.get_event_loop().time() - start > timeout:
-                        break
-                    try:
-                        msg = await asyncio.wait_for(ws.recv(), timeout=2.5)
-                    except asyncio.TimeoutError:
-                        break
-                    try:
-                        data = json.loads(msg)
-                    except Exception:
-                        continue
-                    if not isinstance(data, list):
-                        continue
-                    if data[0] == "EVENT" and len(data) >= 3 and data[1] == req_id:
-                        results.append(data[2])
-                    if data[0] == "EOSE":
-                        break
-        except Exception as e:
-            print(f"Query error ({relay_url}): {e}")
-        return results
+        return await query_relay(relay_url, req_id, filter_params, timeout=timeout)
 
     async def _query_multiple(self, filter_params, prefix):
         """Query multiple relays and deduplicate by event ID"""
@@ -502,13 +573,17 @@ class BadgeQueryService:
             tasks.append(self._query_relay(relay, req_id, filter_params))
         results = await asyncio.gather(*tasks, return_exceptions=True)
         events_by_id = {}
+        total = 0
         for result in results:
             if isinstance(result, list):
                 for ev in result:
                     if ev.get("id"):
+                        total += 1
                         events_by_id[ev["id"]] = ev
+        record_deduplicated(total, len(events_by_id))
         return list(events_by_id.values())
 
+    @traced()
     async def get_badge_event_ids(self, a_tag: str) -> Dict[str, Any]:
         """
         Get all event IDs (definition + awards) for a badge.
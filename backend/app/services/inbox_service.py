@@ -6,17 +6,21 @@ Wraps existing badge_inbox.py functionality
 import json
 import sys
 import asyncio
-import websockets
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, List, Any, Optional, Set, Tuple
 
 # Add paths for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "common"))
 
 from nostr.key import PrivateKey, PublicKey
 from recipient_acceptance import BadgeAcceptanceManager
-from relay_manager import RelayManager
+from relay_manager import RelayManager, query_relay
+from tracing import span, traced
 from ..config import settings
+from ..pagination import Cursor, fetch_page
+
+# Pages of award events read to fill one page of pending badges (awards of accepted badges are skipped)
+PENDING_MAX_ROUNDS = 3
 
 
 class InboxService:
@@ -59,42 +63,11 @@ class InboxService:
         timeout: int = 7
     ) -> List[Dict]:
         """Query a relay for events"""
-        results = []
-        
-        try:
-            async with websockets.connect(relay_url, open_timeout=5) as ws:
-                await ws.send(json.dumps(["REQ", req_id, filter_params]))
-                
-                start = asyncio.get_event_loop().time()
-                
-                while True:
-                    if asyncio.get_event_loop().time() - start > timeout:
-                        break
-                    
-                    try:
-                        msg = await asyncio.wait_for(ws.recv(), timeout=2.5)
-                    except asyncio.TimeoutError:
-                        break
-                    
-                    try:
-                        data = json.loads(msg)
-                    except:
-                        continue
-                    
-                    if not isinstance(data, list):
-                        continue
-                    
-                    if data[0] == "EVENT" and len(data) >= 3 and data[1] == req_id:
-                        results.append(data[2])
-                    
-                    if data[0] == "EOSE" and len(data) >= 2 and data[1] == req_id:
-                        break
-        
-        except Exception as e:
-            print(f"Relay query error ({relay_url}): {e}")
-        
-        return results
+        return await query_relay(
+            relay_url, req_id, filter_params, timeout=timeout, recv_timeout=2.5
+        )
     
+    @traced()
     async def get_accepted_badges(self) -> List[Dict[str, Any]]:
         """Get list of accepted badges"""
         filter_params = {
@@ -141,8 +114,9 @@ class InboxService:
             issuer_npub = PublicKey(bytes.fromhex(issuer_hex)).bech32()
             
             # Get badge info and issuer profile
-            badge_info = await self._get_badge_info(issuer_hex, identifier)
-            issuer_info = await self._get_profile_info(issuer_hex)
+            with span("InboxService.enrich_badge", a_tag=a_tag):
+                badge_info = await self._get_badge_info(issuer_hex, identifier)
+                issuer_info = await self._get_profile_info(issuer_hex)
             
             accepted_badges.append({
                 "a_tag": a_tag,
@@ -158,68 +132,106 @@ class InboxService:
         
         return accepted_badges
     
-    async def get_pending_badges(self) -> List[Dict[str, Any]]:
-        """Get list of pending (unaccepted) badges"""
-        # First get accepted badge a-tags
-        accepted_a_tags = set()
-        
+    async def _get_accepted_a_tags(self) -> Set[str]:
+        """a-tags of the newest profile badges event (kind 30008) found on any relay"""
         filter_params = {
             "kinds": [30008],
             "authors": [self.recipient_hex],
             "limit": 1
         }
-        
-        for relay in self.relay_urls:
-            events = await self._query_relay(
-                relay, f"profile_{self.recipient_hex[:8]}", filter_params
-            )
-            if events:
-                for tag in events[0].get("tags", []):
-                    if tag[0] == "a":
-                        accepted_a_tags.add(tag[1])
-                break
-        
+        results = await asyncio.gather(
+            *(self._query_relay(relay, f"profile_{self.recipient_hex[:8]}", filter_params) for relay in self.relay_urls),
+            return_exceptions=True
+        )
+        events = [ev for result in results if isinstance(result, list) for ev in result]
+        if not events:
+            return set()
+        newest = max(events, key=lambda ev: ev.get("created_at", 0))
+        return {tag[1] for tag in newest.get("tags", []) if len(tag) > 1 and tag[0] == "a"}
+
+    @traced()
+    async def get_pending_badges(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], bool]:
+        """
+        Get one page of pending (unaccepted) badges, newest award first.
+
+        Award events are paged with a keyset cursor across all relays (see
+        pagination.py), so older awards stay reachable however many a user
+        has. Awards of accepted badges are skipped; up to PENDING_MAX_ROUNDS
+        pages of awards are read to fill one page, fewer when a page comes
+        back empty because it stopped where a failed relay left off (see
+        merge_page). Only the badges returned are enriched.
+
+        Returns:
+            (pending_badges, next_cursor, complete); next_cursor is None on the
+            last page, complete is False if a relay failed or was given up
+
+        Raises:
+            InvalidCursor: The cursor is malformed or from another relay set
+        """
+        page_cursor = Cursor.decode(cursor, self.relay_urls) if cursor else Cursor.start(self.relay_urls)
+        accepted_a_tags = await self._get_accepted_a_tags()
+
         # Fetch award events (kind 8)
         filter_params = {
             "kinds": [8],
-            "#p": [self.recipient_hex],
-            "limit": 50
+            "#p": [self.recipient_hex]
         }
-        
-        award_events = []
-        for relay in self.relay_urls:
-            events = await self._query_relay(
-                relay, f"awards_{self.recipient_hex[:8]}", filter_params
+
+        awards = []
+        has_more = True
+        complete = True
+        for _ in range(PENDING_MAX_ROUNDS):
+            events, has_more, page_complete = await fetch_page(
+                self.relay_urls, filter_params, page_cursor, limit - len(awards), f"awards_{self.recipient_hex[:8]}"
             )
-            award_events.extend(events)
-        
-        # Deduplicate
-        seen = set()
-        unique_awards = []
-        for ev in award_events:
-            if ev["id"] not in seen:
-                seen.add(ev["id"])
-                unique_awards.append(ev)
-        
-        # Filter out accepted ones and enrich
-        pending_badges = []
-        
-        for ev in unique_awards:
-            a_tag = next((x[1] for x in ev.get("tags", []) if x[0] == "a"), None)
-            if not a_tag or a_tag in accepted_a_tags:
-                continue
-            
-            try:
-                _, issuer_hex, identifier = a_tag.split(":")
-            except:
-                continue
-            
+            complete = complete and page_complete
+            awards.extend(award for award in (self._parse_award(ev, accepted_a_tags) for ev in events) if award)
+            # An empty page stopped at a failed relay; another round would too
+            if len(awards) >= limit or not has_more or not events:
+                break
+
+        return await self._enrich_awards(awards), page_cursor.encode() if has_more else None, complete
+
+    async def enrich_new_award(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Pending badge for a newly received award event (None if malformed or already accepted)"""
+        award = self._parse_award(event, await self._get_accepted_a_tags())
+        if not award:
+            return None
+        return (await self._enrich_awards([award]))[0]
+
+    @staticmethod
+    def _parse_award(ev: Dict[str, Any], accepted_a_tags: Set[str]) -> Optional[tuple]:
+        """(event, a_tag, issuer_hex, identifier, issuer_npub) of a pending award, or None"""
+        a_tag = next((x[1] for x in ev.get("tags", []) if len(x) > 1 and x[0] == "a"), None)
+        if not a_tag or a_tag in accepted_a_tags:
+            return None
+        try:
+            _, issuer_hex, identifier = a_tag.split(":")
             issuer_npub = PublicKey(bytes.fromhex(issuer_hex)).bech32()
-            
-            # Get badge info and issuer profile
-            badge_info = await self._get_badge_info(issuer_hex, identifier)
-            issuer_info = await self._get_profile_info(issuer_hex)
-            
+        except:
+            return None
+        return ev, a_tag, issuer_hex, identifier, issuer_npub
+
+    async def _enrich_awards(self, awards: List[tuple]) -> List[Dict[str, Any]]:
+        """Pending badge dicts for parsed awards; each definition and issuer profile is fetched once"""
+        badge_keys = list({(issuer_hex, identifier) for _, _, issuer_hex, identifier, _ in awards})
+        issuers = list({issuer_hex for _, _, issuer_hex, _, _ in awards})
+        with span("InboxService.enrich_badges", badges=len(badge_keys), issuers=len(issuers)):
+            badge_infos, issuer_infos = await asyncio.gather(
+                asyncio.gather(*(self._get_badge_info(*key) for key in badge_keys)),
+                asyncio.gather(*(self._get_profile_info(issuer) for issuer in issuers))
+            )
+        badge_infos = dict(zip(badge_keys, badge_infos))
+        issuer_infos = dict(zip(issuers, issuer_infos))
+
+        pending_badges = []
+        for ev, a_tag, issuer_hex, identifier, issuer_npub in awards:
+            badge_info = badge_infos[(issuer_hex, identifier)]
+            issuer_info = issuer_infos[issuer_hex]
             pending_badges.append({
                 "award_event_id": ev["id"],
                 "a_tag": a_tag,
@@ -231,9 +243,10 @@ class InboxService:
                 "issuer_name": issuer_info["name"],
                 "issuer_picture": issuer_info["picture"]
             })
-        
+
         return pending_badges
-    
+
+    @traced()
     async def accept_badge(
         self, 
         a_tag: str, 
@@ -250,6 +263,7 @@ class InboxService:
                 "profile_event_id": result.get("event", {}).get("id"),
                 "total_badges": result.get("total_badges", 0),
                 "verified_relays": result.get("verified_relays", 0),
+                "retrying_relays": result.get("retrying_relays", []),
                 "error": result.get("error")
             }
         except Exception as e:
@@ -258,6 +272,7 @@ class InboxService:
                 "error": str(e)
             }
     
+    @traced()
     async def remove_badge(
         self, 
         a_tag: str, 
@@ -298,6 +313,7 @@ class InboxService:
                 "error": str(e)
             }
     
+    @traced()
     async def _get_badge_info(self, issuer_hex: str, identifier: str) -> Dict[str, str]:
         """Fetch badge info (name, description, image) from definition"""
         filter_params = {
@@ -339,6 +355,7 @@ class InboxService:
         info = await self._get_badge_info(issuer_hex, identifier)
         return info["description"]
     
+    @traced()
     async def _get_profile_info(self, pubkey_hex: str) -> Dict[str, str]:
         """Fetch profile info (name, picture) from kind 0"""
         filter_params = {
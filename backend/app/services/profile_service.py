@@ -5,7 +5,6 @@ Profile Service - Handles profile data fetching
 import json
 import sys
 import asyncio
-import websockets
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 
@@ -13,6 +12,9 @@ from typing import Dict, List, Any, Optional
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "common"))
 
 from nostr.key import PublicKey
+from backfill import backfill
+from relay_manager import query_relay
+from tracing import span, traced
 from ..config import settings
 from .key_service import KeyService
 
@@ -31,42 +33,11 @@ class ProfileService:
         timeout: int = 5
     ) -> List[Dict]:
         """Query a relay for events"""
-        results = []
-        
-        try:
-            async with websockets.connect(relay_url, open_timeout=5) as ws:
-                await ws.send(json.dumps(["REQ", req_id, filter_params]))
-                
-                start = asyncio.get_event_loop().time()
-                
-                while True:
-                    if asyncio.get_event_loop().time() - start > timeout:
-                        break
-                    
-                    try:
-                        msg = await asyncio.wait_for(ws.recv(), timeout=2)
-                    except asyncio.TimeoutError:
-                        break
-                    
-                    try:
-                        data = json.loads(msg)
-                    except:
-                        continue
-                    
-                    if not isinstance(data, list):
-                        continue
-                    
-                    if data[0] == "EVENT" and len(data) >= 3 and data[1] == req_id:
-                        results.append(data[2])
-                    
-                    if data[0] == "EOSE" and len(data) >= 2 and data[1] == req_id:
-                        break
-        
-        except Exception as e:
-            print(f"Relay query error ({relay_url}): {e}")
-        
-        return results
+        return await query_relay(
+            relay_url, req_id, filter_params, timeout=timeout, recv_timeout=2
+        )
     
+    @traced()
     async def get_profile(self, pubkey: str) -> Optional[Dict[str, Any]]:
         """
         Get profile metadata for a pubkey
@@ -129,6 +100,7 @@ class ProfileService:
             "created_at": None
         }
     
+    @traced()
     async def get_profile_badges(self, pubkey: str) -> Dict[str, List[Dict]]:
         """
         Get accepted and pending badges for a pubkey
@@ -168,11 +140,12 @@ class ProfileService:
                             _, issuer_hex, identifier = last_a_tag.split(":")
                             issuer_npub = PublicKey(bytes.fromhex(issuer_hex)).bech32()
 
-                            # Fetch full badge info (name, description, image)
-                            badge_info = await self._get_badge_info_full(issuer_hex, identifier)
+                            with span("ProfileService.enrich_badge", a_tag=last_a_tag):
+                                # Fetch full badge info (name, description, image)
+                                badge_info = await self._get_badge_info_full(issuer_hex, identifier)
 
-                            # Fetch issuer profile (name, picture)
-                            issuer_info = await self._get_issuer_profile(issuer_hex)
+                                # Fetch issuer profile (name, picture)
+                                issuer_info = await self._get_issuer_profile(issuer_hex)
 
                             accepted.append({
                                 "a_tag": last_a_tag,
@@ -196,6 +169,7 @@ class ProfileService:
             "pending": []  # Would need private key to check pending
         }
 
+    @traced()
     async def _get_badge_info_full(self, issuer_hex: str, identifier: str) -> Dict[str, str]:
         """Fetch full badge info (name, description, image) from definition"""
         filter_params = {
@@ -227,6 +201,7 @@ class ProfileService:
 
         return result
 
+    @traced()
     async def _get_issuer_profile(self, pubkey_hex: str) -> Dict[str, str]:
         """Fetch issuer profile info (name, picture) from kind 0"""
         filter_params = {
@@ -272,6 +247,7 @@ class ProfileService:
 
         return "(unknown badge)"
 
+    @traced()
     async def get_badge_owners(
         self,
         a_tag: str,
@@ -293,6 +269,7 @@ class ProfileService:
             Dictionary with:
             - owners: List of owner info (pubkey, name, picture)
             - total: Total count of owners found
+            - complete: Whether every relay's history was read to the end
             - badge_info: Basic badge information
         """
         # Validate a_tag format
@@ -305,36 +282,24 @@ class ProfileService:
         except Exception:
             return {"owners": [], "total": 0, "badge_info": None}
 
-        # Query relays for profile badge events containing this a_tag
-        # Kind 30008 events with #a tag matching our badge
-        filter_params = {
-            "kinds": [30008],
-            "#a": [a_tag],
-            "limit": 100  # Get more, we'll dedupe
-        }
-
-        # Collect unique owners from all relays
+        # Full history of profile badge events (kind 30008) containing this
+        # a_tag, paged back per relay; later calls only fetch the newest window.
+        # Lists replaced by a newer version or deleted by their owner are left
+        # out, so only the owners' current lists count
+        history = await backfill(
+            self.relay_urls[:5],
+            f"profile_badges:{a_tag}",
+            {"kinds": [30008], "#a": [a_tag]}
+        )
+
+        # Collect unique owners, most recently updated first
         seen_pubkeys = set()
         owner_pubkeys = []
-
-        for relay in self.relay_urls[:5]:
-            try:
-                events = await self._query_relay(
-                    relay,
-                    f"owners_{identifier[:8]}",
-                    filter_params,
-                    timeout=7
-                )
-
-                for event in events:
-                    pubkey = event.get("pubkey")
-                    if pubkey and pubkey not in seen_pubkeys:
-                        seen_pubkeys.add(pubkey)
-                        owner_pubkeys.append(pubkey)
-
-            except Exception as e:
-                print(f"Error querying relay for owners: {e}")
-                continue
+        for event in history.events:
+            pubkey = event.get("pubkey")
+            if pubkey and pubkey not in seen_pubkeys:
+                seen_pubkeys.add(pubkey)
+                owner_pubkeys.append(pubkey)
 
         # Limit results
         total_count = len(owner_pubkeys)
@@ -383,9 +348,11 @@ class ProfileService:
         return {
             "owners": owners,
             "total": total_count,
+            "complete": history.complete,
             "badge_info": badge_info
         }
 
+    @traced()
     async def _get_owner_profile(self, pubkey: str) -> Optional[Dict]:
         """
         Fetch minimal profile data for an owner.
@@ -418,6 +385,7 @@ class ProfileService:
 
         return None
 
+    @traced()
     async def _get_badge_info(self, issuer_hex: str, identifier: str) -> Optional[Dict]:
         """
         Fetch basic badge definition info.
@@ -14,8 +14,6 @@ import json
 import time
 import hashlib
 import sys
-import asyncio
-import websockets
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 
@@ -24,7 +22,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "common"))
 
 from nostr.key import PrivateKey, PublicKey
 from nostr.event import Event
-from relay_manager import RelayManager
+from metrics import record_deduplicated
+from relay_manager import RelayManager, query_relay
+from tracing import traced
 from ..config import settings
 
 
@@ -75,41 +75,9 @@ class RequestService:
         timeout: int = 7
     ) -> List[Dict]:
         """Query a relay for events"""
-        results = []
-
-        try:
-            async with websockets.connect(relay_url, open_timeout=5) as ws:
-                await ws.send(json.dumps(["REQ", req_id, filter_params]))
-
-                start = asyncio.get_event_loop().time()
-
-                while True:
-                    if asyncio.get_event_loop().time() - start > timeout:
-                        break
-
-                    try:
-                        msg = await asyncio.wait_for(ws.recv(), timeout=2.5)
-                    except asyncio.TimeoutError:
-                        break
-
-                    try:
-                        data = json.loads(msg)
-                    except:
-                        continue
-
-                    if not isinstance(data, list):
-                        continue
-
-                    if data[0] == "EVENT" and len(data) >= 3 and data[1] == req_id:
-                        results.append(data[2])
-
-                    if data[0] == "EOSE" and len(data) >= 2 and data[1] == req_id:
-                        break
-
-        except Exception as e:
-            print(f"Relay query error ({relay_url}): {e}")
-
-        return results
+        return await query_relay(
+            relay_url, req_id, filter_params, timeout=timeout, recv_timeout=2.5
+        )
 
     async def _query_multiple_relays(
         self,
@@ -134,6 +102,7 @@ class RequestService:
                 seen.add(ev["id"])
                 unique_events.append(ev)
 
+        record_deduplicated(len(all_events), len(unique_events))
         return unique_events
 
     # =========================================================================
@@ -511,6 +480,7 @@ class RequestService:
     # Get Requests
     # =========================================================================
 
+    @traced()
     async def get_outgoing_requests(self) -> List[Dict[str, Any]]:
         """Get requests sent by this user"""
         if not self.user_hex:
@@ -536,6 +506,7 @@ class RequestService:
 
         return enriched
 
+    @traced()
     async def get_incoming_requests(self) -> List[Dict[str, Any]]:
         """Get requests for badges this user has created"""
         if not self.user_hex:
@@ -561,6 +532,7 @@ class RequestService:
 
         return enriched
 
+    @traced()
     async def get_incoming_requests_count(self) -> Dict[str, int]:
         """Get count of incoming requests"""
         requests = await self.get_incoming_requests()
@@ -575,6 +547,7 @@ class RequestService:
     # Request Enrichment
     # =========================================================================
 
+    @traced()
     async def _enrich_outgoing_request(self, request: Dict) -> Optional[Dict]:
         """Enrich an outgoing request with badge and issuer info"""
         tags = request.get("tags", [])
@@ -657,6 +630,7 @@ class RequestService:
             "denial_created_at": denial_created_at
         }
 
+    @traced()
     async def _enrich_incoming_request(self, request: Dict) -> Optional[Dict]:
         """Enrich an incoming request with badge and requester info"""
         tags = request.get("tags", [])
@@ -744,6 +718,7 @@ class RequestService:
     # State Determination
     # =========================================================================
 
+    @traced()
     async def _determine_request_state(
         self,
         request_event_id: str,
@@ -821,6 +796,7 @@ class RequestService:
     # Proof Verification
     # =========================================================================
 
+    @traced()
     async def _verify_proof(
         self,
         event_id: str,
@@ -961,6 +937,7 @@ class RequestService:
     # Helper Methods
     # =========================================================================
 
+    @traced()
     async def _get_badge_info(self, issuer_hex: str, identifier: str) -> Dict[str, str]:
         """Fetch badge info from definition"""
         filter_params = {
@@ -990,6 +967,7 @@ class RequestService:
 
         return result
 
+    @traced()
     async def _get_profile_info(self, pubkey_hex: str) -> Dict[str, str]:
         """Fetch profile info from kind 0"""
         filter_params = {
@@ -11,22 +11,36 @@ Provides functionality for:
 import json
 import time
 import asyncio
-import websockets
 import sys
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 from collections import defaultdict
 
 # Add paths for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "common"))
 
 from nostr.key import PublicKey
+from metrics import record_deduplicated
+from backfill import backfill
+from event_store import EVENT_STORE
+from relay_capabilities import RELAY_CAPABILITIES
+from relay_manager import count_relay, query_relay_filters
+from sync_engine import SYNC_ENGINE
+from tracing import traced
 from ..config import settings
+from ..pagination import Cursor, fetch_page
 
 # Event kinds
 KIND_BADGE_DEFINITION = 30009
 KIND_BADGE_AWARD = 8
 
+# Award events downloaded per badge when a relay cannot COUNT
+HOLDER_SCAN_LIMIT = 100
+
+# NIP-50 relays asked per search, and definitions scanned when none is available
+SEARCH_MAX_RELAYS = 3
+SEARCH_SCAN_LIMIT = 200
+
 
 class SurfService:
     """Service for badge discovery operations"""
@@ -43,49 +57,17 @@ class SurfService:
         self,
         relay_url: str,
         req_id: str,
-        filter_params: Dict,
+        filter_params: Union[Dict, List[Dict]],
         timeout: int = 10
     ) -> List[Dict]:
-        """Query a relay for events"""
-        results = []
-
-        try:
-            async with websockets.connect(relay_url, open_timeout=5) as ws:
-                await ws.send(json.dumps(["REQ", req_id, filter_params]))
-
-                start = asyncio.get_event_loop().time()
-
-                while True:
-                    if asyncio.get_event_loop().time() - start > timeout:
-                        break
-
-                    try:
-                        msg = await asyncio.wait_for(ws.recv(), timeout=2.5)
-                    except asyncio.TimeoutError:
-                        break
-
-                    try:
-                        data = json.loads(msg)
-                    except:
-                        continue
-
-                    if not isinstance(data, list):
-                        continue
-
-                    if data[0] == "EVENT" and len(data) >= 3 and data[1] == req_id:
-                        results.append(data[2])
-
-                    if data[0] == "EOSE" and len(data) >= 2 and data[1] == req_id:
-                        break
-
-        except Exception as e:
-            print(f"Relay query error ({relay_url}): {e}")
-
-        return results
+        """Query a relay for events, splitting large filters to fit its limits"""
+        return await query_relay_filters(
+            relay_url, req_id, filter_params, timeout=timeout, recv_timeout=2.5
+        )
 
     async def _query_multiple_relays(
         self,
-        filter_params: Dict,
+        filter_params: Union[Dict, List[Dict]],
         req_prefix: str,
         max_relays: int = 5,
         timeout: int = 10
@@ -113,6 +95,7 @@ class SurfService:
                 if not existing or ev.get("created_at", 0) > existing.get("created_at", 0):
                     events_by_id[event_id] = ev
 
+        record_deduplicated(len(all_events), len(events_by_id))
         return list(events_by_id.values())
 
     @staticmethod
@@ -138,6 +121,7 @@ class SurfService:
     # Badge Discovery
     # =========================================================================
 
+    @traced()
     async def get_recent_badges(
         self,
         limit: int = 50,
@@ -179,6 +163,54 @@ class SurfService:
         await self._enrich_with_issuer_profiles(badges)
         return badges
 
+    @traced()
+    async def get_recent_badges_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        max_relays: int = 5
+    ) -> Tuple[List[Dict], Optional[str], bool]:
+        """
+        Get one page of recent badge definitions with a keyset cursor.
+
+        Each relay resumes exactly where the previous page left it (see
+        pagination.py), so deep pages cost one REQ per relay and never skip
+        or repeat definitions.
+
+        Args:
+            limit: Maximum number of badges to return
+            cursor: next_cursor of the previous page (None for the first page)
+            since: Unix timestamp - only badges created AFTER this time
+            until: Unix timestamp - start the first page BEFORE this time
+
+        Returns:
+            (badges, next_cursor, complete); next_cursor is None on the last
+            page, complete is False if a relay failed or was given up
+
+        Raises:
+            InvalidCursor: The cursor is malformed or from another relay set
+        """
+        relays = self.relay_urls[:max_relays]
+        page_cursor = Cursor.decode(cursor, relays) if cursor else Cursor.start(relays, until)
+
+        filter_params: Dict[str, Any] = {"kinds": [KIND_BADGE_DEFINITION]}
+        if since:
+            filter_params["since"] = since
+        events, has_more, complete = await fetch_page(
+            relays, filter_params, page_cursor, limit, "surf_recent"
+        )
+
+        badges = [self._parse_badge_event(ev) for ev in events]
+        badges = [b for b in badges if b is not None]
+        badges = self._deduplicate_replaceable(badges)
+        badges.sort(key=lambda x: (-x.get("created_at", 0), x.get("event_id") or ""))
+
+        await self._enrich_with_issuer_profiles(badges)
+        return badges, page_cursor.encode() if has_more else None, complete
+
+    @traced()
     async def get_badges_by_issuer(
         self,
         issuer_pubkey: str,
@@ -213,6 +245,7 @@ class SurfService:
         await self._enrich_with_issuer_profiles(badges)
         return badges
 
+    @traced()
     async def search_badges(
         self,
         query: str,
@@ -221,8 +254,14 @@ class SurfService:
         """
         Search for badges by name or description.
 
-        Note: Since Nostr doesn't support full-text search, we fetch recent
-        badges and filter client-side. For production, consider indexing.
+        The query is sent as a NIP-50 `search` filter to the configured
+        relays that advertise NIP-50, which search their full corpus. When
+        none is available, or none of them answers completely (EOSE before
+        the timeout), the definitions in the local event store are searched
+        and, if they give fewer than `limit` matches, the most recent
+        definitions on the relays are scanned too, so a search outage does
+        not look like "no matches". Results are merged and ranked by
+        name/phrase match, then recency.
 
         Args:
             query: Search query string
@@ -231,15 +270,51 @@ class SurfService:
         Returns:
             List of matching badge definitions
         """
-        # Fetch a larger set to search through
-        filter_params = {
-            "kinds": [KIND_BADGE_DEFINITION],
-            "limit": 200
-        }
+        query_lower = query.lower().strip()
+        query_words = query_lower.split()
 
-        events = await self._query_multiple_relays(
-            filter_params, "surf_search", timeout=15
-        )
+        def searchable(badge):
+            name = (badge.get("name") or "").lower()
+            desc = (badge.get("description") or "").lower()
+            identifier = (badge.get("identifier") or "").lower()
+            return f"{name} {desc} {identifier}"
+
+        def matches_query(badge):
+            # Match if ALL words are found somewhere in the badge
+            return badge is not None and all(word in searchable(badge) for word in query_words)
+
+        search_relays = self._search_relays()
+        relay_search = False
+        if search_relays:
+            filter_params = {
+                "kinds": [KIND_BADGE_DEFINITION],
+                "search": query,
+                "limit": max(limit * 2, 50)
+            }
+            results = await asyncio.gather(*(
+                query_relay_filters(
+                    relay, f"surf_nip50_{int(time.time())}_{i}", filter_params,
+                    timeout=10, recv_timeout=2.5, strict=True
+                )
+                for i, relay in enumerate(search_relays)
+            ), return_exceptions=True)
+            answered = [result for result in results if isinstance(result, list)]
+            relay_search = bool(answered)
+            events = [ev for result in answered for ev in result]
+            if not relay_search:
+                print(f"⚠️ No NIP-50 relay answered, scanning recent definitions for '{query}'")
+        if not relay_search:
+            events = []
+            if EVENT_STORE.enabled:
+                stored = await asyncio.to_thread(
+                    EVENT_STORE.query, {"kinds": [KIND_BADGE_DEFINITION]}
+                )
+                events = [ev for ev in stored if matches_query(self._parse_badge_event(ev))]
+            if len(events) < limit:
+                events += await self._query_multiple_relays(
+                    {"kinds": [KIND_BADGE_DEFINITION], "limit": SEARCH_SCAN_LIMIT},
+                    "surf_search", timeout=15
+                )
 
         # Parse badges and deduplicate replaceable events
         badges = [self._parse_badge_event(ev) for ev in events]
@@ -247,18 +322,12 @@ class SurfService:
         badges = self._deduplicate_replaceable(badges)
 
         # Filter by query (case-insensitive, multi-word support)
-        query_lower = query.lower().strip()
-        query_words = query_lower.split()
-
         matching = []
         for badge in badges:
-            name = (badge.get("name") or "").lower()
-            desc = (badge.get("description") or "").lower()
-            identifier = (badge.get("identifier") or "").lower()
-            searchable = f"{name} {desc} {identifier}"
-
-            # Match if ALL words are found somewhere in the badge
-            if all(word in searchable for word in query_words):
+            # Relay search results are kept even without a literal match (they
+            # may match on stemming or other fields) but rank after literal matches.
+            badge["_all_words"] = matches_query(badge)
+            if badge["_all_words"] or relay_search:
                 matching.append(badge)
 
         # Sort by relevance (name match first, then by recency)
@@ -267,14 +336,29 @@ class SurfService:
             # Prioritize: exact phrase match > all words in name > partial match
             exact_match = query_lower in name
             words_in_name = all(word in name for word in query_words)
-            return (not exact_match, not words_in_name, -badge.get("created_at", 0))
+            return (
+                not badge["_all_words"], not exact_match, not words_in_name,
+                -badge.get("created_at", 0)
+            )
 
         matching.sort(key=sort_key)
+        for badge in matching:
+            badge.pop("_all_words", None)
 
         matching = matching[:limit]
         await self._enrich_with_issuer_profiles(matching)
         return matching
 
+    def _search_relays(self) -> List[str]:
+        """Configured relays that advertise NIP-50 search (from the NIP-11 cache)"""
+        relays = []
+        for relay in self.relay_urls:
+            caps = RELAY_CAPABILITIES.cached(relay)
+            if caps and caps.supports(50):
+                relays.append(relay)
+        return relays[:SEARCH_MAX_RELAYS]
+
+    @traced()
     async def get_badge_details(
         self,
         badge_a_tag: str
@@ -314,6 +398,7 @@ class SurfService:
         badges = self._deduplicate_replaceable(badges)
         return badges[0] if badges else None
 
+    @traced()
     async def get_badge_owners(
         self,
         badge_a_tag: str,
@@ -329,17 +414,16 @@ class SurfService:
             include_profiles: Whether to fetch profile metadata
 
         Returns:
-            Dict with owners list and total count
+            Dict with owners list, total count and whether every relay's
+            award history was read to the end
         """
-        filter_params = {
-            "kinds": [KIND_BADGE_AWARD],
-            "#a": [badge_a_tag],
-            "limit": 100  # Fetch more to count
-        }
-
-        events = await self._query_multiple_relays(
-            filter_params, "surf_owners", timeout=10
-        )
+        # Full award history, paged back per relay; later calls only fetch new awards
+        target = f"awards:{badge_a_tag}"
+        filter_params = {"kinds": [KIND_BADGE_AWARD], "#a": [badge_a_tag]}
+        if EVENT_STORE.enabled:
+            SYNC_ENGINE.track(target, filter_params)
+        history = await backfill(self.relay_urls[:5], target, filter_params)
+        events = history.events
 
         # Extract unique recipients from award events
         owners = {}
@@ -370,7 +454,8 @@ class SurfService:
 
         return {
             "owners": owner_list,
-            "total_count": total_count
+            "total_count": total_count,
+            "complete": history.complete
         }
 
     # =========================================================================
@@ -434,6 +519,7 @@ class SurfService:
             print(f"Error parsing badge event: {e}")
             return None
 
+    @traced()
     async def _fetch_profiles(self, pubkeys: List[str]) -> Dict[str, Dict]:
         """Fetch profile metadata for multiple pubkeys"""
         if not pubkeys:
@@ -469,6 +555,7 @@ class SurfService:
 
         return profiles
 
+    @traced()
     async def _enrich_with_issuer_profiles(self, badges: List[Dict]) -> List[Dict]:
         """Attach issuer_name and issuer_picture to each badge from profile metadata"""
         if not badges:
@@ -488,6 +575,7 @@ class SurfService:
 
         return badges
 
+    @traced()
     async def get_badges_with_stats(
         self,
         limit: int = 50
@@ -505,20 +593,141 @@ class SurfService:
         # Get recent badges
         badges = await self.get_recent_badges(limit=limit)
 
-        # Fetch award counts in parallel
-        async def get_count(badge):
-            a_tag = badge.get("a_tag")
-            if not a_tag:
-                return 0
-            result = await self.get_badge_owners(a_tag, limit=1, include_profiles=False)
-            return result.get("total_count", 0)
-
-        counts = await asyncio.gather(*[get_count(b) for b in badges])
+        counts = await self.get_holder_counts([b["a_tag"] for b in badges if b.get("a_tag")])
 
-        for i, badge in enumerate(badges):
-            badge["holder_count"] = counts[i]
+        for badge in badges:
+            count = counts.get(badge.get("a_tag"), {"count": 0, "exact": True})
+            badge["holder_count"] = count["count"]
+            badge["holder_count_exact"] = count["exact"]
 
         # Sort by holder count (most popular first)
         badges.sort(key=lambda x: x.get("holder_count", 0), reverse=True)
 
         return badges
+
+    @traced()
+    async def get_holder_counts(
+        self,
+        a_tags: List[str],
+        max_relays: int = 5
+    ) -> Dict[str, Dict]:
+        """
+        Count holders of several badges at once.
+
+        Badges whose awards are synced to the local event store are counted
+        there. For the rest, up to HOLDER_SCAN_LIMIT award events per badge
+        are downloaded from each relay and their unique recipients (p-tags)
+        counted. One award event can name hundreds of recipients, so a
+        NIP-45 COUNT of award events is not a holder count; relays that
+        support it are asked first so that badges without awards on that
+        relay are not scanned, the others are asked for no more events than
+        were counted, and a scan that returned fewer events than the relay
+        counted is known to be incomplete.
+
+        Returns:
+            Dict mapping a_tag to {"count": int, "exact": bool}. A count is
+            exact when every relay answered and no relay's scan hit the scan
+            limit or fell short of the relay's COUNT.
+        """
+        a_tags = list(dict.fromkeys(a_tags))
+        if not a_tags:
+            return {}
+
+        # Badges whose awards the sync engine keeps up to date are counted locally
+        local_counts: Dict[str, Dict] = {}
+        if EVENT_STORE.enabled:
+            for a_tag in a_tags:
+                SYNC_ENGINE.track(f"awards:{a_tag}", {"kinds": [KIND_BADGE_AWARD], "#a": [a_tag]})
+
+            def count_locally() -> None:
+                for a_tag in a_tags:
+                    award_filter = {"kinds": [KIND_BADGE_AWARD], "#a": [a_tag]}
+                    max_age = 2 * settings.sync_interval_seconds
+                    if SYNC_ENGINE.is_synced(f"awards:{a_tag}", max_age=max_age):
+                        recipients = {
+                            t[1] for ev in EVENT_STORE.query(award_filter)
+                            for t in ev.get("tags", []) if len(t) > 1 and t[0] == "p"
+                        }
+                        local_counts[a_tag] = {"count": len(recipients), "exact": True}
+
+            # sqlite reads stay off the event loop
+            await asyncio.to_thread(count_locally)
+            a_tags = [a_tag for a_tag in a_tags if a_tag not in local_counts]
+            if not a_tags:
+                return local_counts
+
+        filters = {a_tag: {"kinds": [KIND_BADGE_AWARD], "#a": [a_tag]} for a_tag in a_tags}
+        holders: Dict[str, set] = {a_tag: set() for a_tag in a_tags}
+        estimated: set = set()
+
+        async def count_on(relay: str, index: int):
+            remaining = a_tags
+            try:
+                event_counts: Dict[str, int] = {}
+                caps = await RELAY_CAPABILITIES.get(relay)
+                supports_count = caps.supports(45)
+                if supports_count is not False:
+                    # Relays that do not advertise NIP-45 get a short chance to answer
+                    counted = await count_relay(
+                        relay, f"surf_count_{int(time.time())}_{index}",
+                        {a_tag: filters[a_tag] for a_tag in a_tags},
+                        timeout=8 if supports_count else 3
+                    )
+                    event_counts = {a_tag: result["count"] for a_tag, result in counted.items()}
+                    # Nothing to scan where the relay has no awards at all
+                    remaining = [a_tag for a_tag in a_tags if event_counts.get(a_tag) != 0]
+                    exact_counts = {
+                        a_tag: result["count"] for a_tag, result in counted.items()
+                        if not result.get("approximate")
+                    }
+                else:
+                    exact_counts = {}
+                if not remaining:
+                    return
+
+                scan_limit = min(HOLDER_SCAN_LIMIT, caps.max_limit or HOLDER_SCAN_LIMIT)
+                # An exact COUNT says how many award events there are to download
+                # (one more, so that a full answer is not taken for a truncated one)
+                limits = {
+                    a_tag: min(scan_limit, exact_counts[a_tag] + 1)
+                    if a_tag in exact_counts else scan_limit
+                    for a_tag in remaining
+                }
+                events = await query_relay_filters(
+                    relay, f"surf_holders_{int(time.time())}_{index}",
+                    [{**filters[a_tag], "limit": limits[a_tag]} for a_tag in remaining],
+                    timeout=10, recv_timeout=2.5, strict=True
+                )
+            except Exception as e:
+                # A relay that did not answer may hold awards the other relays do not
+                print(f"⚠️ Holder count on {relay} failed: {e}")
+                estimated.update(remaining)
+                return
+
+            per_badge: Dict[str, int] = defaultdict(int)
+            for ev in events:
+                tags = ev.get("tags", [])
+                badge_tags = {t[1] for t in tags if len(t) > 1 and t[0] == "a" and t[1] in holders}
+                for a_tag in badge_tags:
+                    per_badge[a_tag] += 1
+                    holders[a_tag].update(t[1] for t in tags if len(t) > 1 and t[0] == "p")
+            estimated.update(a_tag for a_tag, n in per_badge.items() if n >= scan_limit)
+            # The relay holds more award events than it sent
+            estimated.update(
+                a_tag for a_tag in remaining if per_badge[a_tag] < event_counts.get(a_tag, 0)
+            )
+
+        await asyncio.gather(
+            *(count_on(relay, i) for i, relay in enumerate(self.relay_urls[:max_relays])),
+            return_exceptions=True
+        )
+
+        counts = {
+            a_tag: {
+                "count": len(holders[a_tag]),
+                "exact": a_tag not in estimated,
+            }
+            for a_tag in a_tags
+        }
+        counts.update(local_counts)
+        return counts
@@ -0,0 +1,238 @@
+"""
+Discovery Snapshots - Static JSON copies of the Surf endpoints for a CDN
+
+Renders /surf/recent, /surf/popular, the pages of the most active issuers
+and the details and holders of the most held badges into plain JSON
+files. Each file has the same body as the endpoint, so the frontend can
+show a snapshot right away and only ask the backend for what changed
+since `generated_at`.
+
+Every run writes a new version directory and then replaces `latest.json`,
+so clients never read a half-written snapshot and versioned files can be
+cached forever:
+
+    <out>/latest.json                         manifest of the newest version
+    <out>/<version>/surf/recent.json          GET /surf/recent
+    <out>/<version>/surf/popular.json         GET /surf/popular
+    <out>/<version>/surf/issuer/<hex>.json    GET /surf/issuer/{pubkey}
+    <out>/<version>/surf/badge/<key>.json     {"details": ..., "owners": ...}
+
+Usage (from backend/):
+    python -m app.snapshot --out ../frontend/public/snapshots
+    python -m app.snapshot --out /srv/snapshots --interval 900
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .pagination import relay_set_hash
+from .routers.surf import BadgeInfo, BadgeListResponse, BadgeOwnersResponse
+from .services.surf_service import SurfService
+
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "common"))
+
+import relay_accounting
+from event_store import EVENT_STORE
+
+SNAPSHOT_FORMAT = 1
+
+# Version directories look like 20260101T120000Z
+VERSION_PATTERN = re.compile(r"^\d{8}T\d{6}Z$")
+
+# Issuer and badge pages rendered at the same time
+CONCURRENCY = 4
+
+
+def badge_key(a_tag: str) -> str:
+    """File name for a badge (a-tags contain colons)"""
+    return hashlib.sha256(a_tag.encode()).hexdigest()[:16]
+
+
+def _write_json(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+
+
+class SnapshotBuilder:
+    """Renders one snapshot version into a directory"""
+
+    def __init__(
+        self,
+        out_dir: Path,
+        recent_limit: int = 48,
+        popular_limit: int = 50,
+        issuers: int = 20,
+        badges: int = 20,
+        owners_limit: int = 50
+    ):
+        self.out_dir = out_dir
+        self.recent_limit = recent_limit
+        self.popular_limit = popular_limit
+        self.issuers = issuers
+        self.badges = badges
+        self.owners_limit = owners_limit
+        self.service = SurfService()
+
+    async def build(self) -> Dict[str, Any]:
+        """
+        Write a new version and point latest.json at it
+
+        Returns the manifest. The recent and popular lists are required;
+        if either is empty or left out relays that did not answer, the run
+        raises and latest.json keeps pointing at the previous version.
+        Issuer and badge pages that fail are left out.
+        """
+        generated_at = int(time.time())
+        version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(generated_at))
+        staging = self.out_dir / f".{version}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+
+        recent, next_cursor, recent_complete = await self.service.get_recent_badges_page(limit=self.recent_limit)
+        popular_sweep = relay_accounting.RelaySweep()
+
+        async def fetch_popular() -> List[Dict]:
+            relay_accounting.track_sweep(popular_sweep)
+            return await self.service.get_badges_with_stats(limit=self.popular_limit)
+
+        popular = await asyncio.create_task(fetch_popular())
+        # The relay queries return [] when they fail; an empty or partial list
+        # must not become a version that is cached forever
+        if not recent or not recent_complete:
+            raise RuntimeError(f"recent list is {'incomplete' if recent else 'empty'}")
+        if not popular or popular_sweep.degraded:
+            raise RuntimeError(f"popular list is {'incomplete' if popular else 'empty'}")
+        files: Dict[str, Any] = {
+            "recent": f"{version}/surf/recent.json",
+            "popular": f"{version}/surf/popular.json",
+            "issuers": {},
+            "badges": {},
+        }
+        _write_json(staging / "surf/recent.json", BadgeListResponse(
+            badges=recent, count=len(recent), next_cursor=next_cursor, complete=recent_complete
+        ).model_dump())
+        _write_json(staging / "surf/popular.json", BadgeListResponse(
+            badges=popular, count=len(popular)
+        ).model_dump())
+
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def issuer_page(pubkey: str) -> None:
+            async with semaphore:
+                badges = await self.service.get_badges_by_issuer(issuer_pubkey=pubkey, limit=50)
+            _write_json(staging / f"surf/issuer/{pubkey}.json", BadgeListResponse(
+                badges=badges, count=len(badges)
+            ).model_dump())
+            files["issuers"][pubkey] = f"{version}/surf/issuer/{pubkey}.json"
+
+        async def badge_page(a_tag: str) -> None:
+            async with semaphore:
+                details, owners = await asyncio.gather(
+                    self.service.get_badge_details(badge_a_tag=a_tag),
+                    self.service.get_badge_owners(
+                        badge_a_tag=a_tag, limit=self.owners_limit, include_profiles=True
+                    )
+                )
+            if not details:
+                return
+            key = badge_key(a_tag)
+            _write_json(staging / f"surf/badge/{key}.json", {
+                "details": BadgeInfo(**details).model_dump(),
+                "owners": BadgeOwnersResponse(
+                    owners=owners["owners"],
+                    total_count=owners["total_count"],
+                    complete=owners.get("complete")
+                ).model_dump(),
+            })
+            files["badges"][a_tag] = f"{version}/surf/badge/{key}.json"
+
+        issuer_counts = Counter(b["issuer_pubkey"] for b in recent + popular if b.get("issuer_pubkey"))
+        top_issuers = [pubkey for pubkey, _ in issuer_counts.most_common(self.issuers)]
+        top_badges = [b["a_tag"] for b in popular[:self.badges] if b.get("a_tag")]
+
+        results = await asyncio.gather(
+            *(issuer_page(pubkey) for pubkey in top_issuers),
+            *(badge_page(a_tag) for a_tag in top_badges),
+            return_exceptions=True
+        )
+        failed = sum(1 for r in results if isinstance(r, Exception))
+        if failed:
+            print(f"⚠️ Snapshot {version}: {failed} issuer/badge pages failed and were left out")
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "version": version,
+            "generated_at": generated_at,
+            "relays_hash": relay_set_hash(settings.relay_urls),
+            "files": files,
+        }
+        os.replace(staging, self.out_dir / version)
+        _write_json(self.out_dir / "latest.json.tmp", manifest)
+        os.replace(self.out_dir / "latest.json.tmp", self.out_dir / "latest.json")
+        print(
+            f"📸 Snapshot {version}: {len(recent)} recent, {len(popular)} popular, "
+            f"{len(files['issuers'])} issuers, {len(files['badges'])} badges"
+        )
+        return manifest
+
+    def prune(self, keep: int) -> None:
+        """Delete all but the newest `keep` versions (older ones may still be cached by clients)"""
+        versions = sorted(
+            p for p in self.out_dir.iterdir()
+            if p.is_dir() and VERSION_PATTERN.match(p.name)
+        )
+        for path in versions[:-keep] if keep > 0 else []:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Render Surf discovery data into static JSON snapshots")
+    parser.add_argument("--out", required=True, type=Path, help="Output directory (e.g. ../frontend/public/snapshots)")
+    parser.add_argument("--recent", type=int, default=48, help="Badges in recent.json (default 48)")
+    parser.add_argument("--issuers", type=int, default=20, help="Issuer pages to render (default 20)")
+    parser.add_argument("--badges", type=int, default=20, help="Badge detail/owner pages to render (default 20)")
+    parser.add_argument("--owners", type=int, default=50, help="Holders per badge page (default 50)")
+    parser.add_argument("--keep", type=int, default=3, help="Versions to keep (default 3)")
+    parser.add_argument("--interval", type=float, default=0, help="Regenerate every N seconds (default: run once)")
+    args = parser.parse_args(argv)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    if settings.event_store_enabled:
+        EVENT_STORE.open(settings.event_store_db_path)
+    builder = SnapshotBuilder(
+        args.out,
+        recent_limit=args.recent,
+        issuers=args.issuers,
+        badges=args.badges,
+        owners_limit=args.owners
+    )
+    try:
+        while True:
+            try:
+                await builder.build()
+                builder.prune(args.keep)
+            except Exception as e:
+                if not args.interval:
+                    raise
+                print(f"❌ Snapshot failed, keeping the previous version: {e}")
+            if not args.interval:
+                break
+            await asyncio.sleep(args.interval)
+    finally:
+        EVENT_STORE.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""
+Surf Feed - Live global stream of new badge definitions and awards
+
+One upstream subscription per relay for kind 30009 definitions and kind 8
+awards serves every /surf/live client, so the relays see the same load
+for one viewer or thousands. Events are deduplicated across relays and
+prepared once, then fanned out through bounded per-client queues; a
+client that falls behind is dropped instead of holding up the others.
+The subscriptions open with the first client and close a short while
+after the last one leaves. Their tasks run in their own context, not in
+the trace of the request that opened them.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .config import settings
+from .services.surf_service import KIND_BADGE_AWARD, KIND_BADGE_DEFINITION, SurfService
+
+# Add paths for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "common"))
+
+from live_subscription import Broadcast, LiveSubscription, create_detached_task
+
+
+class SurfFeed:
+    """Shared relay subscription and client fan-out for /surf/live"""
+
+    def __init__(self):
+        self.clients = Broadcast("surf", queue_size=settings.live_feed_queue_size)
+        self._subscription: Optional[LiveSubscription] = None
+        self._close_task: Optional[asyncio.Task] = None
+        self._tasks: set = set()
+
+    async def subscribe(self, keepalive: float = 15) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield new badge definitions and awards until the caller stops iterating
+
+        Items are {"type": "badge_definition", "data": <badge>} (same
+        fields as /surf/recent) or {"type": "badge_award", "data": <award>}.
+        Yields None after `keepalive` seconds without items. Iteration ends
+        if the caller falls more than LIVE_FEED_QUEUE_SIZE items behind.
+        """
+        self._open()
+        items = self.clients.listen(keepalive)
+        try:
+            async for item in items:
+                yield item
+        finally:
+            await items.aclose()
+            if not self.clients:
+                self._close_task = create_detached_task(self._close_later())
+
+    async def close(self) -> None:
+        """Stop the upstream subscription (on shutdown)"""
+        for task in [*self._tasks, self._close_task]:
+            if task:
+                task.cancel()
+        if self._subscription:
+            await self._subscription.stop()
+            self._subscription = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self.clients),
+            "connected_relays": sum(self._subscription.connected.values()) if self._subscription else 0,
+        }
+
+    def _open(self) -> None:
+        if self._close_task:
+            self._close_task.cancel()
+            self._close_task = None
+        if self._subscription:
+            return
+        self._subscription = LiveSubscription(
+            settings.relay_urls[:settings.surf_live_max_relays],
+            [{"kinds": [KIND_BADGE_DEFINITION]}, {"kinds": [KIND_BADGE_AWARD]}],
+            on_event=self._on_event,
+            name="surf"
+        )
+        self._subscription.start()
+        print("📡 Surf live feed opened")
+
+    async def _close_later(self) -> None:
+        await asyncio.sleep(settings.live_feed_linger_seconds)
+        if self._subscription and not self.clients:
+            subscription, self._subscription = self._subscription, None
+            await subscription.stop()
+            print("📡 Surf live feed closed")
+
+    def _on_event(self, event: Dict[str, Any]) -> None:
+        if event.get("kind") == KIND_BADGE_AWARD:
+            self._publish_award(event)
+            return
+        task = create_detached_task(self._publish_definition(event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _publish_award(self, event: Dict[str, Any]) -> None:
+        tags = event.get("tags", [])
+        a_tag = next((t[1] for t in tags if len(t) > 1 and t[0] == "a"), None)
+        if not a_tag:
+            return
+        self.clients.publish({
+            "type": "badge_award",
+            "data": {
+                "award_event_id": event["id"],
+                "a_tag": a_tag,
+                "issuer_pubkey": event.get("pubkey"),
+                "recipient_count": sum(1 for t in tags if len(t) > 1 and t[0] == "p"),
+                "created_at": event.get("created_at"),
+            }
+        })
+
+    async def _publish_definition(self, event: Dict[str, Any]) -> None:
+        service = SurfService()
+        badge = service._parse_badge_event(event)
+        if badge is None:
+            return
+        try:
+            await service._enrich_with_issuer_profiles([badge])
+        except Exception as e:
+            print(f"⚠️ Surf live feed could not load issuer profile: {e}")
+        self.clients.publish({"type": "badge_definition", "data": badge})
+
+
+# Process-wide feed (served by /surf/live)
+surf_feed = SurfFeed()
@@ -0,0 +1,125 @@
+"""
+merge_page: multi-relay keyset pagination with failing and capped relays
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.pagination import MAX_RELAY_FAILURES, Cursor, merge_page
+
+
+def ev(created_at: int, name: str) -> Dict:
+    return {"id": name, "created_at": created_at}
+
+
+def answer(events: List[Dict], until: Optional[int], limit: int) -> List[Dict]:
+    """What a relay returns for {"until": until, "limit": limit}"""
+    matching = [e for e in events if until is None or e["created_at"] <= until]
+    return sorted(matching, key=lambda e: (-e["created_at"], e["id"]))[:limit]
+
+
+def paginate(
+    relays: List[List[Dict]],
+    limit: int,
+    max_limit: Optional[int] = None,
+    failures: Set[Tuple[int, int]] = frozenset()
+) -> Tuple[List[List[Dict]], List[bool]]:
+    """Pages until has_more is False, the way fetch_page asks relays; failures holds (page, relay) pairs"""
+    cursor = Cursor.start([f"wss://relay{i}" for i in range(len(relays))])
+    pages, complete_flags = [], []
+    for page_number in range(100):
+        # Every page goes through the encoded cursor, as between requests
+        cursor = Cursor.decode(cursor.encode(), [f"wss://relay{i}" for i in range(len(relays))])
+        relay_events, requested = {}, {}
+        for index, events in enumerate(relays):
+            position = cursor.position(index)
+            if position.exhausted:
+                continue
+            requested[index] = limit + position.skip
+            if max_limit:
+                requested[index] = min(requested[index], max_limit)
+            if (page_number, index) in failures:
+                relay_events[index] = None
+            else:
+                relay_events[index] = answer(events, position.until, requested[index])
+        page, has_more, complete = merge_page(cursor, relay_events, requested, limit)
+        pages.append(page)
+        complete_flags.append(complete)
+        if not has_more:
+            return pages, complete_flags
+    raise AssertionError("pagination did not terminate")
+
+
+def ids(pages: List[List[Dict]]) -> List[str]:
+    return [e["id"] for page in pages for e in page]
+
+
+def test_pages_cover_all_relays_in_order():
+    a = [ev(100, "a1"), ev(95, "a2"), ev(90, "a3"), ev(80, "a4")]
+    b = [ev(99, "b1"), ev(96, "b2"), ev(95, "a2"), ev(85, "b3")]
+    pages, complete = paginate([a, b], limit=2)
+    assert ids(pages) == ["a1", "b1", "b2", "a2", "a3", "b3", "a4"]
+    assert all(complete)
+
+
+def test_failed_relay_stops_the_page_instead_of_skipping():
+    a = [ev(100, "a1"), ev(95, "a2"), ev(90, "a3")]
+    b = [ev(99, "b1"), ev(96, "b2"), ev(94, "b3")]
+    pages, complete = paginate([a, b], limit=2, failures={(1, 1)})
+    # Page 1 stops where relay 1 left off rather than returning a2 and a3 past b2
+    assert ids(pages[:1]) == ["a1", "b1"]
+    assert pages[1] == []
+    assert complete[:2] == [True, False]
+    assert ids(pages) == ["a1", "b1", "b2", "a2", "b3", "a3"]
+
+
+def test_failed_relay_on_first_page_is_given_up():
+    a = [ev(100, "a1"), ev(90, "a2")]
+    b = [ev(95, "b1")]
+    pages, complete = paginate([a, b], limit=5, failures={(0, 1)})
+    # Nothing of relay 1 can be placed, so the others are not held back
+    assert ids(pages) == ["a1", "a2"]
+    assert complete == [False]
+
+
+def test_relay_failing_repeatedly_is_given_up():
+    a = [ev(100 - i, f"a{i}") for i in range(8)]
+    b = [ev(99, "b1"), ev(50, "b2")]
+    failing = {(page, 1) for page in range(1, 1 + MAX_RELAY_FAILURES)}
+    pages, complete = paginate([a, b], limit=2, failures=failing)
+    # Pages stop at relay 1's position while it may still come back...
+    assert all(page == [] for page in pages[1:MAX_RELAY_FAILURES])
+    # ...then pagination goes on without it (b1 and b2 are left out) and says so
+    assert ids(pages) == [f"a{i}" for i in range(8)]
+    assert complete[0] is True
+    assert not any(complete[1:])
+
+
+def test_failure_count_resets_when_the_relay_answers():
+    a = [ev(100 - i, f"a{i}") for i in range(6)]
+    b = [ev(99 - i, f"b{i}") for i in range(6)]
+    failing = {(1, 1), (3, 1), (5, 1), (7, 1)}
+    pages, complete = paginate([a, b], limit=2, failures=failing)
+    expected = sorted(a + b, key=lambda e: (-e["created_at"], e["id"]))
+    assert ids(pages) == [e["id"] for e in expected]
+    assert complete[-1] is True
+
+
+def test_capped_relay_limit_without_crowded_seconds():
+    a = [ev(100 - i, f"a{i:02}") for i in range(12)]
+    b = [ev(100 - i, f"b{i:02}") for i in range(0, 12, 2)]
+    pages, _ = paginate([a, b], limit=5, max_limit=3)
+    expected = sorted(a + b, key=lambda e: (-e["created_at"], e["id"]))
+    assert ids(pages) == [e["id"] for e in expected]
+
+
+def test_capped_relay_limit_loses_a_crowded_second():
+    # More events in one second than the relay's max_limit: once a full answer
+    # holds only events already returned, the relay steps below that second
+    crowded = [ev(100, f"c{i}") for i in range(5)]
+    older = [ev(90, "old")]
+    pages, _ = paginate([crowded + older], limit=2, max_limit=3)
+    returned = ids(pages)
+    assert len(returned) == len(set(returned))
+    assert returned[:3] == ["c0", "c1", "c2"]
+    assert "old" in returned
+    assert not {"c3", "c4"} & set(returned)
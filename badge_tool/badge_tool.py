@@ -11,6 +11,8 @@ from pathlib import Path
 # Import from common directory
 sys.path.insert(0, str(Path(__file__).parent.parent / "common"))
 from badge_creator import BadgeCreator, normalize_pubkey, normalize_pubkey_to_npub
+from bulk_award import BulkAwardEngine
+from recipient_import import RecipientImport
 from recipient_acceptance import BadgeAcceptanceManager
 from relay_manager import RelayManager
 
@@ -123,6 +125,33 @@ async def award_badge(badge_creator, a_tag, recipients, relay_urls):
         return result['event']['id']
 
 
+def check_recipients_file(path):
+    """Validate a CSV/JSONL recipient file row by row and print a summary"""
+    recipients_import = RecipientImport.from_path(path)
+    for _ in recipients_import:
+        pass
+    report = recipients_import.report()
+
+    print(f"\n📄 {path}: {report['valid']} valid, {report['invalid']} invalid row(s)")
+    for row in report["invalid_rows"][:20]:
+        print(f"   ❌ line {row['line']}: {row['input']} - {row['error']}")
+    if report["invalid"] > 20:
+        print(f"   ... and {report['invalid'] - 20} more")
+    return report["valid"]
+
+
+async def award_badge_from_file(badge_creator, a_tag, path, relay_urls):
+    """Award badge to every valid recipient in a file, streaming it into chunked award events"""
+    print(f"\n🎯 Awarding badge to recipients from {path}...")
+    engine = BulkAwardEngine(badge_creator, relay_urls)
+    result = await engine.award(a_tag, RecipientImport.from_path(path))
+
+    print(f"\n📦 {result['published_chunks']}/{result['total_chunks']} award event(s) published")
+    for event_id in result["award_event_ids"]:
+        print(f"   Award Event ID: {event_id}")
+    return result
+
+
 async def accept_badge():
     """Accept badge workflow"""
     print("\n🏅 Badge Acceptance Tool")
@@ -155,7 +184,7 @@ async def accept_badge():
         print(f"⚠️ Badge accepted but not yet verified")
 
 
-async def main():
+async def main(recipients_file=None):
     """Main badge tool workflow"""
     print("🏅 Nostr Badge Tool")
     print("=" * 50)
@@ -197,30 +226,38 @@ async def main():
         print("❌ Invalid selection")
         return
     
-    # Get recipients (user enters npub or hex)
-    recipients = get_recipients()
-    if not recipients:
-        print("❌ No recipients provided")
-        return
-
-    # Normalize all recipients to HEX
-    normalized_recipients = []
-    for r in recipients:
-        try:
-            # normalize_pubkey is imported directly from badge_creator
-            normalized_hex = normalize_pubkey(r)
-            normalized_recipients.append(normalized_hex)
-        except Exception as e:
-            print(f"❌ Invalid recipient pubkey: {r}")
-            print(f"   {e}")
+    if recipients_file:
+        # Recipients from file: validated here, streamed again when awarding
+        recipient_count = check_recipients_file(recipients_file)
+        if not recipient_count:
+            print("❌ No valid recipients in file")
+            return
+    else:
+        # Get recipients (user enters npub or hex)
+        recipients = get_recipients()
+        if not recipients:
+            print("❌ No recipients provided")
             return
 
-    recipients = normalized_recipients  # ← final list of valid hex pubkeys
-    print("Recipients normalized to HEX:")
-    for h in recipients:
-        print("   ", h)
+        # Normalize all recipients to HEX
+        normalized_recipients = []
+        for r in recipients:
+            try:
+                # normalize_pubkey is imported directly from badge_creator
+                normalized_hex = normalize_pubkey(r)
+                normalized_recipients.append(normalized_hex)
+            except Exception as e:
+                print(f"❌ Invalid recipient pubkey: {r}")
+                print(f"   {e}")
+                return
 
-    print(f"\n🎯 Ready to award '{badge_name}' to {len(recipients)} recipient(s)")
+        recipients = normalized_recipients  # ← final list of valid hex pubkeys
+        print("Recipients normalized to HEX:")
+        for h in recipients:
+            print("   ", h)
+        recipient_count = len(recipients)
+
+    print(f"\n🎯 Ready to award '{badge_name}' to {recipient_count} recipient(s)")
     confirm = input("Proceed? (y/n): ").lower()
     if confirm != "y":
         print("❌ Cancelled")
@@ -238,6 +275,13 @@ async def main():
     a_tag = await create_badge_definition(badge_creator, badge_data, relay_urls)
     
     # Award badge
+    if recipients_file:
+        result = await award_badge_from_file(badge_creator, a_tag, recipients_file, relay_urls)
+        print(f"\n🎉 DONE: {result['recipients_published']} of {result['recipients_count']} recipient(s) awarded")
+        print(f"   Badge: {badge_name}")
+        print(f"   A-tag: {a_tag}")
+        return
+
     award_event_id = await award_badge(badge_creator, a_tag, recipients, relay_urls)
     
     # Show results
@@ -259,9 +303,14 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description="Nostr Badge Tool")
     parser.add_argument("--accept", action="store_true", help="Accept badge mode")
+    parser.add_argument(
+        "--recipients-file",
+        metavar="PATH",
+        help="CSV or JSONL file with recipient pubkeys (npub or hex) instead of typing them"
+    )
     args = parser.parse_args()
     
     if args.accept:
         asyncio.run(accept_badge())
     else:
-        asyncio.run(main())
+        asyncio.run(main(recipients_file=args.recipients_file))
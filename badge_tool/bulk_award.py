@@ -0,0 +1,265 @@
+"""
+Bulk Badge Awarding - NIP-58 awards for large recipient lists
+Splits recipients into relay-size-safe kind 8 events, signs them in parallel
+and publishes them concurrently with per-chunk retry
+"""
+
+import asyncio
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, List, Optional, Union
+
+from badge_creator import BadgeCreator, normalize_pubkey
+
+# Import from common directory
+sys.path.insert(0, str(Path(__file__).parent.parent / "common"))
+from outbox import OUTBOX
+from relay_capabilities import RELAY_CAPABILITIES
+from relay_manager import RelayManager
+
+
+# Recipients per award event. Many relays cap events at 64 KiB and some
+# limit the number of tags, so stay well below both.
+DEFAULT_CHUNK_SIZE = 500
+MAX_EVENT_BYTES = 60_000
+
+# Serialized size of one ["p", "<64 hex>"] tag plus separator
+_P_TAG_BYTES = len(json.dumps(["p", "0" * 64])) + 2
+# Room for id, pubkey, sig, created_at, the a-tag and content
+_EVENT_OVERHEAD_BYTES = 1024
+
+
+def normalize_recipient(raw: str) -> str:
+    """Normalize one npub/hex recipient to lowercase hex (raises ValueError)"""
+    return normalize_pubkey((raw or "").strip()).lower()
+
+
+async def _aiter(items: Union[Iterable[str], AsyncIterable[str]]) -> AsyncIterator[str]:
+    """Iterate sync and async recipient sources alike"""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+def chunk_size_limit(chunk_size: int = DEFAULT_CHUNK_SIZE, max_event_bytes: int = MAX_EVENT_BYTES) -> int:
+    """Largest number of p-tags per award event within chunk_size and max_event_bytes"""
+    by_size = (max_event_bytes - _EVENT_OVERHEAD_BYTES) // _P_TAG_BYTES
+    return max(1, min(chunk_size, by_size))
+
+
+@dataclass
+class ChunkResult:
+    """Outcome of publishing one award event of a bulk award"""
+    index: int
+    recipients: int
+    event_id: Optional[str] = None
+    status: str = "pending"  # pending, signed, published, failed
+    attempts: int = 0
+    relays: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def published_relays(self) -> int:
+        return sum(1 for r in self.relays if r["published"] or r["verified"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "recipients": self.recipients,
+            "event_id": self.event_id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "published_relays": self.published_relays,
+            "relays": self.relays,
+            "error": self.error,
+        }
+
+
+class BulkAwardEngine:
+    """Award one badge to thousands of recipients as a series of kind 8 events"""
+
+    def __init__(
+        self,
+        badge_creator: BadgeCreator,
+        relay_urls: List[str],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_concurrent_chunks: int = 4,
+        max_retries: int = 2,
+        retry_delay: float = 1.0,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        max_reported_invalid: int = 100
+    ):
+        self.badge_creator = badge_creator
+        self.relay_urls = relay_urls
+        self.chunk_size = chunk_size
+        self.max_concurrent_chunks = max_concurrent_chunks
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.on_progress = on_progress
+        self.max_reported_invalid = max_reported_invalid
+        self.chunks: List[ChunkResult] = []
+        self.invalid: List[Dict[str, str]] = []
+        self.invalid_count = 0
+
+    async def award(
+        self,
+        a_tag: str,
+        recipients: Union[Iterable[str], AsyncIterable[str]]
+    ) -> Dict[str, Any]:
+        """
+        Normalize, chunk, sign and publish awards for all recipients
+
+        Recipients are consumed as a stream: each chunk is signed and
+        published as soon as it is full, and reading pauses while
+        max_concurrent_chunks chunks are in flight, so memory stays bounded
+        apart from the set used to drop duplicates.
+
+        Invalid recipients are reported but do not stop the award. A chunk
+        counts as published once at least one relay accepts it; chunks no
+        relay accepts are retried with exponential backoff.
+        """
+        self.chunks = []
+        self.invalid = []
+        self.invalid_count = 0
+        seen = set()
+        limit = chunk_size_limit(self.chunk_size, await self._max_event_bytes())
+        semaphore = asyncio.Semaphore(self.max_concurrent_chunks)
+        tasks: List[asyncio.Task] = []
+        group: List[str] = []
+
+        async for raw in _aiter(recipients):
+            try:
+                hex_pubkey = normalize_recipient(raw)
+            except Exception as e:
+                self.invalid_count += 1
+                if len(self.invalid) < self.max_reported_invalid:
+                    self.invalid.append({"input": raw, "error": str(e)})
+                continue
+            if hex_pubkey in seen:
+                continue
+            seen.add(hex_pubkey)
+            group.append(hex_pubkey)
+
+            if len(group) >= limit:
+                tasks.append(await self._dispatch(semaphore, a_tag, group))
+                group = []
+
+        if group:
+            tasks.append(await self._dispatch(semaphore, a_tag, group))
+
+        if self.invalid_count:
+            print(f"⚠️ Skipped {self.invalid_count} invalid recipient(s)")
+        print(f"🏅 Bulk award: {len(seen)} recipient(s) in {len(self.chunks)} award event(s)")
+
+        await asyncio.gather(*tasks)
+        return self.summary(len(seen))
+
+    async def _max_event_bytes(self) -> int:
+        """MAX_EVENT_BYTES, lowered to the smallest NIP-11 max_message_length of the relays"""
+        capabilities = await RELAY_CAPABILITIES.prefetch(self.relay_urls)
+        limits = [c.max_message_length for c in capabilities if c.max_message_length]
+        return min([MAX_EVENT_BYTES] + limits)
+
+    async def _dispatch(self, semaphore: asyncio.Semaphore, a_tag: str, group: List[str]) -> asyncio.Task:
+        """Wait for a free slot, then sign and publish one chunk in the background"""
+        await semaphore.acquire()
+        chunk = ChunkResult(index=len(self.chunks), recipients=len(group))
+        self.chunks.append(chunk)
+        return asyncio.create_task(self._sign_and_publish(semaphore, a_tag, group, chunk))
+
+    async def _sign_and_publish(
+        self,
+        semaphore: asyncio.Semaphore,
+        a_tag: str,
+        group: List[str],
+        chunk: ChunkResult
+    ):
+        try:
+            # Sign in a worker thread so thousands of tags do not block the event loop
+            loop = asyncio.get_running_loop()
+            event = await loop.run_in_executor(None, self.badge_creator.create_badge_award, a_tag, group)
+            chunk.event_id = event["id"]
+            chunk.status = "signed"
+            self._report()
+            await self._publish_chunk(event, chunk)
+        except Exception as e:
+            chunk.status = "failed"
+            chunk.error = str(e)
+            print(f"❌ Chunk {chunk.index + 1} failed: {e}")
+            self._report()
+        finally:
+            semaphore.release()
+
+    async def _publish_chunk(self, event: Dict[str, Any], chunk: ChunkResult):
+        results = []
+        for attempt in range(self.max_retries + 1):
+            chunk.attempts = attempt + 1
+            relay_manager = RelayManager()
+            # This loop retries; only the final outcome goes to the outbox (below)
+            results = await relay_manager.publish_event(
+                event, self.relay_urls, concurrent=True, retry_failed=False
+            )
+            chunk.relays = [
+                {"relay": r.relay, "published": r.published, "verified": r.verified, "error": r.error}
+                for r in results
+            ]
+            if chunk.published_relays > 0:
+                chunk.status = "published"
+                chunk.error = None
+                break
+
+            chunk.error = "No relay accepted the event"
+            if attempt < self.max_retries:
+                delay = self.retry_delay * (2 ** attempt)
+                print(f"🔁 Chunk {chunk.index + 1} rejected, retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+        else:
+            chunk.status = "failed"
+        # Relays that still lack the event are retried in the background, once per chunk
+        await OUTBOX.enqueue(event, results)
+
+        icon = "✅" if chunk.status == "published" else "❌"
+        print(
+            f"{icon} Chunk {chunk.index + 1}: {chunk.recipients} recipient(s), "
+            f"{chunk.published_relays}/{len(self.relay_urls)} relay(s)"
+        )
+        self._report()
+
+    def progress(self) -> Dict[str, Any]:
+        """Current counts of signed, published and failed chunks"""
+        return {
+            "total_chunks": len(self.chunks),
+            "signed_chunks": sum(1 for c in self.chunks if c.status != "pending"),
+            "published_chunks": sum(1 for c in self.chunks if c.status == "published"),
+            "failed_chunks": sum(1 for c in self.chunks if c.status == "failed"),
+            "recipients_total": sum(c.recipients for c in self.chunks),
+            "recipients_published": sum(c.recipients for c in self.chunks if c.status == "published"),
+        }
+
+    def _report(self) -> None:
+        if self.on_progress:
+            self.on_progress(self.progress())
+
+    def summary(self, recipients_count: int) -> Dict[str, Any]:
+        progress = self.progress()
+        if self.chunks and progress["published_chunks"] == len(self.chunks):
+            status = "success"
+        elif progress["published_chunks"] > 0:
+            status = "partial"
+        else:
+            status = "failed"
+
+        return {
+            "status": status,
+            "recipients_count": recipients_count,
+            "invalid_recipients": self.invalid,
+            "invalid_count": self.invalid_count,
+            "award_event_ids": [c.event_id for c in self.chunks if c.status == "published"],
+            "chunks": [c.to_dict() for c in self.chunks],
+            **progress,
+        }
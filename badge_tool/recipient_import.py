@@ -0,0 +1,183 @@
+"""
+Recipient Import - Stream-parse CSV or JSONL recipient lists
+Validates and normalizes each row (npub or hex) without loading the file into memory
+"""
+
+import asyncio
+import csv
+import io
+import itertools
+import json
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from badge_creator import normalize_pubkey
+
+# Column (CSV header) or key (JSONL object) names holding the recipient pubkey
+PUBKEY_FIELDS = ("pubkey", "npub", "recipient", "hex", "public_key")
+
+# Rows parsed per worker-thread round trip when iterated with `async for`
+ASYNC_BATCH_SIZE = 500
+
+_FORMATS_BY_SUFFIX = {
+    ".csv": "csv",
+    ".txt": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """Guess csv/jsonl from a file name, None if unknown"""
+    if not filename:
+        return None
+    return _FORMATS_BY_SUFFIX.get(Path(filename).suffix.lower())
+
+
+class RecipientImport:
+    """
+    Iterate normalized hex pubkeys from a CSV or JSONL line stream
+
+    CSV files may have a header naming the pubkey column (pubkey, npub,
+    recipient, hex or public_key); otherwise the first column is used. A
+    plain list with one pubkey per line is read as single-column CSV.
+    JSONL lines may be objects with one of those keys or bare JSON strings.
+    Blank lines and lines starting with '#' are skipped.
+
+    Invalid rows are counted and the first `max_reported_errors` are kept
+    with their line number, so memory use does not grow with the file.
+    """
+
+    def __init__(self, lines: Iterable[str], fmt: Optional[str] = None, max_reported_errors: int = 100):
+        if fmt not in (None, "csv", "jsonl"):
+            raise ValueError(f"Unsupported recipient file format: {fmt}")
+        self.lines = lines
+        self.format = fmt
+        self.max_reported_errors = max_reported_errors
+        self.rows = 0
+        self.valid = 0
+        self.invalid = 0
+        self.invalid_rows: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_path(cls, path: str, fmt: Optional[str] = None, **kwargs) -> "RecipientImport":
+        """Read from a file on disk (opened lazily when iterated)"""
+        def lines() -> Iterator[str]:
+            with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+                yield from f
+        return cls(lines(), fmt or detect_format(path), **kwargs)
+
+    @classmethod
+    def from_binary(cls, fileobj: BinaryIO, filename: Optional[str] = None, **kwargs) -> "RecipientImport":
+        """Read from a binary file object, e.g. an uploaded file"""
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="replace", newline="")
+        return cls(text, detect_format(filename), **kwargs)
+
+    def __iter__(self) -> Iterator[str]:
+        lines = iter(self.lines)
+        if self.format is None:
+            # Sniff the first meaningful line, then put it back
+            head = []
+            for line in lines:
+                head.append(line)
+                stripped = line.strip()
+                if stripped and not stripped.startswith("#"):
+                    self.format = "jsonl" if stripped[0] in "{\"" else "csv"
+                    break
+            lines = itertools.chain(head, lines)
+
+        if self.format == "jsonl":
+            return self._iter_jsonl(lines)
+        return self._iter_csv(lines)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        """
+        Like iterating, but reading and normalizing run in a worker thread
+
+        Rows are parsed ASYNC_BATCH_SIZE at a time, so large files do not
+        block the event loop and consumers can start on the first batch
+        while the rest of the file is still unread.
+        """
+        rows = iter(self)
+        while True:
+            batch = await asyncio.to_thread(list, itertools.islice(rows, ASYNC_BATCH_SIZE))
+            if not batch:
+                return
+            for hex_pubkey in batch:
+                yield hex_pubkey
+
+    def _iter_csv(self, lines: Iterator[str]) -> Iterator[str]:
+        reader = csv.reader(lines)
+        column = 0
+        header_checked = False
+
+        for row in reader:
+            cells = [c.strip() for c in row]
+            if not any(cells) or cells[0].startswith("#"):
+                continue
+
+            if not header_checked:
+                header_checked = True
+                names = [c.lower() for c in cells]
+                match = next((i for i, name in enumerate(names) if name in PUBKEY_FIELDS), None)
+                if match is not None:
+                    column = match
+                    continue
+
+            value = cells[column] if column < len(cells) else ""
+            hex_pubkey = self._validate(value, reader.line_num)
+            if hex_pubkey:
+                yield hex_pubkey
+
+    def _iter_jsonl(self, lines: Iterator[str]) -> Iterator[str]:
+        for line_num, line in enumerate(lines, start=1):
+            stripped = line.strip()
+            if not stripped or stripped.startswith("#"):
+                continue
+
+            try:
+                data = json.loads(stripped)
+            except json.JSONDecodeError as e:
+                self._reject(line_num, stripped[:100], f"Invalid JSON: {e.msg}")
+                continue
+
+            if isinstance(data, dict):
+                value = next((data[k] for k in PUBKEY_FIELDS if isinstance(data.get(k), str)), None)
+            else:
+                value = data if isinstance(data, str) else None
+
+            if value is None:
+                self._reject(line_num, stripped[:100], f"Expected a string or an object with one of: {', '.join(PUBKEY_FIELDS)}")
+                continue
+
+            hex_pubkey = self._validate(value, line_num)
+            if hex_pubkey:
+                yield hex_pubkey
+
+    def _validate(self, value: str, line_num: int) -> Optional[str]:
+        self.rows += 1
+        try:
+            hex_pubkey = normalize_pubkey(value).lower()
+        except Exception as e:
+            self._reject(line_num, value, str(e), counted=True)
+            return None
+        self.valid += 1
+        return hex_pubkey
+
+    def _reject(self, line_num: int, value: str, error: str, counted: bool = False) -> None:
+        if not counted:
+            self.rows += 1
+        self.invalid += 1
+        if len(self.invalid_rows) < self.max_reported_errors:
+            self.invalid_rows.append({"line": line_num, "input": value, "error": error})
+
+    def report(self) -> Dict[str, Any]:
+        """Row counts and the first invalid rows (after iteration)"""
+        return {
+            "format": self.format,
+            "rows": self.rows,
+            "valid": self.valid,
+            "invalid": self.invalid,
+            "invalid_rows": self.invalid_rows,
+            "invalid_rows_truncated": self.invalid > len(self.invalid_rows),
+        }
@@ -0,0 +1,223 @@
+"""
+History Backfill for Nostr Badge Tool
+Pages backward through each relay with `until` windows and merges the histories newest-first
+"""
+
+import asyncio
+import heapq
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from event_store import (
+    EVENT_STORE, KIND_DELETION, EventStore, current_events, event_address, is_addressable
+)
+from filter_planner import FilterPlan, matches
+from relay_capabilities import RELAY_CAPABILITIES
+from relay_manager import query_relay_filters
+
+# Events requested per window (clamped to the relay's max_limit)
+PAGE_SIZE = 500
+
+# Windows fetched from one relay per call; the next call resumes from the checkpoint
+MAX_PAGES = 40
+
+# Seconds re-fetched before the newest checkpoint when only the newest window is needed
+NEWEST_OVERLAP = 600
+
+
+@dataclass
+class BackfillResult:
+    """Merged history of one filter across relays"""
+    events: List[Dict[str, Any]]
+    complete: bool  # every relay's history was paged to the end
+    fetched: int = 0
+
+
+def _newest_first(event: Dict[str, Any]) -> Tuple[int, str]:
+    return -event.get("created_at", 0), event.get("id", "")
+
+
+def merge_newest_first(histories: Iterable[List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+    """k-way merge of newest-first event lists, dropping duplicate ids"""
+    seen = set()
+    for event in heapq.merge(*histories, key=_newest_first):
+        if event.get("id") in seen:
+            continue
+        seen.add(event.get("id"))
+        yield event
+
+
+async def relay_history(
+    relay: str,
+    filter_params: Dict[str, Any],
+    until: Optional[int] = None,
+    since: Optional[int] = None,
+    max_pages: int = MAX_PAGES
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Page backward through one relay's events for a filter
+
+    Each window asks for events up to `until` (inclusive, so events that
+    share the boundary second are not lost) and the next window starts at
+    the oldest event received. Returns the events newest-first and whether
+    the relay ran out of history (a window came back short). Raises
+    RelayQueryIncomplete if a window fails.
+    """
+    plan = FilterPlan(RELAY_CAPABILITIES.cached(relay))
+    page_size = plan.effective_limit({"limit": PAGE_SIZE}) or PAGE_SIZE
+    events_by_id: Dict[str, Dict[str, Any]] = {}
+
+    for page in range(max_pages):
+        window = {**filter_params, "limit": page_size}
+        if until is not None:
+            window["until"] = until
+        if since is not None:
+            window["since"] = since
+        events = await query_relay_filters(relay, f"backfill_{page}", window, timeout=15, strict=True)
+
+        new_events = [ev for ev in events if ev.get("id") and ev["id"] not in events_by_id]
+        for ev in new_events:
+            events_by_id[ev["id"]] = ev
+        if len(events) < page_size:
+            return sorted(events_by_id.values(), key=_newest_first), True
+
+        oldest = min(ev.get("created_at", 0) for ev in events)
+        # A full window of one second that brought nothing new: step past that second
+        until = oldest if new_events and oldest != until else oldest - 1
+        if since is not None and until < since:
+            return sorted(events_by_id.values(), key=_newest_first), True
+
+    return sorted(events_by_id.values(), key=_newest_first), False
+
+
+async def backfill_relay(
+    relay: str,
+    target: str,
+    filter_params: Dict[str, Any],
+    store: EventStore = EVENT_STORE
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Backfill one relay, resuming from its checkpoint
+
+    The first run pages back from now. A run cut short by MAX_PAGES
+    continues next time below the oldest event reached. Once a relay's
+    history is exhausted, later runs only fetch the newest window since
+    the last run. Returns the events fetched and whether the history is
+    complete.
+    """
+    filter_params = {k: v for k, v in filter_params.items() if k not in ("limit", "until")}
+    state = await asyncio.to_thread(store.backfill_state, relay, target)
+    started = int(time.time())
+
+    head: List[Dict[str, Any]] = []
+    if state:
+        head, _ = await relay_history(relay, filter_params, since=max(0, state["newest"] - NEWEST_OVERLAP))
+
+    if state and state["complete"]:
+        tail, exhausted = [], True
+    else:
+        tail, exhausted = await relay_history(relay, filter_params, until=state["oldest"] if state else None)
+
+    events = list(merge_newest_first([head, tail]))
+    timestamps = [ev.get("created_at", 0) for ev in events]
+    newest = max(timestamps + ([state["newest"]] if state else []), default=0)
+    oldest = min([ev.get("created_at", 0) for ev in tail] + ([state["oldest"]] if state else []), default=started)
+    complete = exhausted or bool(state and state["complete"])
+
+    def save() -> None:
+        store.add_events(events)
+        store.set_backfill_state(relay, target, newest, oldest, complete)
+        if complete:
+            # The sync engine may treat this target as synced with the relay
+            store.set_checkpoint(relay, target, "backfill", started)
+
+    await asyncio.to_thread(save)
+    return events, complete
+
+
+async def fetch_current(relays: List[str], events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Newer versions of and deletions for a set of events
+
+    A history filter such as `#a` only returns the versions of an
+    addressable event that match it, not the newer version that replaced
+    them, and never the kind 5 events that deleted them. This asks the
+    relays for the newest version of every replaceable/addressable
+    address among `events` and for the authors' deletions of any of them.
+    Failing relays are skipped.
+    """
+    authors = sorted({ev["pubkey"] for ev in events if ev.get("pubkey")})
+    if not authors:
+        return []
+    filters = [{"kinds": [KIND_DELETION], "authors": authors, "#e": [ev["id"] for ev in events if ev.get("id")]}]
+    addresses: Dict[int, set] = {}
+    for ev in events:
+        address = event_address(ev)
+        if address:
+            addresses.setdefault(ev["kind"], set()).add(address)
+    if addresses:
+        filters.append({
+            "kinds": [KIND_DELETION], "authors": authors,
+            "#a": sorted(a for kind_addresses in addresses.values() for a in kind_addresses)
+        })
+    for kind, kind_addresses in addresses.items():
+        version_filter = {"kinds": [kind], "authors": authors}
+        if is_addressable(kind):
+            version_filter["#d"] = sorted({a.split(":", 2)[2] for a in kind_addresses})
+        filters.append(version_filter)
+
+    results = await asyncio.gather(
+        *(query_relay_filters(relay, "current", filters, timeout=15) for relay in relays),
+        return_exceptions=True
+    )
+    return [ev for result in results if isinstance(result, list) for ev in result]
+
+
+async def backfill(
+    relays: List[str],
+    target: str,
+    filter_params: Dict[str, Any],
+    store: EventStore = EVENT_STORE
+) -> BackfillResult:
+    """
+    Full history of a filter across relays, newest first and deduplicated
+
+    With the event store enabled the result is read back from the store,
+    so history fetched by earlier runs is included; otherwise the relay
+    histories are merged directly. Events replaced by a newer version
+    (NIP-01) or deleted by their author (NIP-09) are left out. Only the
+    events fetched in this call are checked against the relays; stored
+    ones were checked by the call that fetched them.
+    """
+    results = await asyncio.gather(
+        *(backfill_relay(relay, target, filter_params, store) for relay in relays),
+        return_exceptions=True
+    )
+
+    histories = []
+    complete = True
+    for relay, result in zip(relays, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Backfill of {target} on {relay} failed: {result}")
+            complete = False
+            continue
+        events, relay_complete = result
+        histories.append(events)
+        complete = complete and relay_complete
+
+    fetched = sum(len(h) for h in histories)
+    history_filter = {k: v for k, v in filter_params.items() if k not in ("limit", "until")}
+    events = list(merge_newest_first(histories))
+    # Only this call's events: stored ones were checked when they were fetched
+    current = await fetch_current(relays, events)
+    if store.enabled:
+        # The store replaces superseded versions and applies the deletions
+        await asyncio.to_thread(store.add_events, current)
+        events = await asyncio.to_thread(store.query, history_filter)
+    else:
+        events = sorted(
+            (ev for ev in current_events(events + current) if matches(ev, history_filter)),
+            key=_newest_first
+        )
+    return BackfillResult(events=events, complete=complete, fetched=fetched)
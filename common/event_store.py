@@ -0,0 +1,459 @@
+"""
+Local Event Store for Nostr Badge Tool
+SQLite copy of badge-related events (definitions, awards, profile badges) kept in sync with relays
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from nostr.event import Event
+from nostr.key import PublicKey
+
+from metrics import REGISTRY
+
+STORED_EVENTS = REGISTRY.gauge(
+    "nostr_event_store_events",
+    "Events held in the local event store"
+)
+REJECTED_EVENTS = REGISTRY.counter(
+    "nostr_event_store_rejected_total",
+    "Relay events not stored because their id or signature did not verify"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    pubkey TEXT NOT NULL,
+    kind INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_kind_time ON events (kind, created_at);
+CREATE INDEX IF NOT EXISTS events_pubkey_kind ON events (pubkey, kind);
+CREATE TABLE IF NOT EXISTS tags (
+    event_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tags_lookup ON tags (name, value);
+CREATE INDEX IF NOT EXISTS tags_event ON tags (event_id);
+CREATE TABLE IF NOT EXISTS sync_checkpoints (
+    relay TEXT NOT NULL,
+    target TEXT NOT NULL,
+    synced_at INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    PRIMARY KEY (relay, target)
+);
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    relay TEXT NOT NULL,
+    target TEXT NOT NULL,
+    newest INTEGER NOT NULL,
+    oldest INTEGER NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (relay, target)
+);
+"""
+
+
+KIND_DELETION = 5
+
+
+def is_replaceable(kind: int) -> bool:
+    """NIP-01 replaceable kinds: only the newest event per (pubkey, kind) is kept"""
+    return kind in (0, 3) or 10000 <= kind < 20000
+
+
+def is_addressable(kind: int) -> bool:
+    """NIP-01 addressable kinds: only the newest event per (pubkey, kind, d) is kept"""
+    return 30000 <= kind < 40000
+
+
+def verify_event(event: Dict[str, Any]) -> bool:
+    """Whether the id is the NIP-01 hash of the event and the signature is its author's (BIP-340)"""
+    try:
+        event_id = Event.compute_id(
+            event["pubkey"], event["created_at"], event["kind"], event["tags"], event["content"]
+        )
+        return event_id == event["id"] and PublicKey(bytes.fromhex(event["pubkey"])).verify_signed_message_hash(
+            event_id, event["sig"]
+        )
+    except Exception:
+        return False
+
+
+def event_address(event: Dict[str, Any]) -> Optional[str]:
+    """"kind:pubkey:d" of a replaceable or addressable event (d is empty for replaceable kinds)"""
+    kind = event.get("kind")
+    if not isinstance(kind, int) or not (is_replaceable(kind) or is_addressable(kind)):
+        return None
+    d = ""
+    if is_addressable(kind):
+        d = next((t[1] for t in event.get("tags", []) if len(t) > 1 and t[0] == "d"), "")
+    return f"{kind}:{event.get('pubkey')}:{d}"
+
+
+def current_events(events: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Events without the ones superseded or deleted within the same list
+
+    Keeps the newest version of each replaceable/addressable address and
+    drops events referenced by a kind 5 event of the same author (by id,
+    or by address for versions up to the deletion's created_at), as the
+    store does on insert. Events that do not verify are dropped too.
+    Order is preserved.
+    """
+    by_id = {ev["id"]: ev for ev in events if ev.get("id") and verify_event(ev)}
+    newest: Dict[str, Dict[str, Any]] = {}
+    deleted_ids = set()
+    deleted_until: Dict[str, int] = {}
+    for ev in by_id.values():
+        address = event_address(ev)
+        if address:
+            kept = newest.get(address)
+            if kept is None or (-ev.get("created_at", 0), ev["id"]) < (-kept.get("created_at", 0), kept["id"]):
+                newest[address] = ev
+        if ev.get("kind") == KIND_DELETION:
+            for tag in ev.get("tags", []):
+                if len(tag) < 2 or not isinstance(tag[1], str):
+                    continue
+                if tag[0] == "e":
+                    deleted_ids.add((ev.get("pubkey"), tag[1]))
+                elif tag[0] == "a" and tag[1].split(":", 2)[1:2] == [ev.get("pubkey")]:
+                    deleted_until[tag[1]] = max(deleted_until.get(tag[1], 0), ev.get("created_at", 0))
+
+    result = []
+    for ev in by_id.values():
+        address = event_address(ev)
+        if address and newest[address] is not ev:
+            continue
+        if ev.get("kind") != KIND_DELETION and (
+            (ev.get("pubkey"), ev["id"]) in deleted_ids
+            or (address in deleted_until and ev.get("created_at", 0) <= deleted_until[address])
+        ):
+            continue
+        result.append(ev)
+    return result
+
+
+class EventStore:
+    """
+    SQLite event store with NIP-01 filter queries
+
+    Disabled until open() is called. Single-letter tags are indexed so
+    that #a / #p / #d filters can be answered locally. Replaceable and
+    addressable events replace older versions of the same address, and
+    stored kind 5 deletions (NIP-09) remove the events they reference and
+    keep them from being added again. Also holds the per-relay checkpoints
+    of the sync engine and of history backfills.
+
+    Calls block on sqlite; async code runs them with asyncio.to_thread.
+    """
+
+    def __init__(self):
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def open(self, db_path: Path) -> None:
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            removed = self._compact()
+        if removed:
+            print(f"🧹 Event store: removed {removed} replaced or deleted events")
+        self._update_count()
+
+    def close(self) -> None:
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    # ==============================================================
+    #   WRITING
+    # ==============================================================
+
+    def add_events(self, events: Iterable[Dict[str, Any]]) -> int:
+        """
+        Store events (ignoring ones already present); returns the number added
+
+        Events whose id or signature does not verify are rejected, so a
+        forged deletion or version cannot hide the real one. Older versions
+        of a replaceable or addressable event are replaced, and events
+        deleted by a stored kind 5 event are skipped.
+        """
+        if not self.enabled:
+            return 0
+        added = 0
+        removed = 0
+        rejected = 0
+        with self._lock, self._conn:
+            for ev in events:
+                if not ev.get("id") or not ev.get("pubkey") or not isinstance(ev.get("kind"), int):
+                    continue
+                if self._conn.execute("SELECT 1 FROM events WHERE id = ?", (ev["id"],)).fetchone():
+                    continue
+                if not verify_event(ev):
+                    rejected += 1
+                    continue
+                address = event_address(ev)
+                if self._is_deleted(ev, address):
+                    continue
+                if address:
+                    current = self._versions(ev["pubkey"], ev["kind"], address)
+                    if any(self._newer(row, ev) for row in current):
+                        continue
+                    removed += self._delete([row["id"] for row in current])
+                self._insert(ev)
+                added += 1
+                if ev["kind"] == KIND_DELETION:
+                    removed += self._apply_deletion(ev)
+        if rejected:
+            REJECTED_EVENTS.inc(rejected)
+            print(f"⚠️ Event store: rejected {rejected} events with a bad id or signature")
+        if added or removed:
+            self._update_count()
+        return added
+
+    def _insert(self, ev: Dict[str, Any]) -> None:
+        self._conn.execute(
+            "INSERT INTO events (id, pubkey, kind, created_at, event) VALUES (?, ?, ?, ?, ?)",
+            (ev["id"], ev["pubkey"], ev["kind"], ev.get("created_at", 0), json.dumps(ev))
+        )
+        self._conn.executemany(
+            "INSERT INTO tags (event_id, name, value) VALUES (?, ?, ?)",
+            [
+                (ev["id"], tag[0], tag[1]) for tag in ev.get("tags", [])
+                if len(tag) > 1 and isinstance(tag[0], str) and len(tag[0]) == 1 and isinstance(tag[1], str)
+            ]
+        )
+
+    def _delete(self, ids: List[str]) -> int:
+        removed = 0
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ", ".join("?" for _ in chunk)
+            self._conn.execute(f"DELETE FROM tags WHERE event_id IN ({marks})", chunk)
+            removed += self._conn.execute(f"DELETE FROM events WHERE id IN ({marks})", chunk).rowcount
+        return removed
+
+    @staticmethod
+    def _newer(row: sqlite3.Row, ev: Dict[str, Any]) -> bool:
+        """Whether a stored version wins over `ev` (newest created_at, then lowest id)"""
+        return (-row["created_at"], row["id"]) <= (-ev.get("created_at", 0), ev["id"])
+
+    def _versions(self, pubkey: str, kind: int, address: str) -> List[sqlite3.Row]:
+        """Stored events with the same replaceable/addressable address"""
+        sql = "SELECT id, created_at, event FROM events WHERE pubkey = ? AND kind = ?"
+        params: List[Any] = [pubkey, kind]
+        d = address.split(":", 2)[2]
+        if is_addressable(kind):
+            if d:
+                sql += " AND id IN (SELECT event_id FROM tags WHERE name = 'd' AND value = ?)"
+                params.append(d)
+            else:
+                sql += " AND id NOT IN (SELECT event_id FROM tags WHERE name = 'd' AND value != '')"
+        rows = self._conn.execute(sql, params).fetchall()
+        # The first d tag is the identifier; re-check in case of several
+        return [row for row in rows if event_address(json.loads(row["event"])) == address]
+
+    def _is_deleted(self, ev: Dict[str, Any], address: Optional[str]) -> bool:
+        """Whether a stored kind 5 event by the same author deletes `ev` (by id, or by address up to its date)"""
+        if ev["kind"] == KIND_DELETION:
+            return False
+        sql = (
+            "SELECT 1 FROM events AS d JOIN tags AS t ON t.event_id = d.id "
+            "WHERE d.kind = ? AND d.pubkey = ? AND ((t.name = 'e' AND t.value = ?)"
+        )
+        params: List[Any] = [KIND_DELETION, ev["pubkey"], ev["id"]]
+        if address:
+            sql += " OR (t.name = 'a' AND t.value = ? AND d.created_at >= ?)"
+            params.extend([address, ev.get("created_at", 0)])
+        return self._conn.execute(sql + ") LIMIT 1", params).fetchone() is not None
+
+    def _apply_deletion(self, deletion: Dict[str, Any]) -> int:
+        """Remove the events a kind 5 event references, if they have the same author"""
+        ids = []
+        for tag in deletion.get("tags", []):
+            if len(tag) < 2 or not isinstance(tag[1], str):
+                continue
+            if tag[0] == "e":
+                ids.extend(
+                    row["id"] for row in self._conn.execute(
+                        "SELECT id FROM events WHERE id = ? AND pubkey = ? AND kind != ?",
+                        (tag[1], deletion["pubkey"], KIND_DELETION)
+                    )
+                )
+            elif tag[0] == "a":
+                parts = tag[1].split(":", 2)
+                if len(parts) != 3 or parts[1] != deletion["pubkey"] or not parts[0].isdigit():
+                    continue
+                kind = int(parts[0])
+                if not (is_replaceable(kind) or is_addressable(kind)):
+                    continue
+                ids.extend(
+                    row["id"] for row in self._versions(deletion["pubkey"], kind, tag[1])
+                    if row["created_at"] <= deletion.get("created_at", 0)
+                )
+        return self._delete(ids)
+
+    def _compact(self) -> int:
+        """Apply replacement and stored deletions to rows written before they were enforced"""
+        removed = 0
+        newest: Dict[str, sqlite3.Row] = {}
+        stale: List[str] = []
+        rows = self._conn.execute(
+            "SELECT id, created_at, event FROM events WHERE kind IN (0, 3) "
+            "OR (kind >= 10000 AND kind < 20000) OR (kind >= 30000 AND kind < 40000)"
+        )
+        for row in rows:
+            address = event_address(json.loads(row["event"]))
+            kept = newest.get(address)
+            if kept is None:
+                newest[address] = row
+            elif self._newer(kept, {"id": row["id"], "created_at": row["created_at"]}):
+                stale.append(row["id"])
+            else:
+                stale.append(kept["id"])
+                newest[address] = row
+        removed += self._delete(stale)
+        deletions = self._conn.execute(
+            "SELECT event FROM events WHERE kind = ?", (KIND_DELETION,)
+        ).fetchall()
+        for row in deletions:
+            removed += self._apply_deletion(json.loads(row["event"]))
+        return removed
+
+    # ==============================================================
+    #   QUERYING
+    # ==============================================================
+
+    @staticmethod
+    def _where(filter_params: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        for key, column in (("ids", "id"), ("authors", "pubkey"), ("kinds", "kind")):
+            if key in filter_params:
+                values = list(filter_params[key])
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})" if values else "0")
+                params.extend(values)
+        if "since" in filter_params:
+            clauses.append("created_at >= ?")
+            params.append(filter_params["since"])
+        if "until" in filter_params:
+            clauses.append("created_at <= ?")
+            params.append(filter_params["until"])
+        for key, values in filter_params.items():
+            if key.startswith("#") and len(key) == 2:
+                values = list(values)
+                clauses.append(
+                    "id IN (SELECT event_id FROM tags WHERE name = ? "
+                    f"AND value IN ({', '.join('?' for _ in values)}))"
+                )
+                params.append(key[1])
+                params.extend(values)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, filter_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Events matching a filter, newest first (search is ignored)"""
+        if not self.enabled:
+            return []
+        where, params = self._where(filter_params)
+        sql = f"SELECT event FROM events{where} ORDER BY created_at DESC, id"
+        if filter_params.get("limit") is not None:
+            sql += " LIMIT ?"
+            params.append(filter_params["limit"])
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row["event"]) for row in rows]
+
+    def count(self, filter_params: Dict[str, Any]) -> int:
+        """Number of stored events matching a filter (limit and search are ignored)"""
+        if not self.enabled:
+            return 0
+        where, params = self._where(filter_params)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM events{where}", params).fetchone()[0]
+
+    def items(self, filter_params: Dict[str, Any]) -> List[Tuple[int, bytes]]:
+        """(created_at, id) of every matching event, as used for negentropy reconciliation"""
+        if not self.enabled:
+            return []
+        where, params = self._where({k: v for k, v in filter_params.items() if k != "limit"})
+        with self._lock:
+            rows = self._conn.execute(f"SELECT created_at, id FROM events{where}", params).fetchall()
+        return [(row["created_at"], bytes.fromhex(row["id"])) for row in rows]
+
+    def _update_count(self) -> None:
+        with self._lock:
+            STORED_EVENTS.set(self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0])
+
+    # ==============================================================
+    #   SYNC CHECKPOINTS
+    # ==============================================================
+
+    def checkpoint(self, relay: str, target: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at, method FROM sync_checkpoints WHERE relay = ? AND target = ?", (relay, target)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def set_checkpoint(self, relay: str, target: str, method: str, synced_at: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_checkpoints (relay, target, synced_at, method) VALUES (?, ?, ?, ?)",
+                (relay, target, int(time.time()) if synced_at is None else synced_at, method)
+            )
+
+    def backfill_state(self, relay: str, target: str) -> Optional[Dict[str, Any]]:
+        """Newest and oldest created_at backfilled from a relay, and whether its history is exhausted"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT newest, oldest, complete FROM backfill_checkpoints WHERE relay = ? AND target = ?",
+                (relay, target)
+            ).fetchone()
+        return {"newest": row["newest"], "oldest": row["oldest"], "complete": bool(row["complete"])} if row else None
+
+    def set_backfill_state(self, relay: str, target: str, newest: int, oldest: int, complete: bool) -> None:
+        if not self.enabled:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO backfill_checkpoints (relay, target, newest, oldest, complete, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (relay, target, newest, oldest, int(complete), int(time.time()))
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {}
+        with self._lock:
+            kinds = self._conn.execute("SELECT kind, COUNT(*) AS n FROM events GROUP BY kind").fetchall()
+            checkpoints = self._conn.execute(
+                "SELECT relay, target, synced_at, method FROM sync_checkpoints ORDER BY target, relay"
+            ).fetchall()
+        return {
+            "events_by_kind": {row["kind"]: row["n"] for row in kinds},
+            "checkpoints": [dict(row) for row in checkpoints],
+        }
+
+
+# Process-wide store (opened by the API at startup)
+EVENT_STORE = EventStore()
@@ -0,0 +1,151 @@
+"""
+Filter Planner for Nostr Badge Tool
+Splits large REQ filters into chunks that fit a relay's advertised NIP-11 limits
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from relay_capabilities import RelayCapabilities
+
+# Values per list field (ids, authors, tag values) when the relay does not say otherwise
+DEFAULT_MAX_VALUES = 100
+
+# Filters per REQ and concurrent subscriptions per connection for relays without NIP-11 limits
+DEFAULT_MAX_FILTERS = 10
+DEFAULT_MAX_SUBSCRIPTIONS = 5
+
+# Bytes reserved for the ["REQ", "<sub id>", ...] envelope
+_REQ_OVERHEAD = 100
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+def _list_fields(filter_params: Dict[str, Any]) -> List[str]:
+    """Fields that can be split without changing the result (ids, authors, #x tags)"""
+    return [
+        key for key, value in filter_params.items()
+        if (key in ("ids", "authors") or key.startswith("#")) and isinstance(value, list)
+    ]
+
+
+def matches(event: Dict[str, Any], filter_params: Dict[str, Any]) -> bool:
+    """Whether an event matches a NIP-01 filter (search is not evaluated)"""
+    if "ids" in filter_params and event.get("id") not in filter_params["ids"]:
+        return False
+    if "authors" in filter_params and event.get("pubkey") not in filter_params["authors"]:
+        return False
+    if "kinds" in filter_params and event.get("kind") not in filter_params["kinds"]:
+        return False
+    created_at = event.get("created_at", 0)
+    if "since" in filter_params and created_at < filter_params["since"]:
+        return False
+    if "until" in filter_params and created_at > filter_params["until"]:
+        return False
+    for key, values in filter_params.items():
+        if key.startswith("#") and len(key) == 2:
+            tag_values = {t[1] for t in event.get("tags", []) if len(t) > 1 and t[0] == key[1]}
+            if not tag_values.intersection(values):
+                return False
+    return True
+
+
+def split_in_half(filter_params: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """Split the longest list field in two; None if no field has more than one value"""
+    field = max(_list_fields(filter_params), key=lambda f: len(filter_params[f]), default=None)
+    if field is None or len(filter_params[field]) < 2:
+        return None
+    values = filter_params[field]
+    middle = len(values) // 2
+    return [{**filter_params, field: values[:middle]}, {**filter_params, field: values[middle:]}]
+
+
+def split_filter(
+    filter_params: Dict[str, Any],
+    max_values: int = DEFAULT_MAX_VALUES,
+    max_bytes: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Split a filter into filters whose union matches the same events
+
+    Every list field longer than `max_values` is chunked (the chunks of
+    several fields are combined pairwise), then filters still larger than
+    `max_bytes` are halved until they fit. Each chunk keeps the original
+    `limit`, so a split filter can return more events than the original.
+    """
+    for field in _list_fields(filter_params):
+        values = filter_params[field]
+        if len(values) > max_values:
+            return [
+                part
+                for start in range(0, len(values), max_values)
+                for part in split_filter({**filter_params, field: values[start:start + max_values]}, max_values, max_bytes)
+            ]
+
+    if max_bytes is not None and _size(filter_params) > max_bytes:
+        halves = split_in_half(filter_params)
+        if halves:
+            return [part for half in halves for part in split_filter(half, max_values, max_bytes)]
+    return [filter_params]
+
+
+class FilterPlan:
+    """Limits applied when querying one relay, taken from its cached capabilities"""
+
+    def __init__(self, caps: Optional[RelayCapabilities] = None):
+        caps = caps if caps and caps.known else None
+        self.max_limit = caps.max_limit if caps else None
+        self.max_filters = (caps.max_filters if caps else None) or DEFAULT_MAX_FILTERS
+        self.max_subscriptions = (caps.max_subscriptions if caps else None) or DEFAULT_MAX_SUBSCRIPTIONS
+        self.max_message_length = caps.max_message_length if caps else None
+
+        self.max_values = DEFAULT_MAX_VALUES
+        if self.max_limit:
+            # Leave room under the relay's limit so a full result still signals truncation
+            self.max_values = min(self.max_values, max(1, self.max_limit // 2))
+
+    def effective_limit(self, filter_params: Dict[str, Any]) -> Optional[int]:
+        """The number of events after which the relay may have cut the result short"""
+        limit = filter_params.get("limit")
+        if self.max_limit and (limit is None or limit > self.max_limit):
+            return self.max_limit
+        return limit
+
+    def split(self, filters: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Clamp limits and split every filter to fit the relay"""
+        max_bytes = self.max_message_length - _REQ_OVERHEAD if self.max_message_length else None
+        planned = []
+        for filter_params in filters:
+            if self.max_limit and filter_params.get("limit", 0) > self.max_limit:
+                filter_params = {**filter_params, "limit": self.max_limit}
+            planned.extend(split_filter(filter_params, self.max_values, max_bytes))
+        return planned
+
+    def pack(self, filters: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Group filters into REQs of at most max_filters filters (and max_message_length bytes)"""
+        batches: List[List[Dict[str, Any]]] = []
+        size = 0
+        for filter_params in filters:
+            filter_size = _size(filter_params) + 1
+            full = batches and (
+                len(batches[-1]) >= self.max_filters
+                or (self.max_message_length and size + filter_size + _REQ_OVERHEAD > self.max_message_length)
+            )
+            if not batches or full:
+                batches.append([])
+                size = 0
+            batches[-1].append(filter_params)
+            size += filter_size
+        return batches
+
+    def truncated(self, filter_params: Dict[str, Any], events: List[Dict[str, Any]]) -> bool:
+        """Whether a filter's result reached the relay's limit and may be incomplete"""
+        limit = self.effective_limit(filter_params)
+        if not limit:
+            return False
+        if filter_params.get("ids") and len(filter_params["ids"]) <= limit:
+            # Every requested id fits in the limit; a full answer is complete
+            return False
+        return sum(1 for ev in events if matches(ev, filter_params)) >= limit
@@ -0,0 +1,227 @@
+"""
+Live Relay Subscriptions for Nostr Badge Tool
+Long-lived REQs that stay open after EOSE and deliver new events as relays receive them
+"""
+
+import asyncio
+import contextvars
+import json
+import random
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from filter_planner import matches
+from metrics import REGISTRY
+from relay_manager import connect_relay
+
+# Seconds between reconnect attempts (doubled after each failure, with jitter)
+RECONNECT_MIN = 1
+RECONNECT_MAX = 60
+
+# Seconds re-requested before the newest event seen when a connection is reopened
+RESUME_OVERLAP = 60
+
+# CLOSED reasons (NIP-01 prefixes) after which a relay is not asked again
+REFUSED_PREFIXES = ("auth-required:", "restricted:")
+
+# Event ids remembered for de-duplication across relays and reconnects
+SEEN_MAX = 5000
+
+# Items buffered per listener of a Broadcast before the listener is dropped
+QUEUE_SIZE = 100
+
+
+LIVE_SUBSCRIPTIONS = REGISTRY.gauge(
+    "nostr_live_subscriptions",
+    "Open long-lived relay subscriptions"
+)
+LIVE_EVENTS = REGISTRY.counter(
+    "nostr_live_events_total",
+    "New events delivered by long-lived relay subscriptions",
+    ["name"]
+)
+LIVE_LISTENERS = REGISTRY.gauge(
+    "nostr_live_listeners",
+    "Clients listening to a live feed",
+    ["name"]
+)
+LIVE_LISTENERS_DROPPED = REGISTRY.counter(
+    "nostr_live_listeners_dropped_total",
+    "Live feed clients disconnected for falling too far behind",
+    ["name"]
+)
+
+
+class SubscriptionRefused(ConnectionError):
+    """The relay closed the REQ for a reason that retrying will not fix"""
+
+
+def create_detached_task(coro) -> asyncio.Task:
+    """
+    Start a task in an empty context
+
+    Feeds are opened by whichever request comes first but outlive it, so
+    their tasks must not inherit that request's trace or relay accounting.
+    """
+    return contextvars.Context().run(asyncio.create_task, coro)
+
+
+class LiveSubscription:
+    """
+    One REQ per relay for `filters`, kept open and reopened when dropped
+
+    Only events newer than the start of the subscription are requested.
+    Each event is passed to `on_event` once, whichever relay sends it
+    first; events that do not match the filters are ignored. After a
+    dropped connection the REQ resumes shortly before the newest event
+    seen, so nothing published in between is missed. The reconnect delay
+    only resets once the relay has answered the REQ, and a relay that
+    closes it as auth-required or restricted is not asked again.
+    """
+
+    def __init__(
+        self,
+        relays: List[str],
+        filters: List[Dict[str, Any]],
+        on_event: Callable[[Dict[str, Any]], None],
+        name: str = "live"
+    ):
+        self.relays = list(relays)
+        self.filters = [{k: v for k, v in f.items() if k not in ("limit", "since", "until")} for f in filters]
+        self.on_event = on_event
+        self.name = name
+        self.since = int(time.time())
+        self.connected: Dict[str, bool] = {relay: False for relay in self.relays}
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [create_detached_task(self._run_relay(relay)) for relay in self.relays]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run_relay(self, relay: str) -> None:
+        delay = RECONNECT_MIN
+        sub_id = f"{self.name}_{random.randrange(16 ** 8):08x}"
+        while True:
+            try:
+                async with connect_relay(relay) as ws:
+                    since = max(0, self.since - RESUME_OVERLAP) if self._seen else self.since
+                    await ws.send(json.dumps(["REQ", sub_id, *({**f, "since": since} for f in self.filters)]))
+                    self.connected[relay] = True
+                    LIVE_SUBSCRIPTIONS.inc()
+                    try:
+                        async for raw in ws:
+                            # Connecting is not enough: a relay that drops or closes
+                            # the REQ right away keeps backing off
+                            if self._handle(relay, sub_id, raw):
+                                delay = RECONNECT_MIN
+                    finally:
+                        self.connected[relay] = False
+                        LIVE_SUBSCRIPTIONS.dec()
+            except asyncio.CancelledError:
+                raise
+            except SubscriptionRefused as e:
+                print(f"⚠️ Live subscription {self.name} on {relay} refused, not retrying: {e}")
+                return
+            except Exception as e:
+                print(f"⚠️ Live subscription {self.name} on {relay} dropped: {e}")
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+            delay = min(delay * 2, RECONNECT_MAX)
+
+    def _handle(self, relay: str, sub_id: str, raw: Any) -> bool:
+        """Process one relay message; returns whether it answered the REQ (EVENT or EOSE)"""
+        try:
+            data = json.loads(raw)
+        except (json.JSONDecodeError, TypeError):
+            return False
+        if not isinstance(data, list) or len(data) < 2 or data[1] != sub_id:
+            return False
+        if data[0] == "CLOSED":
+            reason = str(data[2]) if len(data) > 2 else ""
+            if reason.startswith(REFUSED_PREFIXES):
+                raise SubscriptionRefused(f"CLOSED: {reason}")
+            raise ConnectionError(f"CLOSED: {reason}")
+        if data[0] == "EOSE":
+            return True
+        if data[0] != "EVENT" or len(data) < 3 or not isinstance(data[2], dict):
+            return False
+
+        event = data[2]
+        event_id = event.get("id")
+        if not event_id or event_id in self._seen:
+            return True
+        if not any(matches(event, f) for f in self.filters):
+            return True
+        self._seen[event_id] = None
+        while len(self._seen) > SEEN_MAX:
+            self._seen.popitem(last=False)
+        self.since = max(self.since, event.get("created_at", 0))
+
+        LIVE_EVENTS.inc(name=self.name)
+        try:
+            self.on_event(event)
+        except Exception as e:
+            print(f"⚠️ Live subscription {self.name} handler failed: {e}")
+        return True
+
+
+class _Listener:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class Broadcast:
+    """
+    Fan-out of items to any number of listeners
+
+    publish() never waits: each listener has a bounded queue, and a
+    listener whose queue is full is dropped (its listen() iteration ends)
+    instead of slowing down the others.
+    """
+
+    def __init__(self, name: str = "live", queue_size: int = QUEUE_SIZE):
+        self.name = name
+        self.queue_size = queue_size
+        self._listeners: List[_Listener] = []
+
+    def __len__(self) -> int:
+        return len(self._listeners)
+
+    def publish(self, item: Any) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                listener.dropped = True
+                self._listeners.remove(listener)
+                LIVE_LISTENERS.dec(name=self.name)
+                LIVE_LISTENERS_DROPPED.inc(name=self.name)
+
+    async def listen(self, keepalive: float = 15) -> AsyncIterator[Optional[Any]]:
+        """
+        Yield published items until the caller stops iterating or is dropped
+
+        Yields None after `keepalive` seconds without items so that
+        streaming responses can send a heartbeat.
+        """
+        listener = _Listener(self.queue_size)
+        self._listeners.append(listener)
+        LIVE_LISTENERS.inc(name=self.name)
+        try:
+            while not listener.dropped:
+                try:
+                    yield await asyncio.wait_for(listener.queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+                LIVE_LISTENERS.dec(name=self.name)
@@ -0,0 +1,298 @@
+"""
+Prometheus-style Metrics for Nostr Badge Tool
+In-process counters, gauges and histograms rendered in the text exposition format
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Latency buckets (seconds) tuned for relay round trips
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value for the exposition format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Render a label set as {a="x",b="y"}"""
+    pairs = [f'{n}="{_escape_label(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape_label(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value (integers without trailing .0)"""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for labelled metrics"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Build the label value tuple, rejecting unknown or missing labels"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0] * len(self.buckets) + [0.0, 0]
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for key, state in items:
+            for i, bound in enumerate(self.buckets):
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(state[i])}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# ==============================================================
+#   DEFAULT REGISTRY
+# ==============================================================
+
+REGISTRY = MetricsRegistry()
+
+# Relay round trips
+RELAY_CONNECT_SECONDS = REGISTRY.histogram(
+    "nostr_relay_connect_seconds",
+    "Time to open a websocket connection to a relay",
+    ["relay"]
+)
+RELAY_FIRST_EVENT_SECONDS = REGISTRY.histogram(
+    "nostr_relay_first_event_seconds",
+    "Time from sending REQ to the first matching EVENT",
+    ["relay"]
+)
+RELAY_EOSE_SECONDS = REGISTRY.histogram(
+    "nostr_relay_eose_seconds",
+    "Time from sending REQ to EOSE",
+    ["relay"]
+)
+RELAY_OK_SECONDS = REGISTRY.histogram(
+    "nostr_relay_ok_seconds",
+    "Time from sending EVENT to the matching OK",
+    ["relay"]
+)
+RELAY_OPEN_CONNECTIONS = REGISTRY.gauge(
+    "nostr_relay_open_connections",
+    "Number of currently open relay websocket connections"
+)
+
+# Event flow
+EVENTS_RECEIVED = REGISTRY.counter(
+    "nostr_events_received_total",
+    "Events received from relays in response to REQ",
+    ["relay"]
+)
+EVENTS_DEDUPLICATED = REGISTRY.counter(
+    "nostr_events_deduplicated_total",
+    "Duplicate events dropped while merging results from several relays"
+)
+EVENTS_REJECTED = REGISTRY.counter(
+    "nostr_events_rejected_total",
+    "Published events rejected by a relay (OK false or CLOSED)",
+    ["relay"]
+)
+FILTERS_SPLIT = REGISTRY.counter(
+    "nostr_filters_split_total",
+    "Extra filters created by splitting large filters (reason: limits or truncated)",
+    ["relay", "reason"]
+)
+
+# HTTP API
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "API request latency by route",
+    ["method", "route", "status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+
+HTTP_REQUEST_RELAY_REQS = REGISTRY.histogram(
+    "http_request_relay_reqs",
+    "Relay REQs issued while handling one API request",
+    ["route"],
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+
+# Caches
+CACHE_REQUESTS = REGISTRY.counter(
+    "nostr_cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ["cache", "result"]
+)
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "nostr_cache_hit_ratio",
+    "Fraction of cache lookups that were hits",
+    ["cache"]
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache lookup and refresh the cache's hit ratio"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    hits = CACHE_REQUESTS.get(cache=cache, result="hit")
+    misses = CACHE_REQUESTS.get(cache=cache, result="miss")
+    CACHE_HIT_RATIO.set(hits / (hits + misses), cache=cache)
+
+
+def record_deduplicated(total: int, unique: int) -> None:
+    """Count events dropped by a cross-relay merge"""
+    if total > unique:
+        EVENTS_DEDUPLICATED.inc(total - unique)
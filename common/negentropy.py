@@ -0,0 +1,238 @@
+"""
+Negentropy Set Reconciliation for Nostr Badge Tool
+Protocol V1 (as used by NIP-77) over a sorted in-memory list of (created_at, id) items
+"""
+
+import bisect
+import hashlib
+from typing import Iterable, List, Optional, Tuple
+
+PROTOCOL_VERSION = 0x61
+ID_SIZE = 32
+FINGERPRINT_SIZE = 16
+MAX_TIMESTAMP = 2 ** 64 - 1
+
+# Ranges with fewer items than 2 * BUCKETS are sent as id lists instead of fingerprints
+BUCKETS = 16
+
+MODE_SKIP = 0
+MODE_FINGERPRINT = 1
+MODE_IDLIST = 2
+
+Item = Tuple[int, bytes]  # (created_at, 32-byte event id)
+
+
+class NegentropyError(Exception):
+    """Malformed or unsupported negentropy message"""
+
+
+def encode_varint(n: int) -> bytes:
+    """Big-endian base-128 with the high bit set on all but the last byte"""
+    if n == 0:
+        return b"\x00"
+    out = []
+    while n:
+        out.append(n & 0x7F)
+        n >>= 7
+    out.reverse()
+    return bytes([b | 0x80 for b in out[:-1]] + [out[-1]])
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def __bool__(self) -> bool:
+        return self.pos < len(self.data)
+
+    def byte(self) -> int:
+        return self.bytes(1)[0]
+
+    def bytes(self, n: int) -> bytes:
+        if self.pos + n > len(self.data):
+            raise NegentropyError("Message ended unexpectedly")
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return chunk
+
+    def varint(self) -> int:
+        result = 0
+        while True:
+            b = self.byte()
+            result = (result << 7) | (b & 0x7F)
+            if not b & 0x80:
+                return result
+
+
+def fingerprint(items: List[Item]) -> bytes:
+    """sha256 of (sum of ids mod 2**256, little-endian) + varint(count), first 16 bytes"""
+    total = sum(int.from_bytes(item_id, "little") for _, item_id in items) % (1 << 256)
+    return hashlib.sha256(total.to_bytes(32, "little") + encode_varint(len(items))).digest()[:FINGERPRINT_SIZE]
+
+
+class Negentropy:
+    """
+    One side of a negentropy reconciliation
+
+    The client calls initiate() and sends the result in NEG-OPEN, then feeds
+    each NEG-MSG from the relay to reconcile(), which returns the next
+    message (or None when reconciliation is complete) and accumulates
+    `have_ids` (ids only we have) and `need_ids` (ids only the relay has).
+    A responder (used for local testing) calls reconcile() without
+    initiate().
+    """
+
+    def __init__(self, items: Iterable[Item]):
+        self.items: List[Item] = sorted(items)
+        self.is_initiator = False
+        self.have_ids: List[bytes] = []
+        self.need_ids: List[bytes] = []
+        self._last_in = 0
+        self._last_out = 0
+
+    # --------------------------------------------------------------
+    # Bounds and timestamps (delta-encoded within one message)
+    # --------------------------------------------------------------
+
+    def _encode_timestamp(self, timestamp: int) -> bytes:
+        if timestamp == MAX_TIMESTAMP:
+            self._last_out = MAX_TIMESTAMP
+            return encode_varint(0)
+        delta = timestamp - self._last_out
+        self._last_out = timestamp
+        return encode_varint(delta + 1)
+
+    def _decode_timestamp(self, reader: _Reader) -> int:
+        timestamp = reader.varint()
+        timestamp = MAX_TIMESTAMP if timestamp == 0 else timestamp - 1
+        if self._last_in == MAX_TIMESTAMP or timestamp == MAX_TIMESTAMP:
+            self._last_in = MAX_TIMESTAMP
+            return MAX_TIMESTAMP
+        timestamp += self._last_in
+        self._last_in = timestamp
+        return timestamp
+
+    def _encode_bound(self, bound: Tuple[int, bytes]) -> bytes:
+        timestamp, prefix = bound
+        return self._encode_timestamp(timestamp) + encode_varint(len(prefix)) + prefix
+
+    def _decode_bound(self, reader: _Reader) -> Tuple[int, bytes]:
+        timestamp = self._decode_timestamp(reader)
+        length = reader.varint()
+        if length > ID_SIZE:
+            raise NegentropyError("Bound id prefix too long")
+        return timestamp, reader.bytes(length)
+
+    def _lower_bound(self, start: int, bound: Tuple[int, bytes]) -> int:
+        """Index of the first item at or after `bound` (id prefixes are zero-padded)"""
+        timestamp, prefix = bound
+        return max(start, bisect.bisect_left(self.items, (timestamp, prefix.ljust(ID_SIZE, b"\x00"))))
+
+    @staticmethod
+    def _minimal_bound(prev: Item, curr: Item) -> Tuple[int, bytes]:
+        if curr[0] != prev[0]:
+            return curr[0], b""
+        shared = 0
+        while shared < ID_SIZE and curr[1][shared] == prev[1][shared]:
+            shared += 1
+        return curr[0], curr[1][:shared + 1]
+
+    # --------------------------------------------------------------
+    # Messages
+    # --------------------------------------------------------------
+
+    def _split_range(self, lower: int, upper: int, upper_bound: Tuple[int, bytes]) -> bytes:
+        count = upper - lower
+        if count < BUCKETS * 2:
+            ids = b"".join(item_id for _, item_id in self.items[lower:upper])
+            return self._encode_bound(upper_bound) + encode_varint(MODE_IDLIST) + encode_varint(count) + ids
+
+        out = b""
+        per_bucket, extra = divmod(count, BUCKETS)
+        curr = lower
+        for i in range(BUCKETS):
+            size = per_bucket + (1 if i < extra else 0)
+            bucket_fingerprint = fingerprint(self.items[curr:curr + size])
+            curr += size
+            bound = upper_bound if curr == upper else self._minimal_bound(self.items[curr - 1], self.items[curr])
+            out += self._encode_bound(bound) + encode_varint(MODE_FINGERPRINT) + bucket_fingerprint
+        return out
+
+    def initiate(self) -> str:
+        """First message (hex) for NEG-OPEN"""
+        self.is_initiator = True
+        self._last_out = 0
+        return (bytes([PROTOCOL_VERSION]) + self._split_range(0, len(self.items), (MAX_TIMESTAMP, b""))).hex()
+
+    def reconcile(self, message_hex: str) -> Optional[str]:
+        """Process a message from the other side; returns the reply (hex) or None when done"""
+        try:
+            reader = _Reader(bytes.fromhex(message_hex))
+        except ValueError:
+            raise NegentropyError("Message is not hex")
+        self._last_in = 0
+        self._last_out = 0
+
+        version = reader.byte()
+        if not 0x60 <= version <= 0x6F:
+            raise NegentropyError("Invalid protocol version byte")
+        output = bytes([PROTOCOL_VERSION])
+        if version != PROTOCOL_VERSION:
+            if self.is_initiator:
+                raise NegentropyError(f"Unsupported protocol version {version - 0x60}")
+            return output.hex()
+
+        prev_index = 0
+        prev_bound: Tuple[int, bytes] = (0, b"")
+        skip = False
+
+        while reader:
+            out = b""
+            curr_bound = self._decode_bound(reader)
+            mode = reader.varint()
+            lower = prev_index
+            upper = self._lower_bound(prev_index, curr_bound)
+
+            def flush_skip() -> bytes:
+                nonlocal skip
+                if not skip:
+                    return b""
+                skip = False
+                return self._encode_bound(prev_bound) + encode_varint(MODE_SKIP)
+
+            if mode == MODE_SKIP:
+                skip = True
+            elif mode == MODE_FINGERPRINT:
+                theirs = reader.bytes(FINGERPRINT_SIZE)
+                if theirs != fingerprint(self.items[lower:upper]):
+                    out += flush_skip()
+                    out += self._split_range(lower, upper, curr_bound)
+                else:
+                    skip = True
+            elif mode == MODE_IDLIST:
+                count = reader.varint()
+                their_ids = {reader.bytes(ID_SIZE) for _ in range(count)}
+                if self.is_initiator:
+                    skip = True
+                    for _, item_id in self.items[lower:upper]:
+                        if item_id in their_ids:
+                            their_ids.discard(item_id)
+                        else:
+                            self.have_ids.append(item_id)
+                    self.need_ids.extend(their_ids)
+                else:
+                    out += flush_skip()
+                    ids = b"".join(item_id for _, item_id in self.items[lower:upper])
+                    out += self._encode_bound(curr_bound) + encode_varint(MODE_IDLIST)
+                    out += encode_varint(upper - lower) + ids
+            else:
+                raise NegentropyError(f"Unexpected mode {mode}")
+
+            output += out
+            prev_index = upper
+            prev_bound = curr_bound
+
+        if self.is_initiator and len(output) == 1:
+            return None
+        return output.hex()
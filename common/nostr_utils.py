@@ -6,6 +6,8 @@ from nostr.key import PrivateKey
 from nostr.event import Event
 from datetime import datetime
 
+from relay_capabilities import RELAY_CAPABILITIES
+
 
 # ==============================================================
 #   SIGN EVENT (Kind 8 or 30009)
@@ -56,41 +58,6 @@ def sign_event(event_dict, nsec):
     return signed_event
 
 
-# ==============================================================
-#   CHECK RELAY NIP-58 SUPPORT
-# ==============================================================
-
-async def test_nip58_support(relay):
-    """Check if relay supports NIP-58 by testing event publishing."""
-    try:
-        async with websockets.connect(relay, open_timeout=3) as ws:
-            # Test with a minimal NIP-58 compliant badge definition
-            test_event = {
-                "kind": 30009,
-                "created_at": int(time.time()),
-                "content": "Test badge definition",
-                "tags": [
-                    ["d", "test-badge-nip58"],
-                    ["name", "Test Badge"]
-                ],
-                "pubkey": "0000000000000000000000000000000000000000000000000000000000000000",
-                "id": "test",
-                "sig": "test"
-            }
-            
-            await ws.send(json.dumps(["EVENT", test_event]))
-            try:
-                response = await asyncio.wait_for(ws.recv(), timeout=3)
-                # Check if relay accepts the event (even if it's invalid due to fake signature)
-                if '"OK"' in response or '"true"' in response:
-                    return True
-            except asyncio.TimeoutError:
-                return False
-    except Exception:
-        return False
-    return False
-
-
 # ==============================================================
 #   PUBLISH EVENT
 # ==============================================================
@@ -125,14 +92,10 @@ async def publish_event(event, relays):
             "error": None,
         }
 
-        # Optional: keep the quick gate, but do not skip diagnostics entirely
-        try:
-            nip58_ok = await test_nip58_support(relay)
-        except Exception:
-            nip58_ok = False
-
-        if not nip58_ok:
-            print(f"⚠️ {relay} may not support NIP-58. Attempting publish anyway...")
+        # Cached NIP-11 info instead of probing the relay with a test event
+        caps = await RELAY_CAPABILITIES.get(relay)
+        if caps.supports(58) is False:
+            print(f"⚠️ {relay} does not list NIP-58. Attempting publish anyway...")
 
         try:
             async with websockets.connect(relay, open_timeout=5) as ws:
@@ -0,0 +1,310 @@
+"""
+Durable Outbox for Nostr Badge Tool
+Stores signed events that some relays did not accept or verify and retries them in the background
+"""
+
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from metrics import REGISTRY
+from relay_health import RELAY_HEALTH
+
+# OK message prefixes (NIP-01) that will not change on retry
+PERMANENT_REJECTIONS = ("blocked:", "invalid:", "pow:", "restricted:", "auth-required:")
+
+OUTBOX_ENQUEUED = REGISTRY.counter(
+    "nostr_outbox_enqueued_total",
+    "Event deliveries queued for retry after an unverified or failed publish",
+    ["relay"]
+)
+OUTBOX_ATTEMPTS = REGISTRY.counter(
+    "nostr_outbox_attempts_total",
+    "Outbox retry attempts by outcome (delivered, retry, rejected, expired)",
+    ["relay", "outcome"]
+)
+OUTBOX_PENDING = REGISTRY.gauge(
+    "nostr_outbox_pending",
+    "Event deliveries waiting in the outbox"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    event_id TEXT NOT NULL,
+    relay TEXT NOT NULL,
+    event TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    PRIMARY KEY (event_id, relay)
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+def needs_retry(result: Any) -> bool:
+    """Whether a RelayResult is worth another publish attempt"""
+    if result.verified or not getattr(result, "retryable", True):
+        return False
+    message = (result.ok_message or "").lower()
+    if message.startswith("duplicate:"):
+        # The relay already has the event
+        return False
+    if result.published and result.verification in ("skipped", "deferred"):
+        # Storage check not requested, or a deferred check will re-queue on failure
+        return False
+    if not result.published and message.startswith(PERMANENT_REJECTIONS):
+        return False
+    return True
+
+
+class Outbox:
+    """
+    SQLite-backed retry queue of (event, relay) deliveries
+
+    Disabled until open() is called, so CLI tools that publish once and
+    exit are unaffected. Each relay of an event is retried on its own
+    schedule with exponential backoff and jitter until the relay verifies
+    the event, rejects it permanently, or the delivery expires. Relays the
+    health registry reports as down are skipped until they recover.
+    """
+
+    def __init__(self):
+        self.max_age = 24 * 3600
+        self.max_attempts = 10
+        self.base_delay = 30.0
+        self.max_delay = 3600.0
+        self.publish_timeout = 10
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def open(
+        self,
+        db_path: Path,
+        max_age: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None
+    ) -> None:
+        if max_age is not None:
+            self.max_age = max_age
+        if max_attempts is not None:
+            self.max_attempts = max_attempts
+        if base_delay is not None:
+            self.base_delay = base_delay
+        if max_delay is not None:
+            self.max_delay = max_delay
+
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        self._update_pending()
+
+    def close(self) -> None:
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    # ==============================================================
+    #   QUEUEING
+    # ==============================================================
+
+    async def enqueue(self, event: Dict[str, Any], results: Sequence[Any]) -> List[str]:
+        """Queue the relays of a publish that need another attempt; returns their URLs"""
+        if not self.enabled:
+            return []
+
+        pending = [r for r in results if needs_retry(r)]
+        if not pending:
+            return []
+
+        now = time.time()
+        event_json = json.dumps(event)
+        rows = [
+            (event["id"], result.relay, event_json, now, now + self.max_age,
+             now + self._backoff(1), result.error or "Not verified")
+            for result in pending
+        ]
+
+        def insert() -> None:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO outbox "
+                    "(event_id, relay, event, created_at, expires_at, next_attempt_at, last_error) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            self._update_pending()
+
+        # sqlite writes stay off the event loop
+        await asyncio.to_thread(insert)
+        for result in pending:
+            OUTBOX_ENQUEUED.inc(relay=result.relay)
+        print(f"📮 Queued event {event['id'][:8]} for retry on {len(pending)} relay(s)")
+        return [r.relay for r in pending]
+
+    def _backoff(self, attempt: int) -> float:
+        """Delay before the given attempt: exponential, capped, with equal jitter"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    # ==============================================================
+    #   RETRYING
+    # ==============================================================
+
+    async def run(self, poll_interval: float = 5.0) -> None:
+        """Retry due deliveries until cancelled"""
+        while True:
+            try:
+                await self.process_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Outbox retry pass failed: {e}")
+            await asyncio.sleep(poll_interval)
+
+    async def process_due(self, limit: int = 50) -> int:
+        """Retry deliveries whose next attempt is due; returns the number attempted"""
+        if not self.enabled:
+            return 0
+
+        expired, rows = await asyncio.to_thread(self._take_due, limit)
+        for row in expired:
+            OUTBOX_ATTEMPTS.inc(relay=row["relay"], outcome="expired")
+
+        by_event: Dict[str, List[sqlite3.Row]] = {}
+        for row in rows:
+            if not RELAY_HEALTH.is_available(row["relay"]):
+                # Relay is down: wait for the health registry instead of spending an attempt
+                await asyncio.to_thread(
+                    self._reschedule, row, RELAY_HEALTH.retry_after(row["relay"]) + self._backoff(1)
+                )
+                continue
+            by_event.setdefault(row["event_id"], []).append(row)
+
+        attempted = 0
+        for event_rows in by_event.values():
+            attempted += len(event_rows)
+            await self._retry(event_rows)
+
+        await asyncio.to_thread(self._update_pending)
+        return attempted
+
+    def _take_due(self, limit: int) -> Tuple[List[sqlite3.Row], List[sqlite3.Row]]:
+        """Expire old deliveries and return (expired, due) rows"""
+        now = time.time()
+        with self._lock, self._conn:
+            expired = self._conn.execute(
+                "SELECT event_id, relay FROM outbox WHERE status = 'pending' AND expires_at <= ?", (now,)
+            ).fetchall()
+            self._conn.execute(
+                "UPDATE outbox SET status = 'expired' WHERE status = 'pending' AND expires_at <= ?", (now,)
+            )
+            # Finished deliveries are kept for inspection for one more max_age
+            self._conn.execute(
+                "DELETE FROM outbox WHERE status != 'pending' AND expires_at <= ?",
+                (now - self.max_age,)
+            )
+            rows = self._conn.execute(
+                "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+        return expired, rows
+
+    async def _retry(self, rows: List[sqlite3.Row]) -> None:
+        from relay_manager import RelayManager
+
+        event = json.loads(rows[0]["event"])
+        relay_manager = RelayManager(timeout=self.publish_timeout)
+        results = await relay_manager.publish_event(
+            event, [row["relay"] for row in rows], concurrent=True, retry_failed=False
+        )
+
+        for row, result in zip(rows, results):
+            attempts = row["attempts"] + 1
+            if not needs_retry(result):
+                outcome = "delivered" if (result.verified or result.published) else "rejected"
+                await asyncio.to_thread(self._finish, row, outcome, attempts, result.error)
+            elif attempts >= self.max_attempts:
+                outcome = "expired"
+                await asyncio.to_thread(self._finish, row, outcome, attempts, result.error or "Not verified")
+            else:
+                outcome = "retry"
+                await asyncio.to_thread(
+                    self._reschedule, row, self._backoff(attempts + 1), attempts, result.error or "Not verified"
+                )
+            OUTBOX_ATTEMPTS.inc(relay=row["relay"], outcome=outcome)
+            print(f"📮 Outbox: {event['id'][:8]} on {row['relay']}: {outcome} (attempt {attempts})")
+
+    def _reschedule(
+        self,
+        row: sqlite3.Row,
+        delay: float,
+        attempts: Optional[int] = None,
+        error: Optional[str] = None
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET next_attempt_at = ?, attempts = ?, last_error = COALESCE(?, last_error) "
+                "WHERE event_id = ? AND relay = ?",
+                (time.time() + delay, row["attempts"] if attempts is None else attempts, error,
+                 row["event_id"], row["relay"])
+            )
+
+    def _finish(self, row: sqlite3.Row, status: str, attempts: int, error: Optional[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ? WHERE event_id = ? AND relay = ?",
+                (status, attempts, error, row["event_id"], row["relay"])
+            )
+
+    def _update_pending(self) -> None:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+        OUTBOX_PENDING.set(count)
+
+    # ==============================================================
+    #   INSPECTION
+    # ==============================================================
+
+    def stats(self) -> Dict[str, int]:
+        if not self.enabled:
+            return {}
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def entries(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Deliveries, most recently queued first (without the event body)"""
+        if not self.enabled:
+            return []
+        query = "SELECT event_id, relay, status, attempts, created_at, expires_at, next_attempt_at, last_error FROM outbox"
+        params: List[Any] = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+
+# Process-wide outbox (opened by the API at startup)
+OUTBOX = Outbox()
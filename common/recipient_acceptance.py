@@ -6,14 +6,14 @@ Implements NIP-58 Profile Badges (kind 30008) for badge display
 import json
 import asyncio
 import time
-import websockets
 import shutil
 import inspect
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 from nostr.key import PrivateKey
 from nostr.event import Event
-from relay_manager import RelayManager
+from relay_manager import RelayManager, connect_relay
+import relay_accounting
 
 
 class BadgeAcceptanceManager:
@@ -210,11 +210,12 @@ class BadgeAcceptanceManager:
             results = await relay_manager.publish_event(profile_badges_event, relay_urls)
             relay_manager.print_summary()
             
-            # 8. Check results
+            # 8. Check results (relays skipping or deferring verification count once they sent OK)
             verified_count = sum(1 for r in results if r.verified)
+            confirmed_count = sum(1 for r in results if r.confirmed)
             
-            if verified_count > 0:
-                print(f"✅ Badge accepted and displayed on {verified_count} relay(s)")
+            if confirmed_count > 0:
+                print(f"✅ Badge accepted and displayed on {confirmed_count} relay(s)")
                 print(f"   Total badges now displayed: {len(merged_pairs)}")
                 
                 # 9. Clean up old backups after successful publish
@@ -224,7 +225,8 @@ class BadgeAcceptanceManager:
                     "status": "success",
                     "event": profile_badges_event,
                     "verified_relays": verified_count,
-                    "total_badges": len(merged_pairs)
+                    "total_badges": len(merged_pairs),
+                    "retrying_relays": relay_manager.queued_relays
                 }
             else:
                 print("⚠️ Badge accepted but not yet verified")
@@ -232,7 +234,8 @@ class BadgeAcceptanceManager:
                     "status": "published_unverified",
                     "event": profile_badges_event,
                     "verified_relays": 0,
-                    "total_badges": len(merged_pairs)
+                    "total_badges": len(merged_pairs),
+                    "retrying_relays": relay_manager.queued_relays
                 }
                 
         except Exception as e:
@@ -521,9 +524,10 @@ To display this badge in your profile, you need to create/update a Profile Badge
         
         for relay in relay_urls:
             try:
-                async with websockets.connect(relay, open_timeout=5) as ws:
+                async with connect_relay(relay, open_timeout=5) as ws:
                     req_id = f"fetch_profile_badges_{int(time.time())}"
                     await ws.send(json.dumps(["REQ", req_id, filter_payload]))
+                    relay_accounting.record_req()
                     
                     start_time = time.time()
                     while time.time() - start_time < 4:
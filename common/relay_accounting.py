@@ -0,0 +1,124 @@
+"""
+Per-Request Relay Accounting
+Counts relay connections, REQs, events and wait time for the current API request
+"""
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class RelayAccount:
+    """Relay round trips made on behalf of one API request"""
+    connections: int = 0
+    reqs: int = 0
+    events: int = 0
+    publishes: int = 0
+    wait_seconds: float = 0.0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "relay_connections": self.connections,
+            "relay_reqs": self.reqs,
+            "relay_events": self.events,
+            "relay_publishes": self.publishes,
+            "relay_wait_ms": round(self.wait_seconds * 1000, 1),
+            "total_ms": round(self.elapsed_seconds * 1000, 1),
+        }
+
+    def server_timing(self) -> str:
+        """Render as a Server-Timing header value"""
+        return ", ".join([
+            f"total;dur={self.elapsed_seconds * 1000:.1f}",
+            f'relay;dur={self.wait_seconds * 1000:.1f};desc="relay wait (sum)"',
+            f'relay-conn;desc="{self.connections}"',
+            f'relay-req;desc="{self.reqs}"',
+            f'relay-events;desc="{self.events}"',
+        ])
+
+
+# Tasks spawned while handling a request copy this context, so the same
+# RelayAccount instance collects work from concurrent relay queries too.
+_current_account: ContextVar[Optional[RelayAccount]] = ContextVar("relay_account", default=None)
+
+
+def start_account() -> RelayAccount:
+    """Begin accounting for the current request context"""
+    account = RelayAccount()
+    _current_account.set(account)
+    return account
+
+
+def current_account() -> Optional[RelayAccount]:
+    return _current_account.get()
+
+
+def record_connection() -> None:
+    account = _current_account.get()
+    if account is not None:
+        account.connections += 1
+
+
+def record_req() -> None:
+    account = _current_account.get()
+    if account is not None:
+        account.reqs += 1
+
+
+def record_event() -> None:
+    account = _current_account.get()
+    if account is not None:
+        account.events += 1
+
+
+def record_publish() -> None:
+    account = _current_account.get()
+    if account is not None:
+        account.publishes += 1
+
+
+def record_wait(seconds: float) -> None:
+    account = _current_account.get()
+    if account is not None:
+        account.wait_seconds += seconds
+
+
+@dataclass
+class RelaySweep:
+    """Outcome of the relay queries behind one read (see track_sweep)"""
+    answered: int = 0  # queries that reached EOSE
+    failed: int = 0  # queries that errored or timed out before EOSE
+
+    @property
+    def degraded(self) -> bool:
+        """Relays were asked but none of them answered completely"""
+        return self.failed > 0 and self.answered == 0
+
+
+_current_sweep: ContextVar[Optional[RelaySweep]] = ContextVar("relay_sweep", default=None)
+
+
+def track_sweep(sweep: RelaySweep) -> None:
+    """
+    Record query outcomes of the current context into `sweep`
+
+    Call it at the start of a dedicated task so that queries running
+    beside it (e.g. cache validators) are not counted.
+    """
+    _current_sweep.set(sweep)
+
+
+def record_query(complete: bool) -> None:
+    sweep = _current_sweep.get()
+    if sweep is not None:
+        if complete:
+            sweep.answered += 1
+        else:
+            sweep.failed += 1
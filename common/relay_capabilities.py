@@ -0,0 +1,203 @@
+"""
+Relay Capability Discovery for Nostr Badge Tool
+Fetches NIP-11 relay information documents over HTTP(S) and caches the limits that matter for publishing and querying
+"""
+
+import asyncio
+import json
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+# Fetcher: relay URL -> NIP-11 document (raises on failure)
+Fetcher = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+def info_url(relay_url: str) -> str:
+    """HTTP(S) URL serving a relay's NIP-11 document"""
+    if relay_url.startswith("wss://"):
+        return "https://" + relay_url[len("wss://"):]
+    if relay_url.startswith("ws://"):
+        return "http://" + relay_url[len("ws://"):]
+    return relay_url
+
+
+def _positive_int(value: Any) -> Optional[int]:
+    return value if isinstance(value, int) and not isinstance(value, bool) and value > 0 else None
+
+
+@dataclass
+class RelayCapabilities:
+    """Limits and supported NIPs advertised by one relay (None = not advertised)"""
+    relay: str
+    supported_nips: List[int] = field(default_factory=list)
+    max_filters: Optional[int] = None
+    max_limit: Optional[int] = None
+    max_message_length: Optional[int] = None
+    max_subscriptions: Optional[int] = None
+    name: Optional[str] = None
+    software: Optional[str] = None
+    fetched_at: float = field(default_factory=time.time)
+    error: Optional[str] = None
+
+    @classmethod
+    def from_document(cls, relay: str, document: Dict[str, Any]) -> "RelayCapabilities":
+        limitation = document.get("limitation") or {}
+        if not isinstance(limitation, dict):
+            limitation = {}
+        nips = document.get("supported_nips") or []
+        return cls(
+            relay=relay,
+            supported_nips=sorted({n for n in nips if isinstance(n, int)}) if isinstance(nips, list) else [],
+            max_filters=_positive_int(limitation.get("max_filters")),
+            max_limit=_positive_int(limitation.get("max_limit")),
+            max_message_length=_positive_int(limitation.get("max_message_length")),
+            max_subscriptions=_positive_int(limitation.get("max_subscriptions")),
+            name=document.get("name") if isinstance(document.get("name"), str) else None,
+            software=document.get("software") if isinstance(document.get("software"), str) else None,
+        )
+
+    @property
+    def known(self) -> bool:
+        """Whether a NIP-11 document was retrieved"""
+        return self.error is None
+
+    def supports(self, nip: int) -> Optional[bool]:
+        """True/False if the relay lists its supported NIPs, None if unknown"""
+        if not self.known or not self.supported_nips:
+            return None
+        return nip in self.supported_nips
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relay": self.relay,
+            "supported_nips": self.supported_nips,
+            "max_filters": self.max_filters,
+            "max_limit": self.max_limit,
+            "max_message_length": self.max_message_length,
+            "max_subscriptions": self.max_subscriptions,
+            "name": self.name,
+            "software": self.software,
+            "fetched_at": self.fetched_at,
+            "error": self.error,
+        }
+
+
+async def http_fetcher(relay_url: str, timeout: float = 5) -> Dict[str, Any]:
+    """Fetch a NIP-11 document with the standard library (in a worker thread)"""
+    def fetch() -> Dict[str, Any]:
+        request = urllib.request.Request(info_url(relay_url), headers={"Accept": "application/nostr+json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            document = json.loads(response.read(256 * 1024))
+        if not isinstance(document, dict):
+            raise ValueError("NIP-11 document is not a JSON object")
+        return document
+
+    return await asyncio.get_running_loop().run_in_executor(None, fetch)
+
+
+def static_fetcher(documents: Dict[str, Dict[str, Any]]) -> Fetcher:
+    """Local stand-in serving fixed NIP-11 documents (for tests and offline use)"""
+    async def fetch(relay_url: str) -> Dict[str, Any]:
+        if relay_url not in documents:
+            raise LookupError(f"No NIP-11 document for {relay_url}")
+        return documents[relay_url]
+    return fetch
+
+
+class RelayCapabilityCache:
+    """
+    TTL cache of relay capabilities
+
+    get() fetches on a miss (concurrent callers share one fetch). Hot paths
+    use cached(), which never waits: it returns what is known and refreshes
+    missing or expired entries in the background. Failed fetches are cached
+    for a shorter `error_ttl` so unreachable relays are not re-fetched on
+    every publish.
+    """
+
+    def __init__(self, ttl: float = 3600, error_ttl: float = 300, fetcher: Optional[Fetcher] = None):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.fetcher: Fetcher = fetcher or http_fetcher
+        self._entries: Dict[str, RelayCapabilities] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, ttl: Optional[float] = None, error_ttl: Optional[float] = None, fetcher: Optional[Fetcher] = None) -> None:
+        if ttl is not None:
+            self.ttl = ttl
+        if error_ttl is not None:
+            self.error_ttl = error_ttl
+        if fetcher is not None:
+            self.fetcher = fetcher
+            self.clear()
+
+    def _fresh(self, caps: Optional[RelayCapabilities]) -> bool:
+        if caps is None:
+            return False
+        ttl = self.ttl if caps.known else self.error_ttl
+        return time.time() - caps.fetched_at < ttl
+
+    async def get(self, relay: str) -> RelayCapabilities:
+        with self._lock:
+            caps = self._entries.get(relay)
+        if self._fresh(caps):
+            return caps
+        return await self._refresh(relay)
+
+    def cached(self, relay: str) -> Optional[RelayCapabilities]:
+        """Cached capabilities without waiting; schedules a refresh when missing or stale"""
+        with self._lock:
+            caps = self._entries.get(relay)
+        if not self._fresh(caps):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return caps
+            self._refresh_task(relay)
+        return caps
+
+    async def prefetch(self, relays: Iterable[str]) -> List[RelayCapabilities]:
+        return list(await asyncio.gather(*(self.get(relay) for relay in relays)))
+
+    def _refresh_task(self, relay: str) -> asyncio.Task:
+        task = self._inflight.get(relay)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch(relay))
+            self._inflight[relay] = task
+            task.add_done_callback(lambda _: self._inflight.pop(relay, None))
+        return task
+
+    async def _refresh(self, relay: str) -> RelayCapabilities:
+        return await asyncio.shield(self._refresh_task(relay))
+
+    async def _fetch(self, relay: str) -> RelayCapabilities:
+        try:
+            caps = RelayCapabilities.from_document(relay, await self.fetcher(relay))
+        except Exception as e:
+            caps = RelayCapabilities(relay=relay, error=f"{type(e).__name__}: {e}")
+        with self._lock:
+            self._entries[relay] = caps
+        return caps
+
+    def set(self, relay: str, document: Dict[str, Any]) -> RelayCapabilities:
+        """Seed the cache with a known document"""
+        caps = RelayCapabilities.from_document(relay, document)
+        with self._lock:
+            self._entries[relay] = caps
+        return caps
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {relay: caps.to_dict() for relay, caps in sorted(self._entries.items())}
+
+
+# Process-wide cache
+RELAY_CAPABILITIES = RelayCapabilityCache()
@@ -0,0 +1,108 @@
+"""
+Relay Health Registry for Nostr Badge Tool
+Tracks per-relay connect/publish outcomes and backs off from relays that keep failing
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class RelayHealth:
+    """Rolling health state of one relay"""
+    relay: str
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_success: Optional[float] = None
+    last_failure: Optional[float] = None
+    last_error: Optional[str] = None
+    latency_ms: Optional[float] = None  # exponentially weighted moving average
+    open_until: float = 0.0  # circuit open (relay skipped by retries) until this time
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "relay": self.relay,
+            "status": "down" if self.open_until > now else ("degraded" if self.consecutive_failures else "up"),
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_success": self.last_success,
+            "last_failure": self.last_failure,
+            "last_error": self.last_error,
+            "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "retry_after": max(0.0, round(self.open_until - now, 1)),
+        }
+
+
+class RelayHealthRegistry:
+    """
+    Process-wide relay health
+
+    After `failure_threshold` consecutive failures a relay is considered
+    down for `cooldown` seconds, doubling with every further failure up to
+    `max_cooldown`. Background work (such as outbox retries) checks
+    is_available() before contacting a relay; user requests still try every
+    configured relay.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30, max_cooldown: float = 900):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._relays: Dict[str, RelayHealth] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, relay: str) -> RelayHealth:
+        health = self._relays.get(relay)
+        if health is None:
+            health = self._relays[relay] = RelayHealth(relay=relay)
+        return health
+
+    def record_success(self, relay: str, latency: Optional[float] = None) -> None:
+        with self._lock:
+            health = self._get(relay)
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.last_success = time.time()
+            health.open_until = 0.0
+            if latency is not None:
+                latency_ms = latency * 1000
+                if health.latency_ms is None:
+                    health.latency_ms = latency_ms
+                else:
+                    health.latency_ms = 0.8 * health.latency_ms + 0.2 * latency_ms
+
+    def record_failure(self, relay: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            health = self._get(relay)
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.last_failure = time.time()
+            health.last_error = error
+            excess = health.consecutive_failures - self.failure_threshold
+            if excess >= 0:
+                backoff = min(self.max_cooldown, self.cooldown * (2 ** excess))
+                health.open_until = health.last_failure + backoff
+
+    def is_available(self, relay: str) -> bool:
+        with self._lock:
+            health = self._relays.get(relay)
+            return health is None or health.open_until <= time.time()
+
+    def retry_after(self, relay: str) -> float:
+        """Seconds until a down relay may be tried again (0 if available)"""
+        with self._lock:
+            health = self._relays.get(relay)
+            return max(0.0, health.open_until - time.time()) if health else 0.0
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {relay: health.to_dict() for relay, health in sorted(self._relays.items())}
+
+
+# Process-wide registry
+RELAY_HEALTH = RelayHealthRegistry()
@@ -7,9 +7,409 @@ import json
 import asyncio
 import time
 import websockets
-from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Dict, Any, Optional, Set, Union
+from collections import deque
 from dataclasses import dataclass
 
+from metrics import (
+    RELAY_CONNECT_SECONDS,
+    RELAY_FIRST_EVENT_SECONDS,
+    RELAY_EOSE_SECONDS,
+    RELAY_OK_SECONDS,
+    RELAY_OPEN_CONNECTIONS,
+    EVENTS_RECEIVED,
+    EVENTS_REJECTED,
+    FILTERS_SPLIT,
+)
+import relay_accounting
+import tracing
+from filter_planner import FilterPlan, split_in_half
+from outbox import OUTBOX
+from relay_capabilities import RELAY_CAPABILITIES
+from relay_health import RELAY_HEALTH
+from slow_query_log import SLOW_QUERY_LOG, fingerprint_filter
+
+# Optional callback(event, result) run after each relay finishes a publish,
+# e.g. to report per-relay progress of a background job
+publish_observer: ContextVar[Optional[Callable[[Dict[str, Any], "RelayResult"], None]]] = ContextVar(
+    "publish_observer", default=None
+)
+
+# How a publish confirms that relays stored the event:
+#   inline   - REQ the event back on every relay before returning (slowest, default)
+#   sampled  - REQ it back only on the first `sample_size` relays that answer OK
+#   deferred - return after OK and verify in a background task
+#   off      - trust the OK message
+VERIFICATION_MODES = ("inline", "sampled", "deferred", "off")
+
+# Seconds a deferred verification waits before asking the relay for the event
+DEFERRED_VERIFY_DELAY = 1.0
+
+# Seconds to wait for a relay's OK, and to keep listening for NOTICEs after it
+OK_TIMEOUT = 5.0
+LATE_NOTICE_WINDOW = 2.0
+
+
+class RelayQueryIncomplete(Exception):
+    """A relay query failed or ended before the relay sent EOSE"""
+
+
+@dataclass
+class PublishPolicy:
+    """Verification mode and optional OK quorum for publishes"""
+    verification: str = "inline"
+    sample_size: int = 1
+    quorum: Optional[int] = None  # return once this many relays answered OK
+
+    def __post_init__(self):
+        if self.verification not in VERIFICATION_MODES:
+            raise ValueError(
+                f"Unknown verification mode '{self.verification}' (expected one of: {', '.join(VERIFICATION_MODES)})"
+            )
+        if self.sample_size < 1 or (self.quorum is not None and self.quorum < 1):
+            raise ValueError("sample_size and quorum must be at least 1")
+
+    @classmethod
+    def parse(cls, spec: str, **defaults) -> "PublishPolicy":
+        """Parse 'mode' or 'mode:quorum', e.g. 'deferred:1'"""
+        mode, _, quorum = spec.strip().partition(":")
+        if quorum:
+            if not quorum.isdigit():
+                raise ValueError(f"Invalid quorum '{quorum}'")
+            defaults["quorum"] = int(quorum)
+        return cls(verification=mode.strip(), **defaults)
+
+
+# Policy for publishes that do not pass one explicitly (set per API request)
+publish_policy: ContextVar[Optional[PublishPolicy]] = ContextVar("publish_policy", default=None)
+
+# Deferred verifications and post-quorum publishes still running
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _run_in_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+@asynccontextmanager
+async def connect_relay(relay_url: str, open_timeout: float = 5):
+    """Open a websocket to a relay, recording connect time and open connections"""
+    start = time.perf_counter()
+    with tracing.span("relay.connect", relay=relay_url):
+        try:
+            ws = await websockets.connect(relay_url, open_timeout=open_timeout)
+        except Exception as e:
+            RELAY_HEALTH.record_failure(relay_url, f"Connect failed: {e}")
+            raise
+    try:
+        RELAY_CONNECT_SECONDS.observe(time.perf_counter() - start, relay=relay_url)
+        RELAY_HEALTH.record_success(relay_url, time.perf_counter() - start)
+        RELAY_OPEN_CONNECTIONS.inc()
+        relay_accounting.record_connection()
+        try:
+            yield ws
+        finally:
+            RELAY_OPEN_CONNECTIONS.dec()
+    finally:
+        await ws.close()
+
+
+async def query_relay(
+    relay_url: str,
+    req_id: str,
+    filter_params: Dict,
+    timeout: float = 10,
+    recv_timeout: float = 2.5,
+    open_timeout: float = 5
+) -> List[Dict]:
+    """
+    Send a single REQ to a relay and collect events until EOSE
+
+    Stops after `timeout` seconds overall or when the relay is silent for
+    `recv_timeout` seconds. Errors are logged and whatever was received so
+    far is returned.
+    """
+    results = []
+    reached_eose = False
+    query_start = time.perf_counter()
+
+    # Stay within the relay's advertised NIP-11 max_limit
+    caps = RELAY_CAPABILITIES.cached(relay_url)
+    if caps and caps.max_limit and filter_params.get("limit", 0) > caps.max_limit:
+        filter_params = {**filter_params, "limit": caps.max_limit}
+
+    with tracing.span("relay.req", relay=relay_url, filter=fingerprint_filter(filter_params)) as req_span:
+        try:
+            async with connect_relay(relay_url, open_timeout=open_timeout) as ws:
+                await ws.send(json.dumps(["REQ", req_id, filter_params]))
+                relay_accounting.record_req()
+
+                loop = asyncio.get_event_loop()
+                start = loop.time()
+
+                while True:
+                    if loop.time() - start > timeout:
+                        break
+
+                    try:
+                        msg = await asyncio.wait_for(ws.recv(), timeout=recv_timeout)
+                    except asyncio.TimeoutError:
+                        break
+
+                    try:
+                        data = json.loads(msg)
+                    except (json.JSONDecodeError, TypeError):
+                        continue
+
+                    if not isinstance(data, list) or not data:
+                        continue
+
+                    if data[0] == "EVENT" and len(data) >= 3 and data[1] == req_id:
+                        if not results:
+                            RELAY_FIRST_EVENT_SECONDS.observe(loop.time() - start, relay=relay_url)
+                        EVENTS_RECEIVED.inc(relay=relay_url)
+                        relay_accounting.record_event()
+                        results.append(data[2])
+
+                    if data[0] == "EOSE" and len(data) >= 2 and data[1] == req_id:
+                        RELAY_EOSE_SECONDS.observe(loop.time() - start, relay=relay_url)
+                        reached_eose = True
+                        break
+
+        except Exception as e:
+            print(f"Relay query error ({relay_url}): {e}")
+        finally:
+            elapsed = time.perf_counter() - query_start
+            relay_accounting.record_wait(elapsed)
+            relay_accounting.record_query(reached_eose)
+            SLOW_QUERY_LOG.record(relay_url, filter_params, elapsed, len(results), reached_eose)
+            if req_span:
+                req_span.set(events=len(results), eose=reached_eose)
+
+    return results
+
+
+async def query_relay_filters(
+    relay_url: str,
+    req_prefix: str,
+    filters: Union[Dict, List[Dict]],
+    timeout: float = 10,
+    recv_timeout: float = 2.5,
+    open_timeout: float = 5,
+    strict: bool = False
+) -> List[Dict]:
+    """
+    Run one or more filters against a relay over a single connection
+
+    Large filters are split to fit the relay's advertised NIP-11 limits,
+    packed into REQs of up to max_filters filters and run as concurrent
+    subscriptions (at most max_subscriptions at a time). A filter whose
+    result reaches the relay's limit is split in half and queried again so
+    that capped results are not silently truncated. Returns the events
+    deduplicated by id; with `strict`, raises RelayQueryIncomplete instead
+    of returning partial results when the relay fails or misses EOSE.
+    """
+    if isinstance(filters, dict):
+        filters = [filters]
+    plan = FilterPlan(RELAY_CAPABILITIES.cached(relay_url))
+    pending = plan.split(filters)
+    if len(pending) > len(filters):
+        FILTERS_SPLIT.inc(len(pending) - len(filters), relay=relay_url, reason="limits")
+
+    events_by_id: Dict[str, Dict] = {}
+    incomplete: Optional[str] = None
+    with tracing.span("relay.req", relay=relay_url, filter=fingerprint_filter(filters[0])) as req_span:
+        try:
+            async with connect_relay(relay_url, open_timeout=open_timeout) as ws:
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + timeout
+                round_number = 0
+                while pending and loop.time() < deadline:
+                    batches = plan.pack(pending)
+                    results = await _run_subscriptions(
+                        ws, relay_url, f"{req_prefix}_{round_number}", batches,
+                        plan.max_subscriptions, deadline, recv_timeout
+                    )
+                    pending = []
+                    for batch, (events, reached_eose) in zip(batches, results):
+                        for ev in events:
+                            if ev.get("id"):
+                                events_by_id[ev["id"]] = ev
+                        if not reached_eose:
+                            incomplete = "no EOSE before timeout"
+                            continue
+                        for filter_params in batch:
+                            halves = plan.truncated(filter_params, events) and split_in_half(filter_params)
+                            if halves:
+                                FILTERS_SPLIT.inc(relay=relay_url, reason="truncated")
+                                pending.extend(halves)
+                    round_number += 1
+                if pending:
+                    incomplete = "timed out"
+        except Exception as e:
+            print(f"Relay query error ({relay_url}): {e}")
+            incomplete = str(e)
+        if req_span:
+            req_span.set(events=len(events_by_id), filters=len(filters))
+    relay_accounting.record_query(incomplete is None)
+
+    if strict and incomplete:
+        raise RelayQueryIncomplete(f"{relay_url}: {incomplete}")
+    return list(events_by_id.values())
+
+
+async def count_relay(
+    relay_url: str,
+    req_prefix: str,
+    filters: Dict[str, Dict],
+    timeout: float = 10,
+    open_timeout: float = 5
+) -> Dict[str, Dict]:
+    """
+    Ask a relay for NIP-45 COUNTs of several keyed filters over one connection
+
+    Returns {key: {"count": n, "approximate": bool}} for the filters the
+    relay answered. Keys are missing when the relay refused (CLOSED/NOTICE),
+    ignored the request or timed out, so callers can fall back to
+    downloading events for those keys.
+    """
+    plan = FilterPlan(RELAY_CAPABILITIES.cached(relay_url))
+    keys = list(filters)
+    counts: Dict[str, Dict] = {}
+    if not keys:
+        return counts
+
+    with tracing.span("relay.count", relay=relay_url, filters=len(keys)) as count_span:
+        try:
+            async with connect_relay(relay_url, open_timeout=open_timeout) as ws:
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + timeout
+                waiting = deque(range(len(keys)))
+                open_subs: Dict[str, int] = {}
+
+                async def open_next():
+                    while waiting and len(open_subs) < plan.max_subscriptions:
+                        index = waiting.popleft()
+                        sub_id = f"{req_prefix}_{index}"
+                        await ws.send(json.dumps(["COUNT", sub_id, filters[keys[index]]]))
+                        relay_accounting.record_req()
+                        open_subs[sub_id] = index
+
+                await open_next()
+                while open_subs:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        msg = await asyncio.wait_for(ws.recv(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+
+                    try:
+                        data = json.loads(msg)
+                    except (json.JSONDecodeError, TypeError):
+                        continue
+                    if not isinstance(data, list) or not data:
+                        continue
+
+                    if data[0] == "NOTICE":
+                        # Relays without NIP-45 typically answer an unknown verb with a NOTICE
+                        print(f"⚠️ {relay_url} NOTICE on COUNT: {data[1] if len(data) > 1 else ''}")
+                        break
+                    if len(data) < 2 or data[1] not in open_subs:
+                        continue
+                    index = open_subs.pop(data[1])
+                    if data[0] == "COUNT" and len(data) >= 3 and isinstance(data[2], dict):
+                        count = data[2].get("count")
+                        if isinstance(count, int):
+                            counts[keys[index]] = {
+                                "count": count,
+                                "approximate": bool(data[2].get("approximate", False)),
+                            }
+                    await open_next()
+        except Exception as e:
+            print(f"Relay count error ({relay_url}): {e}")
+        if count_span:
+            count_span.set(answered=len(counts))
+
+    return counts
+
+
+async def _run_subscriptions(
+    ws,
+    relay_url: str,
+    req_prefix: str,
+    batches: List[List[Dict]],
+    max_subscriptions: int,
+    deadline: float,
+    recv_timeout: float
+) -> List[tuple]:
+    """Run REQs on an open connection; returns (events, reached_eose) per batch"""
+    loop = asyncio.get_running_loop()
+    results = [([], False) for _ in batches]
+    waiting = deque(range(len(batches)))
+    open_subs: Dict[str, tuple] = {}  # sub id -> (batch index, start time)
+
+    async def open_next():
+        while waiting and len(open_subs) < max_subscriptions:
+            index = waiting.popleft()
+            sub_id = f"{req_prefix}_{index}"
+            await ws.send(json.dumps(["REQ", sub_id, *batches[index]]))
+            relay_accounting.record_req()
+            open_subs[sub_id] = (index, loop.time())
+
+    def finish(sub_id: str, reached_eose: bool):
+        index, start = open_subs.pop(sub_id)
+        events = results[index][0]
+        results[index] = (events, reached_eose)
+        elapsed = loop.time() - start
+        if reached_eose:
+            RELAY_EOSE_SECONDS.observe(elapsed, relay=relay_url)
+        relay_accounting.record_wait(elapsed)
+        SLOW_QUERY_LOG.record(relay_url, batches[index][0], elapsed, len(events), reached_eose)
+
+    await open_next()
+    while open_subs:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            msg = await asyncio.wait_for(ws.recv(), timeout=min(recv_timeout, remaining))
+        except asyncio.TimeoutError:
+            break
+
+        try:
+            data = json.loads(msg)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if not isinstance(data, list) or len(data) < 2 or data[1] not in open_subs:
+            continue
+
+        sub_id = data[1]
+        if data[0] == "EVENT" and len(data) >= 3:
+            index, start = open_subs[sub_id]
+            if not results[index][0]:
+                RELAY_FIRST_EVENT_SECONDS.observe(loop.time() - start, relay=relay_url)
+            EVENTS_RECEIVED.inc(relay=relay_url)
+            relay_accounting.record_event()
+            results[index][0].append(data[2])
+        elif data[0] in ("EOSE", "CLOSED"):
+            if data[0] == "CLOSED":
+                print(f"⚠️ {relay_url} closed subscription {sub_id}: {data[2] if len(data) > 2 else ''}")
+            else:
+                await ws.send(json.dumps(["CLOSE", sub_id]))
+            finish(sub_id, data[0] == "EOSE")
+            await open_next()
+
+    for sub_id in list(open_subs):
+        finish(sub_id, False)
+    return results
+
 
 @dataclass
 class RelayResult:
@@ -21,39 +421,171 @@ class RelayResult:
     error: Optional[str] = None
     ok_message: Optional[str] = None
     notice_messages: List[str] = None
+    # How storage was checked after OK: inline, deferred, failed (deferred check
+    # did not find the event) or skipped
+    verification: Optional[str] = None
+    # False when retrying cannot help (e.g. the event exceeds the relay's limits)
+    retryable: bool = True
     
     def __post_init__(self):
         if self.notice_messages is None:
             self.notice_messages = []
 
+    @property
+    def confirmed(self) -> bool:
+        """Verified, or accepted by a relay whose storage check was skipped or is still pending"""
+        return self.verified or (self.published and self.verification in ("skipped", "deferred"))
+
 
 class RelayManager:
     """Advanced relay management with proper error handling and verification"""
     
-    def __init__(self, timeout: int = 10):
+    def __init__(self, timeout: int = 10, policy: Optional[PublishPolicy] = None):
         self.timeout = timeout
+        self.policy = policy
         self.results: List[RelayResult] = []
+        self.queued_relays: List[str] = []
+        self._active_policy = PublishPolicy()
+        self._verify_slots = 0
+        self._ok_count = 0
+        self._quorum_reached: Optional[asyncio.Event] = None
     
-    async def publish_event(self, event: Dict[str, Any], relays: List[str]) -> List[RelayResult]:
-        """Publish event to multiple relays with comprehensive diagnostics"""
-        self.results = []
+    async def publish_event(
+        self,
+        event: Dict[str, Any],
+        relays: List[str],
+        concurrent: bool = False,
+        retry_failed: bool = True
+    ) -> List[RelayResult]:
+        """
+        Publish event to multiple relays with comprehensive diagnostics
+
+        With concurrent=True all relays are contacted at once instead of one
+        after another; results keep the order of `relays`.
+
+        With retry_failed=True (and the outbox enabled), relays that did not
+        verify the event are handed to the outbox for background retries;
+        their URLs are listed in `self.queued_relays`.
+
+        Verification follows the manager's policy, else the `publish_policy`
+        of the current context, else inline. A policy with a quorum publishes
+        concurrently and returns once that many relays answered OK; the other
+        relays finish in the background and are listed in `queued_relays`.
+        """
+        self._active_policy = self.policy or publish_policy.get() or PublishPolicy()
+        self._verify_slots = self._active_policy.sample_size
+        self._ok_count = 0
+        self._quorum_reached = None
+        self.results = [RelayResult(relay=relay) for relay in relays]
+
+        if self._active_policy.quorum:
+            await self._publish_until_quorum(event, retry_failed)
+            return self.results
+
+        if concurrent:
+            await asyncio.gather(*(self._publish_with_span(event, r) for r in self.results))
+        else:
+            for result in self.results:
+                await self._publish_with_span(event, result)
+
+        self.queued_relays = await OUTBOX.enqueue(event, self.results) if retry_failed else []
         
-        for relay in relays:
-            result = RelayResult(relay=relay)
-            self.results.append(result)
-            
+        return self.results
+
+    async def _publish_until_quorum(self, event: Dict[str, Any], retry_failed: bool):
+        self._quorum_reached = asyncio.Event()
+        publishes = asyncio.gather(*(self._publish_with_span(event, r) for r in self.results))
+        quorum = asyncio.create_task(self._quorum_reached.wait())
+        await asyncio.wait({publishes, quorum}, return_when=asyncio.FIRST_COMPLETED)
+        quorum.cancel()
+
+        if publishes.done():
+            self.queued_relays = await OUTBOX.enqueue(event, self.results) if retry_failed else []
+            return
+
+        finished = {id(r) for r in self.results if r.published or r.error}
+        self.queued_relays = [r.relay for r in self.results if id(r) not in finished]
+        print(f"   ⏩ Quorum of {self._active_policy.quorum} OK reached, {len(self.queued_relays)} relay(s) continue in background")
+
+        async def finish():
+            await publishes
+            if retry_failed:
+                await OUTBOX.enqueue(event, self.results)
+
+        _run_in_background(finish())
+
+    def _on_ok(self, result: RelayResult):
+        """Count an accepted publish towards the quorum"""
+        self._ok_count += 1
+        quorum = self._active_policy.quorum
+        if self._quorum_reached is not None and quorum and self._ok_count >= quorum:
+            self._quorum_reached.set()
+
+    def _verification_for(self, result: RelayResult) -> str:
+        mode = self._active_policy.verification
+        if mode == "sampled":
+            if self._verify_slots > 0:
+                self._verify_slots -= 1
+                return "inline"
+            return "skipped"
+        if mode == "off":
+            return "skipped"
+        return mode
+
+    async def _publish_with_span(self, event: Dict[str, Any], result: RelayResult):
+        with tracing.span("relay.publish", relay=result.relay, kind=event.get("kind")) as publish_span:
             try:
                 await self._publish_to_single_relay(event, result)
             except Exception as e:
                 result.error = str(e)
-                print(f"❌ Failed to publish to {relay}: {e}")
-        
-        return self.results
+                print(f"❌ Failed to publish to {result.relay}: {e}")
+            if publish_span:
+                publish_span.set(
+                    published=result.published,
+                    verified=result.verified,
+                    verification=result.verification,
+                    error=result.error
+                )
+        self._notify(event, result)
+
+    def _notify(self, event: Dict[str, Any], result: RelayResult):
+        observer = publish_observer.get()
+        if observer:
+            observer(event, result)
     
     async def _publish_to_single_relay(self, event: Dict[str, Any], result: RelayResult):
-        """Publish to a single relay with full diagnostics"""
+        """
+        Publish to a single relay with full diagnostics
+
+        Returns once the relay answered (and inline verification, if any, is
+        done). The connection stays open a little longer in the background
+        so NOTICEs arriving after the OK still land in `notice_messages`.
+        """
+        caps = RELAY_CAPABILITIES.cached(result.relay)
+        if caps and caps.max_message_length:
+            size = len(json.dumps(["EVENT", event]))
+            if size > caps.max_message_length:
+                result.error = f"Event is {size} bytes, relay accepts at most {caps.max_message_length}"
+                result.retryable = False
+                print(f"⚠️ Skipping {result.relay}: {result.error}")
+                return
+
+        publish_start = time.perf_counter()
+        relay_accounting.record_publish()
+        answered = asyncio.get_running_loop().create_future()
+        session = asyncio.create_task(self._relay_session(event, result, answered))
+        try:
+            await asyncio.wait({answered, session}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            relay_accounting.record_wait(time.perf_counter() - publish_start)
+        if not session.done():
+            _background_tasks.add(session)
+            session.add_done_callback(_background_tasks.discard)
+
+    async def _relay_session(self, event: Dict[str, Any], result: RelayResult, answered: asyncio.Future):
+        """Connection lifetime of one publish: send, await OK, verify, then linger for late NOTICEs"""
         try:
-            async with websockets.connect(result.relay, open_timeout=self.timeout) as ws:
+            async with connect_relay(result.relay, open_timeout=self.timeout) as ws:
                 result.connected = True
                 print(f"📡 Connected to {result.relay}")
                 
@@ -61,59 +593,98 @@ class RelayManager:
                 await ws.send(json.dumps(["EVENT", event]))
                 print(f"📤 Sent event to {result.relay}")
                 
-                # Wait for responses
+                # Wait for the relay's answer
                 await self._handle_relay_responses(ws, result, event)
                 
                 # Verify event was stored
-                await self._verify_event_storage(ws, result, event)
+                if result.published:
+                    result.verification = self._verification_for(result)
+                    if result.verification == "inline":
+                        await self._verify_event_storage(ws, result, event)
+                    elif result.verification == "deferred":
+                        _run_in_background(self._verify_deferred(event, result))
+
+                if not answered.done():
+                    answered.set_result(None)
+                await self._collect_late_notices(ws, result)
                 
-        except websockets.exceptions.ConnectionClosed as e:
-            result.error = f"Connection closed: {e}"
-        except asyncio.TimeoutError:
-            result.error = "Connection timeout"
         except Exception as e:
-            result.error = f"Unexpected error: {e}"
+            # Errors after the answer (while lingering for NOTICEs) do not change the outcome
+            if not answered.done():
+                if isinstance(e, websockets.exceptions.ConnectionClosed):
+                    result.error = f"Connection closed: {e}"
+                elif isinstance(e, asyncio.TimeoutError):
+                    result.error = "Connection timeout"
+                else:
+                    result.error = f"Unexpected error: {e}"
+        finally:
+            if not answered.done():
+                answered.set_result(None)
     
     async def _handle_relay_responses(self, ws, result: RelayResult, event: Dict[str, Any]):
-        """Handle OK/NOTICE/CLOSED responses from relay"""
-        start_time = time.time()
+        """Wait for the OK (or CLOSED) for the event, recording NOTICEs on the way"""
+        sent_at = time.perf_counter()
+        deadline = sent_at + OK_TIMEOUT
         
-        while time.time() - start_time < 5:  # 5 second timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                result.error = f"No OK within {OK_TIMEOUT:.0f}s"
+                return
             try:
-                response = await asyncio.wait_for(ws.recv(), timeout=2)
-                parsed = self._parse_message(response)
-                
-                if not parsed:
-                    continue
-                
-                msg_type = parsed[0]
-                
-                if msg_type == "OK" and len(parsed) >= 4:
-                    event_id, accepted, message = parsed[1], parsed[2], parsed[3]
-                    if event_id == event.get("id"):
-                        result.published = bool(accepted)
-                        result.ok_message = message
-                        print(f"   ✅ {result.relay}: OK accepted={accepted} msg='{message}'")
-                        if not accepted:
-                            result.error = f"Relay rejected: {message}"
-                            return
-                
-                elif msg_type == "NOTICE" and len(parsed) >= 2:
-                    notice_msg = parsed[1]
-                    result.notice_messages.append(notice_msg)
-                    print(f"   ℹ️ {result.relay}: NOTICE '{notice_msg}'")
-                
-                elif msg_type == "CLOSED" and len(parsed) >= 3:
-                    reason = parsed[2]
-                    result.error = f"Connection closed: {reason}"
-                    print(f"   🔒 {result.relay}: CLOSED '{reason}'")
-                    return
-                    
+                response = await asyncio.wait_for(ws.recv(), timeout=remaining)
             except asyncio.TimeoutError:
-                break
+                continue
+            except websockets.exceptions.ConnectionClosed:
+                raise
             except Exception as e:
                 print(f"   ⚠️ {result.relay}: Error reading response: {e}")
-                break
+                return
+
+            parsed = self._parse_message(response)
+            if not parsed:
+                continue
+            
+            msg_type = parsed[0]
+            
+            if msg_type == "OK" and len(parsed) >= 4:
+                event_id, accepted, message = parsed[1], parsed[2], parsed[3]
+                if event_id == event.get("id"):
+                    RELAY_OK_SECONDS.observe(time.perf_counter() - sent_at, relay=result.relay)
+                    result.published = bool(accepted)
+                    result.ok_message = message
+                    print(f"   ✅ {result.relay}: OK accepted={accepted} msg='{message}'")
+                    if accepted:
+                        self._on_ok(result)
+                    else:
+                        EVENTS_REJECTED.inc(relay=result.relay)
+                        result.error = f"Relay rejected: {message}"
+                    return
+            
+            elif msg_type == "NOTICE" and len(parsed) >= 2:
+                self._record_notice(result, parsed[1])
+            
+            elif msg_type == "CLOSED" and len(parsed) >= 3:
+                reason = parsed[2]
+                EVENTS_REJECTED.inc(relay=result.relay)
+                result.error = f"Connection closed: {reason}"
+                print(f"   🔒 {result.relay}: CLOSED '{reason}'")
+                return
+
+    async def _collect_late_notices(self, ws, result: RelayResult):
+        """Keep reading NOTICEs for a short while after the publish has returned"""
+        deadline = time.perf_counter() + LATE_NOTICE_WINDOW
+        try:
+            while (remaining := deadline - time.perf_counter()) > 0:
+                parsed = self._parse_message(await asyncio.wait_for(ws.recv(), timeout=remaining))
+                if parsed and parsed[0] == "NOTICE" and len(parsed) >= 2:
+                    self._record_notice(result, parsed[1])
+        except (asyncio.TimeoutError, websockets.exceptions.ConnectionClosed):
+            pass
+
+    def _record_notice(self, result: RelayResult, notice_msg: str):
+        result.notice_messages.append(notice_msg)
+        print(f"   ℹ️ {result.relay}: NOTICE '{notice_msg}'")
     
     async def _verify_event_storage(self, ws, result: RelayResult, event: Dict[str, Any]):
         """Verify that the event was actually stored by the relay"""
@@ -122,6 +693,7 @@ class RelayManager:
             filter_payload = {"ids": [event["id"]], "limit": 1}
             
             await ws.send(json.dumps(["REQ", req_id, filter_payload]))
+            relay_accounting.record_req()
             print(f"   🔍 Verifying storage on {result.relay}...")
             
             start_time = time.time()
@@ -142,6 +714,9 @@ class RelayManager:
                     
                     elif parsed[0] == "EOSE" and len(parsed) >= 2 and parsed[1] == req_id:
                         break
+
+                    elif parsed[0] == "NOTICE" and len(parsed) >= 2:
+                        self._record_notice(result, parsed[1])
                         
                 except asyncio.TimeoutError:
                     break
@@ -152,6 +727,26 @@ class RelayManager:
         except Exception as e:
             print(f"   ⚠️ Verification failed on {result.relay}: {e}")
     
+    async def _verify_deferred(self, event: Dict[str, Any], result: RelayResult):
+        """Check storage after the publish returned; failures go to the outbox"""
+        await asyncio.sleep(DEFERRED_VERIFY_DELAY)
+        events = await query_relay(
+            result.relay,
+            f"verify_{event['id'][:8]}",
+            {"ids": [event["id"]], "limit": 1},
+            timeout=5,
+            recv_timeout=4,
+            open_timeout=self.timeout
+        )
+        result.verified = any(e.get("id") == event["id"] for e in events if isinstance(e, dict))
+        if result.verified:
+            print(f"   ✅ Verified (deferred): Event stored on {result.relay}")
+        else:
+            result.verification = "failed"
+            print(f"   ⚠️ Could not verify storage on {result.relay} (deferred)")
+            await OUTBOX.enqueue(event, [result])
+        self._notify(event, result)
+    
     def _parse_message(self, raw_message: str) -> Optional[List]:
         """Parse JSON message from relay"""
         try:
@@ -174,7 +769,8 @@ class RelayManager:
             "connected": connected,
             "published": published,
             "verified": verified,
-            "success_rate": f"{verified}/{total}" if total > 0 else "0/0"
+            "success_rate": f"{verified}/{total}" if total > 0 else "0/0",
+            "queued_for_retry": len(self.queued_relays)
         }
     
     def print_summary(self):
@@ -189,6 +785,8 @@ class RelayManager:
         print(f"Published:       {summary['published']}")
         print(f"Verified:        {summary['verified']}")
         print(f"Success Rate:    {summary['success_rate']}")
+        if self.queued_relays:
+            print(f"Retrying Later:  {summary['queued_for_retry']}")
         
         print("\nPer-Relay Details:")
         for result in self.results:
@@ -0,0 +1,174 @@
+"""
+Relay Slow-Query Log
+Fingerprints REQ filters by shape and aggregates slow relays over a rolling window
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+
+# Filter keys whose values are kept verbatim in fingerprints (low cardinality)
+_LITERAL_KEYS = ("kinds", "limit")
+
+# Canonical key order: kinds, ids, authors, tag filters, time bounds, search, limit
+_KEY_ORDER = ("kinds", "ids", "authors")
+_TRAILING_KEYS = ("since", "until", "search", "limit")
+
+
+def fingerprint_filter(filter_params: Dict[str, Any]) -> str:
+    """
+    Reduce a REQ filter to its shape, e.g. kinds=[8],#a=[*],limit=100
+
+    Kinds and limit are kept; ids, authors, tag values, time bounds and
+    search terms are replaced by wildcards so that queries differing only
+    in pubkeys or timestamps share one fingerprint.
+    """
+    tag_keys = sorted(k for k in filter_params if k.startswith("#"))
+    other_keys = sorted(
+        k for k in filter_params
+        if k not in _KEY_ORDER and k not in _TRAILING_KEYS and not k.startswith("#")
+    )
+    ordered = [k for k in _KEY_ORDER if k in filter_params] + tag_keys + other_keys
+    ordered += [k for k in _TRAILING_KEYS if k in filter_params]
+
+    parts = []
+    for key in ordered:
+        value = filter_params[key]
+        if key == "kinds" and isinstance(value, list):
+            parts.append(f"kinds=[{','.join(str(v) for v in sorted(value))}]")
+        elif key in _LITERAL_KEYS:
+            parts.append(f"{key}={value}")
+        elif isinstance(value, list):
+            parts.append(f"{key}=[*]")
+        else:
+            parts.append(f"{key}=*")
+    return ",".join(parts)
+
+
+@dataclass
+class SlowQuery:
+    """A relay query that exceeded the slow threshold"""
+    timestamp: float
+    relay: str
+    fingerprint: str
+    duration_ms: float
+    events: int
+    reached_eose: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": int(self.timestamp),
+            "relay": self.relay,
+            "fingerprint": self.fingerprint,
+            "duration_ms": round(self.duration_ms, 1),
+            "events": self.events,
+            "reached_eose": self.reached_eose,
+        }
+
+
+class SlowQueryLog:
+    """Rolling window of slow relay queries"""
+
+    def __init__(
+        self,
+        threshold_ms: float = 1000,
+        window_seconds: float = 900,
+        max_entries: int = 5000
+    ):
+        self.threshold_ms = threshold_ms
+        self.window_seconds = window_seconds
+        self.log_to_stdout = False
+        self._entries: Deque[SlowQuery] = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        threshold_ms: Optional[float] = None,
+        window_seconds: Optional[float] = None,
+        log_to_stdout: Optional[bool] = None
+    ) -> None:
+        if threshold_ms is not None:
+            self.threshold_ms = threshold_ms
+        if window_seconds is not None:
+            self.window_seconds = window_seconds
+        if log_to_stdout is not None:
+            self.log_to_stdout = log_to_stdout
+
+    def record(
+        self,
+        relay: str,
+        filter_params: Dict[str, Any],
+        duration_seconds: float,
+        events: int,
+        reached_eose: bool
+    ) -> Optional[SlowQuery]:
+        """Record a finished query; only queries over the threshold (or without EOSE) are kept"""
+        duration_ms = duration_seconds * 1000
+        if duration_ms < self.threshold_ms and reached_eose:
+            return None
+
+        entry = SlowQuery(
+            timestamp=time.time(),
+            relay=relay,
+            fingerprint=fingerprint_filter(filter_params),
+            duration_ms=duration_ms,
+            events=events,
+            reached_eose=reached_eose
+        )
+        with self._lock:
+            self._entries.append(entry)
+
+        if self.log_to_stdout:
+            eose = "EOSE" if reached_eose else "no EOSE"
+            print(f"🐢 Slow relay query: {relay} {entry.fingerprint} {duration_ms:.0f}ms ({events} events, {eose})")
+        return entry
+
+    def _window(self, window_seconds: Optional[float] = None) -> List[SlowQuery]:
+        cutoff = time.time() - (window_seconds or self.window_seconds)
+        with self._lock:
+            return [e for e in self._entries if e.timestamp >= cutoff]
+
+    def recent(self, limit: int = 50, window_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Most recent slow queries, newest first"""
+        entries = self._window(window_seconds)
+        return [e.to_dict() for e in reversed(entries[-limit:])]
+
+    def top_offenders(self, limit: int = 20, window_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Aggregate slow queries by filter fingerprint, worst total time first
+
+        Each entry lists how often the shape was slow, its total/average/max
+        time to EOSE, and which relays were slow for it.
+        """
+        groups: Dict[str, Dict[str, Any]] = {}
+        for entry in self._window(window_seconds):
+            group = groups.setdefault(entry.fingerprint, {
+                "fingerprint": entry.fingerprint,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "timeouts": 0,
+                "relays": {},
+            })
+            group["count"] += 1
+            group["total_ms"] += entry.duration_ms
+            group["max_ms"] = max(group["max_ms"], entry.duration_ms)
+            if not entry.reached_eose:
+                group["timeouts"] += 1
+            relay = group["relays"].setdefault(entry.relay, {"count": 0, "max_ms": 0.0})
+            relay["count"] += 1
+            relay["max_ms"] = max(relay["max_ms"], round(entry.duration_ms, 1))
+
+        ranked = sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)[:limit]
+        for group in ranked:
+            group["avg_ms"] = round(group["total_ms"] / group["count"], 1)
+            group["total_ms"] = round(group["total_ms"], 1)
+            group["max_ms"] = round(group["max_ms"], 1)
+        return ranked
+
+
+# Process-wide slow query log (configured by the API at startup)
+SLOW_QUERY_LOG = SlowQueryLog()
@@ -0,0 +1,267 @@
+"""
+Event Sync Engine for Nostr Badge Tool
+Keeps the local event store in sync with relays using NIP-77 negentropy, or since-windowed REQs as a fallback
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+from backfill import backfill_relay
+from event_store import EVENT_STORE, EventStore
+from filter_planner import FilterPlan
+from metrics import REGISTRY
+from negentropy import Negentropy, NegentropyError
+from relay_capabilities import RELAY_CAPABILITIES
+from relay_manager import connect_relay, query_relay_filters
+
+# Seconds re-fetched before the last checkpoint by since-window syncs (clock skew, late relays)
+SYNC_OVERLAP = 600
+
+# Seconds to wait for each negentropy round trip (shorter when support is not advertised)
+NEG_TIMEOUT = 10
+NEG_PROBE_TIMEOUT = 4
+
+# Seconds before negentropy is tried again on a relay where it failed
+NEG_RETRY_AFTER = 3600
+
+# Missing ids requested per filter after reconciliation (clamped to the relay's max_limit)
+NEG_FETCH_CHUNK = 500
+
+SYNC_EVENTS_FETCHED = REGISTRY.counter(
+    "nostr_sync_events_fetched_total",
+    "Events downloaded by the sync engine, by relay and method (negentropy, since, backfill)",
+    ["relay", "method"]
+)
+
+
+class NegentropyUnavailable(Exception):
+    """The relay refused or ignored a negentropy session"""
+
+
+@dataclass
+class SyncResult:
+    """Outcome of syncing one target with one relay"""
+    relay: str
+    target: str
+    method: str
+    fetched: int = 0
+    added: int = 0
+    relay_only: int = 0  # ids the relay has and we did not (negentropy)
+    local_only: int = 0  # ids we have and the relay does not (negentropy)
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class SyncEngine:
+    """
+    Reconciles tracked filters ("targets") between relays and the event store
+
+    For each relay and target the engine opens a NIP-77 negentropy session
+    over the events already stored for that filter and downloads only the
+    ids the relay has and the store lacks. Relays that do not support
+    negentropy (not advertised in NIP-11, NEG-ERR, NOTICE or silence) are
+    backfilled once and then synced with a REQ limited to events newer
+    than the last checkpoint. Store calls run in a worker thread so that
+    sqlite never blocks the event loop.
+    """
+
+    def __init__(self, store: EventStore = EVENT_STORE, max_targets: int = 100):
+        self.store = store
+        self.max_targets = max_targets
+        self.relays: List[str] = []
+        self._targets: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._no_negentropy: Dict[str, float] = {}
+        self._last_results: List[SyncResult] = []
+
+    def configure(self, relays: Optional[List[str]] = None, max_targets: Optional[int] = None) -> None:
+        if relays is not None:
+            self.relays = list(relays)
+        if max_targets is not None:
+            self.max_targets = max_targets
+
+    # ==============================================================
+    #   TARGETS
+    # ==============================================================
+
+    def track(self, name: str, filter_params: Dict[str, Any]) -> None:
+        """Keep `filter_params` synced under `name`; least recently tracked targets are dropped first"""
+        filter_params = {k: v for k, v in filter_params.items() if k != "limit"}
+        self._targets[name] = filter_params
+        self._targets.move_to_end(name)
+        while len(self._targets) > self.max_targets:
+            self._targets.popitem(last=False)
+
+    def is_synced(self, name: str, max_age: float) -> bool:
+        """Whether some relay completed a sync of the target within `max_age` seconds"""
+        if name not in self._targets:
+            return False
+        cutoff = time.time() - max_age
+        for relay in self.relays:
+            checkpoint = self.store.checkpoint(relay, name)
+            if checkpoint and checkpoint["synced_at"] >= cutoff:
+                return True
+        return False
+
+    # ==============================================================
+    #   SYNCING
+    # ==============================================================
+
+    async def run(self, interval: float = 300) -> None:
+        """Sync all targets every `interval` seconds until cancelled"""
+        while True:
+            try:
+                if self._targets and self.store.enabled:
+                    await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Sync pass failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def sync(self, targets: Optional[Dict[str, Dict[str, Any]]] = None) -> List[SyncResult]:
+        """Sync targets (default: all tracked) with every configured relay"""
+        targets = dict(targets if targets is not None else self._targets)
+        per_relay = await asyncio.gather(
+            *(self.sync_relay(relay, targets) for relay in self.relays),
+            return_exceptions=True
+        )
+        results = [r for relay_results in per_relay if isinstance(relay_results, list) for r in relay_results]
+        self._last_results = results
+
+        fetched = sum(r.fetched for r in results)
+        added = sum(r.added for r in results)
+        print(f"🔄 Synced {len(targets)} target(s) with {len(self.relays)} relay(s): "
+              f"{fetched} fetched, {added} new")
+        return results
+
+    async def sync_relay(self, relay: str, targets: Dict[str, Dict[str, Any]]) -> List[SyncResult]:
+        results = []
+        caps = await RELAY_CAPABILITIES.get(relay)
+        use_negentropy = caps.supports(77) is not False and self._no_negentropy.get(relay, 0) < time.time()
+
+        for name, filter_params in targets.items():
+            start = time.perf_counter()
+            result = None
+            if use_negentropy:
+                try:
+                    result = await self._sync_negentropy(
+                        relay, name, filter_params, NEG_TIMEOUT if caps.supports(77) else NEG_PROBE_TIMEOUT
+                    )
+                except (NegentropyUnavailable, NegentropyError) as e:
+                    print(f"⚠️ Negentropy unavailable on {relay}, using since-window sync: {e}")
+                    self._no_negentropy[relay] = time.time() + NEG_RETRY_AFTER
+                    use_negentropy = False
+                except Exception as e:
+                    result = SyncResult(relay=relay, target=name, method="negentropy", error=str(e))
+            if result is None:
+                try:
+                    result = await self._sync_since(relay, name, filter_params)
+                except Exception as e:
+                    result = SyncResult(relay=relay, target=name, method="since", error=str(e))
+            result.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            results.append(result)
+        return results
+
+    async def _sync_negentropy(
+        self,
+        relay: str,
+        name: str,
+        filter_params: Dict[str, Any],
+        timeout: float
+    ) -> SyncResult:
+        started = int(time.time())
+        negentropy = Negentropy(await asyncio.to_thread(self.store.items, filter_params))
+        sub_id = f"neg_{started}_{abs(hash(name)) % 10000}"
+
+        async with connect_relay(relay) as ws:
+            await ws.send(json.dumps(["NEG-OPEN", sub_id, filter_params, negentropy.initiate()]))
+            while True:
+                try:
+                    msg = await asyncio.wait_for(ws.recv(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    raise NegentropyUnavailable("no reply to NEG-OPEN")
+                try:
+                    data = json.loads(msg)
+                except (json.JSONDecodeError, TypeError):
+                    continue
+                if not isinstance(data, list) or not data:
+                    continue
+                if data[0] == "NOTICE":
+                    raise NegentropyUnavailable(f"NOTICE: {data[1] if len(data) > 1 else ''}")
+                if len(data) < 3 or data[1] != sub_id:
+                    continue
+                if data[0] == "NEG-ERR":
+                    raise NegentropyUnavailable(str(data[2]))
+                if data[0] != "NEG-MSG":
+                    continue
+                reply = negentropy.reconcile(data[2])
+                if reply is None:
+                    await ws.send(json.dumps(["NEG-CLOSE", sub_id]))
+                    break
+                await ws.send(json.dumps(["NEG-MSG", sub_id, reply]))
+
+        result = SyncResult(
+            relay=relay, target=name, method="negentropy",
+            relay_only=len(negentropy.need_ids), local_only=len(negentropy.have_ids)
+        )
+        if negentropy.need_ids:
+            # Ask for at most one relay page of ids per filter so that no result is capped
+            plan = FilterPlan(RELAY_CAPABILITIES.cached(relay))
+            chunk = plan.effective_limit({"limit": NEG_FETCH_CHUNK}) or NEG_FETCH_CHUNK
+            ids = [i.hex() for i in negentropy.need_ids]
+            filters = [
+                {"ids": ids[start:start + chunk], "limit": len(ids[start:start + chunk])}
+                for start in range(0, len(ids), chunk)
+            ]
+            events = await query_relay_filters(relay, "neg_fetch", filters, timeout=20)
+            result.fetched = len(events)
+            result.added = await asyncio.to_thread(self.store.add_events, events)
+            SYNC_EVENTS_FETCHED.inc(len(events), relay=relay, method="negentropy")
+        await asyncio.to_thread(self.store.set_checkpoint, relay, name, "negentropy", started)
+        return result
+
+    async def _sync_since(self, relay: str, name: str, filter_params: Dict[str, Any]) -> SyncResult:
+        started = int(time.time())
+        checkpoint = await asyncio.to_thread(self.store.checkpoint, relay, name)
+        if checkpoint is None:
+            # Never synced: page through the relay's history first
+            stored = await asyncio.to_thread(self.store.count, filter_params)
+            events, _ = await backfill_relay(relay, name, filter_params, self.store)
+            SYNC_EVENTS_FETCHED.inc(len(events), relay=relay, method="backfill")
+            return SyncResult(
+                relay=relay, target=name, method="backfill",
+                fetched=len(events), added=await asyncio.to_thread(self.store.count, filter_params) - stored
+            )
+
+        window = dict(filter_params)
+        window["since"] = max(window.get("since", 0), checkpoint["synced_at"] - SYNC_OVERLAP)
+
+        events = await query_relay_filters(relay, "sync", window, timeout=15)
+        result = SyncResult(relay=relay, target=name, method="since", fetched=len(events))
+        result.added = await asyncio.to_thread(self.store.add_events, events)
+        SYNC_EVENTS_FETCHED.inc(len(events), relay=relay, method="since")
+        await asyncio.to_thread(self.store.set_checkpoint, relay, name, "since", started)
+        return result
+
+    async def snapshot(self) -> Dict[str, Any]:
+        return {
+            "relays": self.relays,
+            "targets": dict(self._targets),
+            "negentropy_disabled": {
+                relay: round(until - time.time()) for relay, until in self._no_negentropy.items()
+                if until > time.time()
+            },
+            "last_results": [r.to_dict() for r in self._last_results],
+            "store": await asyncio.to_thread(self.store.stats),
+        }
+
+
+# Process-wide engine (configured and started by the API lifespan)
+SYNC_ENGINE = SyncEngine()
@@ -0,0 +1,279 @@
+"""
+Request Tracing for Nostr Badge Tool
+Nested spans (API handler -> service -> relay REQ) with an in-memory buffer and JSONL export
+"""
+
+import asyncio
+import functools
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+
+@dataclass
+class Span:
+    """One timed operation within a trace"""
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    task: str
+    start: float = field(default_factory=time.time)
+    duration_ms: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "task": self.task,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms or 0.0, 2),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """All spans recorded for one root operation (usually an API request)"""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name if self.root else "",
+            "start": self.root.start if self.root else 0,
+            "duration_ms": round(self.root.duration_ms or 0.0, 1) if self.root else 0,
+            "spans": len(self.spans),
+            "relay_reqs": sum(1 for s in self.spans if s.name == "relay.req"),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return {**self.summary(), "spans": [s.to_dict() for s in spans]}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def _task_name() -> str:
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task.get_name() if task else threading.current_thread().name
+
+
+# ==============================================================
+#   EXPORTER
+# ==============================================================
+
+class TraceExporter:
+    """Keeps recent traces in memory and optionally appends them to a JSONL file"""
+
+    def __init__(self, max_traces: int = 200):
+        self.enabled = True
+        self.export_path: Optional[Path] = None
+        self._traces: Deque[Trace] = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        export_path: Optional[str] = None,
+        max_traces: Optional[int] = None
+    ) -> None:
+        if enabled is not None:
+            self.enabled = enabled
+        if export_path:
+            self.export_path = Path(export_path)
+        if max_traces:
+            with self._lock:
+                self._traces = deque(self._traces, maxlen=max_traces)
+
+    def export(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+        if self.export_path:
+            try:
+                with open(self.export_path, "a") as f:
+                    f.write(json.dumps(trace.to_dict()) + "\n")
+            except OSError as e:
+                print(f"⚠️ Could not write trace to {self.export_path}: {e}")
+
+    def recent(self, limit: int = 50, min_duration_ms: float = 0) -> List[Dict[str, Any]]:
+        """Summaries of finished traces, newest first"""
+        with self._lock:
+            traces = list(self._traces)
+        summaries = [t.summary() for t in reversed(traces)]
+        return [s for s in summaries if s["duration_ms"] >= min_duration_ms][:limit]
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return next((t for t in self._traces if t.trace_id == trace_id), None)
+
+
+# Process-wide exporter (configured by the API at startup)
+TRACE_EXPORTER = TraceExporter()
+
+
+# ==============================================================
+#   SPANS
+# ==============================================================
+
+@contextmanager
+def trace(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Start a new trace with a root span; exported when the root span ends"""
+    if not TRACE_EXPORTER.enabled:
+        yield None
+        return
+
+    new_trace = Trace()
+    trace_token = _current_trace.set(new_trace)
+    try:
+        with span(name, **attributes) as root:
+            new_trace.root = root
+            yield root
+    finally:
+        _current_trace.reset(trace_token)
+        TRACE_EXPORTER.export(new_trace)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a child operation of the current span
+
+    Outside of a trace (e.g. from the CLI) this does nothing and yields None,
+    so callers should guard attribute updates with `if s:`.
+    """
+    current_trace = _current_trace.get()
+    if current_trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    new_span = Span(
+        trace_id=current_trace.trace_id,
+        span_id=uuid.uuid4().hex[:8],
+        parent_id=parent.span_id if parent else None,
+        name=name,
+        task=_task_name(),
+        attributes=dict(attributes)
+    )
+    current_trace.add(new_span)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        new_span.end()
+        _current_span.reset(token)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator wrapping an async function in a span named after its qualname"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(span_name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_trace.get()
+    return current.trace_id if current else None
+
+
+# ==============================================================
+#   VIEWS
+# ==============================================================
+
+def render_timeline(trace: Trace, width: int = 60) -> str:
+    """Render a trace as an indented text waterfall"""
+    data = trace.to_dict()
+    spans = data["spans"]
+    if not spans:
+        return ""
+
+    origin = min(s["start"] for s in spans)
+    total_ms = max((s["start"] - origin) * 1000 + s["duration_ms"] for s in spans) or 1.0
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for s in spans:
+        children.setdefault(s["parent_id"], []).append(s)
+
+    lines = [f"trace {data['trace_id']}  {data['name']}  {total_ms:.1f}ms"]
+
+    def walk(parent_id: Optional[str], depth: int) -> None:
+        for s in children.get(parent_id, []):
+            offset_ms = (s["start"] - origin) * 1000
+            begin = int(offset_ms / total_ms * width)
+            length = max(1, int(s["duration_ms"] / total_ms * width))
+            bar = " " * begin + "█" * min(length, width - begin)
+            attrs = " ".join(f"{k}={v}" for k, v in s["attributes"].items())
+            error = f" ERROR {s['error']}" if s["error"] else ""
+            lines.append(
+                f"{offset_ms:8.1f}ms {s['duration_ms']:8.1f}ms |{bar:<{width}}| "
+                f"{'  ' * depth}{s['name']} {attrs}{error}".rstrip()
+            )
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines) + "\n"
+
+
+def to_chrome_trace(trace: Trace) -> Dict[str, Any]:
+    """Convert to the Chrome trace event format (chrome://tracing, Perfetto)"""
+    data = trace.to_dict()
+    task_ids: Dict[str, int] = {}
+    events = []
+    for s in data["spans"]:
+        tid = task_ids.setdefault(s["task"], len(task_ids) + 1)
+        events.append({
+            "name": s["name"],
+            "ph": "X",
+            "ts": int(s["start"] * 1_000_000),
+            "dur": int(s["duration_ms"] * 1000),
+            "pid": 1,
+            "tid": tid,
+            "args": {**s["attributes"], **({"error": s["error"]} if s["error"] else {})},
+        })
+    events += [
+        {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": task}}
+        for task, tid in task_ids.items()
+    ]
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
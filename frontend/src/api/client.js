@@ -8,10 +8,14 @@
 
 import axios from 'axios'
 import { useAuthStore } from '@/stores/auth'
+import { useUIStore } from '@/stores/ui'
 
 // Use environment variable for API URL, fallback to /api/v1 for dev proxy
 const API_BASE_URL = import.meta.env.VITE_API_URL || '/api/v1'
 
+// Static discovery snapshots written by `python -m app.snapshot` (empty string disables them)
+const SNAPSHOT_URL = import.meta.env.VITE_SNAPSHOT_URL ?? '/snapshots'
+
 // Create axios instance
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
@@ -39,9 +43,23 @@ apiClient.interceptors.request.use(
   (error) => Promise.reject(error)
 )
 
+const STALE_NOTICE_INTERVAL = 60000
+
+// Warn (at most once a minute) when the backend answered from its last good copy
+let lastStaleNotice = 0
+function notifyStale(response) {
+  if (!response.headers['x-stale'] || Date.now() - lastStaleNotice < STALE_NOTICE_INTERVAL) return
+  lastStaleNotice = Date.now()
+  const minutes = Math.max(1, Math.round((Number(response.headers.age) || 0) / 60))
+  useUIStore().showWarning(`Relays are not responding - showing data from ${minutes} min ago`)
+}
+
 // Response interceptor - handle errors
 apiClient.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    notifyStale(response)
+    return response
+  },
   (error) => {
     if (error.response?.status === 401) {
       const authStore = useAuthStore()
@@ -51,6 +69,51 @@ apiClient.interceptors.response.use(
   }
 )
 
+let snapshotManifest = null
+
+/**
+ * Fetch the snapshot manifest once per page load
+ * Resolves to null when no snapshot is deployed (the SPA fallback serves HTML instead)
+ */
+function loadSnapshotManifest() {
+  if (!snapshotManifest) {
+    snapshotManifest = SNAPSHOT_URL
+      ? axios.get(`${SNAPSHOT_URL}/latest.json`)
+          .then(({ data }) => (data && typeof data === 'object' && data.files ? data : null))
+          .catch(() => null)
+      : Promise.resolve(null)
+  }
+  return snapshotManifest
+}
+
+const JOB_POLL_INTERVAL = 1000
+const JOB_POLL_LIMIT = 300  // give up after ~5 minutes
+
+/**
+ * Queue a publish operation as a background job and wait for its result
+ *
+ * The endpoint answers 202 with a job id right away; the job is then polled
+ * until it finishes, so slow relays never hold the HTTP request open.
+ * Resolves like a normal axios call ({ data: result }).
+ */
+async function postAsJob(url, body) {
+  const { data: accepted } = await apiClient.post(url, body, { params: { background: true } })
+
+  for (let i = 0; i < JOB_POLL_LIMIT; i++) {
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL))
+    const { data: job } = await apiClient.get(`/jobs/${accepted.job_id}`)
+    if (job.result) {
+      return { data: job.result, job }
+    }
+    if (job.status === 'failed') {
+      const error = new Error(job.error || 'Job failed')
+      error.response = { data: { detail: job.error } }
+      throw error
+    }
+  }
+  throw new Error('Timed out waiting for job to finish')
+}
+
 // API methods
 export const api = {
   // Auth
@@ -107,7 +170,7 @@ export const api = {
    * @param {Object|null} signedAwardEvent - Pre-signed award for NIP-07
    */
   createAndAward: (badge, signedDefinitionEvent = null, signedAwardEvent = null) =>
-    apiClient.post('/badges/create-and-award', {
+    postAsJob('/badges/create-and-award', {
       ...badge,
       signed_definition_event: signedDefinitionEvent,
       signed_award_event: signedAwardEvent
@@ -126,11 +189,15 @@ export const api = {
    * @param {Object|null} signedEvent - Pre-signed deletion event for NIP-07
    */
   deleteBadge: (a_tag, signedEvent = null) =>
-    apiClient.post('/badges/delete', {
+    postAsJob('/badges/delete', {
       a_tag,
       signed_event: signedEvent
     }),
 
+  // Background jobs
+  getJob: (jobId) =>
+    apiClient.get(`/jobs/${jobId}`),
+
   // Badge Discovery
   getBadgeOwners: (a_tag, limit = 50, include_profiles = true) =>
     apiClient.get('/badges/owners', {
@@ -138,8 +205,23 @@ export const api = {
     }),
 
   // Inbox
-  getPendingBadges: () =>
-    apiClient.get('/inbox/pending'),
+  /**
+   * Get pending badges with pagination
+   * @param {string|null} cursor - X-Next-Cursor header of the previous page (null for the first page)
+   */
+  getPendingBadges: (cursor = null, limit = 50) =>
+    apiClient.get('/inbox/pending', {
+      params: { limit, ...(cursor && { cursor }) }
+    }),
+
+  /**
+   * Open a Server-Sent Events stream of new pending badges and badge requests
+   * (`badge_award` and `badge_request` events)
+   * @param {string} pubkey - Hex pubkey (EventSource cannot send auth headers)
+   * @returns {EventSource}
+   */
+  streamInbox: (pubkey) =>
+    new EventSource(`${API_BASE_URL}/inbox/events?pubkey=${encodeURIComponent(pubkey)}`),
 
   getAcceptedBadges: () =>
     apiClient.get('/inbox/accepted'),
@@ -151,7 +233,7 @@ export const api = {
    * @param {Object|null} signedEvent - Pre-signed profile badges event for NIP-07
    */
   acceptBadge: (a_tag, award_event_id, signedEvent = null) =>
-    apiClient.post('/inbox/accept', {
+    postAsJob('/inbox/accept', {
       a_tag,
       award_event_id,
       signed_event: signedEvent
@@ -302,13 +384,39 @@ export const api = {
   /**
    * Get recent badges with pagination
    * @param {number} limit - Number of badges to fetch
-   * @param {number|null} until - Timestamp cursor for pagination (fetch badges BEFORE this time)
+   * @param {string|null} cursor - next_cursor from the previous page (null for the first page)
+   * @param {number|null} since - Only badges created at or after this timestamp
    */
-  getRecentBadges: (limit = 50, until = null) =>
+  getRecentBadges: (limit = 50, cursor = null, since = null) =>
     apiClient.get('/surf/recent', {
-      params: { limit, ...(until && { until }) }
+      params: { limit, ...(cursor && { cursor }), ...(since && { since }) }
     }),
 
+  /**
+   * Load a list from the latest static snapshot
+   * @param {string} name - 'recent' | 'popular' (same body as /surf/recent and /surf/popular)
+   * @returns {Promise<{data: Object, generatedAt: number}|null>} null when no snapshot is available
+   */
+  getSnapshot: async (name) => {
+    const manifest = await loadSnapshotManifest()
+    const path = manifest?.files?.[name]
+    if (typeof path !== 'string') return null
+    try {
+      const { data } = await axios.get(`${SNAPSHOT_URL}/${path}`)
+      return { data, generatedAt: manifest.generated_at }
+    } catch {
+      return null
+    }
+  },
+
+  /**
+   * Open a Server-Sent Events stream of new badge definitions and awards
+   * (`badge_definition`, `badge_award` and `dropped` events)
+   * @returns {EventSource}
+   */
+  streamLiveBadges: () =>
+    new EventSource(`${API_BASE_URL}/surf/live`),
+
   /**
    * @deprecated Use getBadges({ sort: 'popular' }) instead
    */
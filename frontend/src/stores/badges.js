@@ -31,6 +31,7 @@ export const useBadgesStore = defineStore('badges', () => {
   const appTemplatesRaw = ref([])    // App templates from API (read-only)
   const userTemplates = ref([])      // User-created templates from API
   const pendingBadges = ref([])
+  const pendingCursor = ref(null)    // Cursor of the next page of pending badges (null = no more)
   const acceptedBadges = ref([])
   const rejectedBadgeIds = ref(new Set(JSON.parse(localStorage.getItem('rejectedBadgeIds') || '[]')))
   const isLoading = ref(false)
@@ -249,13 +250,15 @@ export const useBadgesStore = defineStore('badges', () => {
     }
   }
 
-  async function fetchPendingBadges() {
-    isLoading.value = true
+  async function fetchPendingBadges(append = false) {
+    if (append && !pendingCursor.value) return
+    isLoading.value = !append
     error.value = null
     
     try {
-      const response = await api.getPendingBadges()
-      pendingBadges.value = response.data
+      const response = await api.getPendingBadges(append ? pendingCursor.value : null)
+      pendingBadges.value = append ? [...pendingBadges.value, ...response.data] : response.data
+      pendingCursor.value = response.headers['x-next-cursor'] || null
     } catch (err) {
       error.value = err.response?.data?.detail || err.message
     } finally {
@@ -401,6 +404,14 @@ export const useBadgesStore = defineStore('badges', () => {
     }
   }
 
+  /**
+   * Add a badge pushed by the inbox stream (newest first, ignoring duplicates)
+   */
+  function addPendingBadge(badge) {
+    if (pendingBadges.value.some(b => b.award_event_id === badge.award_event_id)) return
+    pendingBadges.value = [badge, ...pendingBadges.value]
+  }
+
   function rejectBadge(award_event_id) {
     rejectedBadgeIds.value.add(award_event_id)
     localStorage.setItem('rejectedBadgeIds', JSON.stringify([...rejectedBadgeIds.value]))
@@ -408,6 +419,7 @@ export const useBadgesStore = defineStore('badges', () => {
 
   function clearBadges() {
     pendingBadges.value = []
+    pendingCursor.value = null
     acceptedBadges.value = []
   }
 
@@ -423,6 +435,7 @@ export const useBadgesStore = defineStore('badges', () => {
     // State
     userTemplates,
     pendingBadges,
+    pendingCursor,
     acceptedBadges,
     isLoading,
     error,
@@ -447,6 +460,7 @@ export const useBadgesStore = defineStore('badges', () => {
     updateTemplate,
     createAndAwardBadge,
     fetchPendingBadges,
+    addPendingBadge,
     fetchAcceptedBadges,
     acceptBadge,
     removeBadge,
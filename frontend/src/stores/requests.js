@@ -413,6 +413,16 @@ export const useRequestsStore = defineStore('requests', () => {
     }
   }
 
+  /**
+   * Add an incoming request pushed by the inbox stream
+   */
+  function addIncomingRequest(request) {
+    if (incomingRequests.value.some(r => r.event_id === request.event_id)) return
+    incomingRequests.value = [request, ...incomingRequests.value]
+    incomingCount.value += 1
+    if (request.state === 'pending') pendingCount.value += 1
+  }
+
   /**
    * Clear all request data
    */
@@ -445,6 +455,7 @@ export const useRequestsStore = defineStore('requests', () => {
     fetchOutgoingRequests,
     fetchIncomingRequests,
     fetchIncomingCount,
+    addIncomingRequest,
     fetchAll,
     createRequest,
     withdrawRequest,